@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "deva_hackathon.settings")
+os.environ.setdefault("DJANGO_ASGI", "1")
 
 application = get_asgi_application()
+
+# Build the in-memory temple indexes before serving the first request
+from temples.indexes import warm_up  # noqa: E402
+
+warm_up()
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +47,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "temples.middleware.PerformanceMiddleware",
+    "temples.middleware.CompressionMiddleware",
+    "temples.middleware.QueryBudgetMiddleware",
+    "temples.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,6 +58,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "temples.middleware.TrafficRecorderMiddleware",
 ]
 
 ROOT_URLCONF = "deva_hackathon.urls"
@@ -77,13 +84,58 @@ WSGI_APPLICATION = "deva_hackathon.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# WAL lets readers run alongside a writer; synchronous=NORMAL is durable in WAL
+# mode except for the last transactions before a power loss. mmap and a larger
+# page cache keep hot pages out of read() calls.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA mmap_size=268435456;"
+    "PRAGMA cache_size=-16000;"
+    "PRAGMA temp_store=MEMORY;"
+)
+
+# Persistent connections, except under ASGI (set by asgi.py), where each request
+# runs its sync code on a thread of its own and would leave one behind
+DATABASE_CONN_MAX_AGE = 0 if os.environ.get("DJANGO_ASGI") else 600
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            "init_command": SQLITE_PRAGMAS,
+            # Take the write lock when a transaction starts instead of failing
+            # with "database is locked" when a read lock cannot be upgraded
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Read replicas: SQLite files refreshed from the primary by the sync_replicas
+# command (or kept in sync by LiteFS/Litestream). Reads of GET and HEAD
+# requests go to one of them; writes, and the reads of a client that wrote
+# within REPLICA_PIN_SECONDS, go to "default".
+SQLITE_REPLICAS = []
+REPLICA_PIN_SECONDS = 10
+
+DATABASE_REPLICAS = []
+for number, path in enumerate(SQLITE_REPLICAS, start=1):
+    DATABASES[f"replica{number}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+        "OPTIONS": {"init_command": SQLITE_PRAGMAS + "PRAGMA query_only=ON;", "timeout": 20},
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["temples.db_routers.PrimaryReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,13 +178,90 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-# Cache configuration
+# Cache configuration. Writes drop the cached entries they make stale, but
+# only in the cache of the process that wrote; with more than one worker
+# process use a shared cache (e.g. temples.cache_backends.InstrumentedRedisCache),
+# which the temples.W001 check asks for outside of DEBUG.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'temples.cache_backends.InstrumentedLocMemCache',
         'LOCATION': 'unique-snowflake',
     }
 }
 
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'temples.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Responses of at least COMPRESSION_MIN_BYTES are gzip/deflate compressed at
+# COMPRESSION_LEVEL; views override both with a compression attribute
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_LEVEL = 6
+
+# Per-request Server-Timing header and in-memory endpoint histograms
+PERF_METRICS_ENABLED = True
+
+# Views declare query_budget; exceeding it raises in debug and test runs and
+# is only logged otherwise
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
+QUERY_BUDGET_ENFORCE = DEBUG or TESTING
+
+# Memory-mapped temple coordinates shared by every worker process for the
+# geo queries; None keeps a private in-memory grid per process instead
+TEMPLE_SNAPSHOT_PATH = None if TESTING else BASE_DIR / "temples.snapshot"
+TEMPLE_SNAPSHOT_CHECK_SECONDS = 1.0
+
+# Processes re-read the temples version (the generation of the temple data,
+# kept in the database) this often to notice changes made by other
+# processes; tests roll the database back under it, so they always re-read
+TEMPLES_VERSION_CHECK_SECONDS = 0 if TESTING else 1.0
+
+# A user counts towards a temple's crowd until they ping from elsewhere or
+# go quiet for this long
+CROWD_PRESENCE_SECONDS = 15 * 60
+
+# Nearby-users streams send a comment line this often while idle, so
+# proxies don't close the connection
+LIVE_HEARTBEAT_SECONDS = 15
+
+# While a process has nearby-users streams open it reads the location pings
+# every worker saved this often and sends them on
+LIVE_POLL_SECONDS = 0.5
+
+# Batch requests take up to BATCH_MAX_REQUESTS sub-requests; their reads run
+# on a pool of BATCH_WORKERS threads per process
+BATCH_MAX_REQUESTS = 20
+BATCH_WORKERS = 4
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "temples.query_budget": {"handlers": ["console"], "level": "WARNING"},
+    },
+}
+
 # Cache time for nearby temples (in seconds)
 NEARBY_TEMPLES_CACHE_TTL = 300  # 5 minutes
+
+# Largest nearby temples radius, in kilometers; the grid walks every cell
+# of the radius' bounding box
+NEARBY_TEMPLES_MAX_RADIUS = 100
+
+# Cache time for temple detail renderings, invalidated by signals on writes
+TEMPLE_DETAIL_CACHE_TTL = 3600  # 1 hour
+
+# Worker threads (and so database connections) shared by the concurrent
+# queries of the async views under /api/async/
+ASYNC_QUERY_THREADS = 32
+
+# Traffic recording for offline replay (see the replay_traffic command).
+# Fraction of /api/ requests appended to TRAFFIC_RECORD_PATH; 0 disables it.
+TRAFFIC_RECORD_SAMPLE_RATE = 0.0
+TRAFFIC_RECORD_PATH = BASE_DIR / "requests.jsonl"
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "deva_hackathon.settings")
 
 application = get_wsgi_application()
+
+# Build the in-memory temple indexes before serving the first request
+from temples.indexes import warm_up  # noqa: E402
+
+warm_up()
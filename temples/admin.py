@@ -1,5 +1,15 @@
+import json
+
 from django.contrib import admin
-from .models import User, Temple, UserTempleCheckin, Reels, ReelsLike, Location
+from django.utils.html import format_html
+from .changelists import LargeTableAdmin
+from .models import User, UserStats, Temple, TempleDetails, UserTempleCheckin, Reels, ReelsLike, Location
+
+
+class UserStatsInline(admin.StackedInline):
+    model = UserStats
+    fields = readonly_fields = ('checkin_count', 'temples_visited', 'reels_count', 'likes_received', 'updated_at')
+    can_delete = False
 
 
 @admin.register(User)
@@ -7,43 +17,62 @@ class UserAdmin(admin.ModelAdmin):
     list_display = ('user_id', 'name', 'image', 'created_at', 'updated_at')
     search_fields = ('name',)
     list_filter = ('created_at', 'updated_at')
+    inlines = (UserStatsInline,)
+
+
+class TempleDetailsInline(admin.StackedInline):
+    model = TempleDetails
+    fields = ('raw_data_preview', 'updated_at')
+    readonly_fields = ('raw_data_preview', 'updated_at')
+    can_delete = False
+
+    @admin.display(description='Raw data')
+    def raw_data_preview(self, obj):
+        return format_html('<pre>{}</pre>', json.dumps(obj.raw_data, indent=2))
 
 
 @admin.register(Temple)
 class TempleAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'srm', 'chadhava', 'puja', 'yatra', 'lat', 'lng', 'rating', 'checkin_count', 'google_place_id', 'created_at')
     list_filter = ('srm', 'chadhava', 'puja', 'yatra', 'created_at')
-    search_fields = ('srm',)
+    search_fields = ('name', 'google_place_id')
     ordering = ('-created_at',)
+    inlines = (TempleDetailsInline,)
 
 
 @admin.register(UserTempleCheckin)
-class UserTempleCheckinAdmin(admin.ModelAdmin):
+class UserTempleCheckinAdmin(LargeTableAdmin):
     list_display = ('user', 'temple', 'checkin_time', 'created_at')
-    list_filter = ('checkin_time', 'created_at')
-    search_fields = ('user__name', 'temple__srm')
-    ordering = ('-checkin_time',)
+    list_select_related = ('user', 'temple')
+    # checkin_time is set with created_at, which is indexed
+    list_filter = ('created_at',)
+    search_fields = ('user__name', 'temple__name')
+    raw_id_fields = ('user', 'temple')
 
 
 @admin.register(Reels)
-class ReelsAdmin(admin.ModelAdmin):
+class ReelsAdmin(LargeTableAdmin):
     list_display = ('user', 'temple', 'video_url', 'thumbnail', 'created_at')
+    list_select_related = ('user', 'temple')
     list_filter = ('created_at',)
-    search_fields = ('user__name', 'temple__srm')
-    ordering = ('-created_at',)
+    search_fields = ('user__name', 'temple__name')
+    raw_id_fields = ('user', 'temple')
 
 
 @admin.register(ReelsLike)
 class ReelsLikeAdmin(admin.ModelAdmin):
     list_display = ('user', 'reel', 'like', 'created_at')
+    list_select_related = ('user', 'reel__user', 'reel__temple')
     list_filter = ('like', 'created_at')
     search_fields = ('user__name', 'reel__user__name')
+    raw_id_fields = ('user', 'reel')
     ordering = ('-created_at',)
 
 
 @admin.register(Location)
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(LargeTableAdmin):
     list_display = ('user', 'lat', 'lng', 'created_at')
+    list_select_related = ('user',)
     list_filter = ('created_at',)
     search_fields = ('user__name',)
-    ordering = ('-created_at',)
+    raw_id_fields = ('user',)
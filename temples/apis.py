@@ -1,43 +1,134 @@
 from django.shortcuts import render, get_object_or_404
+from django.http import Http404, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import generics
 from django.db.models import F, Max, Q, ExpressionWrapper, FloatField, Count
-from django.db.models.functions import Radians, Sin, Cos, Sqrt
+from django.db.models import Window
+from django.db.models.functions import Radians, Sin, Cos, Sqrt, RowNumber
 from django.utils import timezone
-from datetime import timedelta
-from math import atan2
-from math import radians, sin, cos, sqrt, atan2
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from .models import User, Location, Temple, UserTempleCheckin, Reels
-from .serializers import UserSerializer, UserCreateSerializer, LocationSerializer, TempleSerializer, UserTempleCheckinSerializer, ReelsSerializer
+from .user_cards import user_cards, user_data, with_user_names
+from .serializers import UserSerializer, UserCreateSerializer, LocationSerializer, TempleSerializer, UserTempleCheckinSerializer, ReelsSerializer, with_like_counts
+from .batch import BatchError, SubRequest, run_batch
+from .crowd import crowd_tracker
+from .exports import FORMATS, Export, parse_time, parse_watermark
+from .clusters import DETAIL_ZOOM, check_bounds, temple_clusters
+from .caches import activity_validators, request_cache, temples_version, temple_detail_cache_key
+from .geofence import CHECKIN_COOLDOWN, CHECKIN_RADIUS_KM, temple_geofences
+from .geo import calculate_distance
+from .search import temple_name_index
+from .spatial import FLAG_BITS, temple_grid
+from .perf import endpoint_stats
+from .renderers import JSONFragment, encode_json
+from .yatra import plan_route
 from django.core.cache import cache
+from django.db import transaction
 from django.conf import settings
 import hashlib
-import json
+import math
 
 
-def calculate_distance(lat1, lon1, lat2, lon2):
+def parse_bool(value, default=False):
     """
-    Calculate the distance between two points using the Haversine formula.
-    Returns distance in kilometers.
+    Interpret a query parameter such as ?details=true as a boolean, or
+    default when it is missing.
     """
-    R = 6371  # Earth's radius in kilometers
+    if value is None:
+        return default
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
 
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
+
+def not_modified(request, validators):
+    """
+    A 304 response when the client's If-None-Match or If-Modified-Since
+    matches validators, an (ETag, Last-Modified timestamp or None) pair;
+    else None.
+    """
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return set_validators(response, validators) if response is not None else None
+
+
+def set_validators(response, validators):
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Clients revalidate on every poll instead of reusing the list as is
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def latest_location_times_near(lat, lng, radius):
+    """
+    Queryset of each user's latest location time within a bounding box
+    around the coordinates.
+    """
+    # Convert radius to degrees (approximate)
+    # 1 degree is approximately 111km at the equator
+    radius_degrees = radius / 111.0
     
-    distance = R * c
-    return distance
+    # Get distinct users with their latest location within radius
+    return Location.objects.filter(
+        lat__range=(lat - radius_degrees, lat + radius_degrees),
+        lng__range=(lng - radius_degrees, lng + radius_degrees)
+    ).values('user').annotate(
+        latest_created=Max('created_at')
+    ).filter(
+        latest_created__isnull=False
+    )
+
+
+def latest_locations_at(location_times):
+    # Get the actual location records with coordinates; filtering on the user
+    # too lets the (user, created_at) index find them. The users come from
+    # their cards.
+    return Location.objects.filter(
+        user_id__in=[loc['user'] for loc in location_times],
+        created_at__in=[loc['latest_created'] for loc in location_times]
+    )
+
+
+def locations_within(latest_locations, lat, lng, radius):
+    """
+    (distance, location) of the locations within radius km, nearest first.
+    """
+    nearby_locations = []
+    for location in latest_locations:
+        distance = calculate_distance(lat, lng, location.lat, location.lng)
+        if distance <= radius:
+            nearby_locations.append((distance, location))
+    nearby_locations.sort(key=lambda item: item[0])
+    return nearby_locations
+
+
+def serialize_nearby_users(nearby_locations, cards):
+    """
+    Nearby-users entries for locations_within() results, from the users'
+    cards (see user_cards()).
+    """
+    nearby_users = []
+    for distance, location in nearby_locations:
+        card = cards.get(location.user_id)
+        if card is None:
+            # Deleted since the location was read
+            continue
+        user = user_data(card, location)
+        user['distance'] = round(distance, 2)  # Round to 2 decimal places
+        nearby_users.append(user)
+    return nearby_users
 
 
 class CreateUser(APIView):
+    # A rename also moves the lists' shared version stamp, which takes an
+    # UPDATE, BEGIN and INSERT while its row doesn't exist yet
+    query_budget = 8
+
     def post(self, request):
         try:
             # First check if user_id is provided
@@ -75,6 +166,9 @@ class CreateUser(APIView):
 
 
 class ListNearbyUsers(APIView):
+    # One more when some user cards are not cached
+    query_budget = 3
+
     def get(self, request):
         try:
             # Get parameters from request
@@ -82,42 +176,10 @@ class ListNearbyUsers(APIView):
             lng = float(request.query_params.get('lng'))
             radius = float(request.query_params.get('radius', 2))  # Default 2km radius
             
-            # Convert radius to degrees (approximate)
-            # 1 degree is approximately 111km at the equator
-            radius_degrees = radius / 111.0
-            
-            # Get distinct users with their latest location within radius
-            locations = Location.objects.filter(
-                lat__range=(lat - radius_degrees, lat + radius_degrees),
-                lng__range=(lng - radius_degrees, lng + radius_degrees)
-            ).values('user').annotate(
-                latest_created=Max('created_at')
-            ).filter(
-                latest_created__isnull=False
-            )
-            
-            # Get the actual location records with coordinates
-            latest_locations = Location.objects.filter(
-                created_at__in=[loc['latest_created'] for loc in locations]
-            ).select_related('user')
-            
-            nearby_users = []
-            
-            # Calculate exact distances and filter users within radius
-            for location in latest_locations:
-                distance = calculate_distance(
-                    lat, lng,
-                    location.lat,
-                    location.lng
-                )
-                
-                if distance <= radius:
-                    user_data = UserSerializer(location.user).data
-                    user_data['distance'] = round(distance, 2)  # Round to 2 decimal places
-                    nearby_users.append(user_data)
-            
-            # Sort by distance
-            nearby_users.sort(key=lambda x: x['distance'])
+            latest_locations = latest_locations_at(latest_location_times_near(lat, lng, radius))
+            nearby_locations = locations_within(latest_locations, lat, lng, radius)
+            cards = user_cards({location.user_id for _, location in nearby_locations})
+            nearby_users = serialize_nearby_users(nearby_locations, cards)
             
             return Response({"data": {
                 'count': len(nearby_users),
@@ -135,6 +197,9 @@ class ListNearbyUsers(APIView):
 
 
 class LocationList(APIView):
+    # A post also records the user's presence for the crowd counts: one
+    # UPDATE, or on their first ping an UPDATE and an upsert transaction
+    query_budget = {'get': 2, 'post': 5}
 
     def get(self, request):
         """
@@ -175,10 +240,11 @@ class LocationList(APIView):
 
 
 class LocationDetail(APIView):
+    query_budget = {'get': 3, 'put': 5, 'delete': 4}
     permission_classes = [IsAuthenticated]
 
     def get_object(self, pk):
-        return get_object_or_404(Location, pk=pk)
+        return get_object_or_404(Location.objects.select_related('user'), pk=pk)
 
     def get(self, request, pk):
         """
@@ -226,22 +292,100 @@ class LocationDetail(APIView):
             )
 
 
+def nearby_temples_cache_key(lat, lng, radius, include_raw_data=False, flags_mask=0, min_rating=None, version=None):
+    """
+    Generate a unique cache key based on the input parameters.
+    Round coordinates to 4 decimal places to ensure nearby requests hit the same cache.
+    Callers that already know the temples version can pass it in.
+    """
+    # Round coordinates to reduce cache key variations for very close coordinates
+    rounded_lat = round(lat, 4)
+    rounded_lng = round(lng, 4)
+    rounded_radius = round(radius, 1)
+    
+    # Create a string with the parameters
+    # The temples version is bumped by invalidate_temple_caches() after bulk changes
+    params_str = (
+        f"nearby_temples_encoded:{version if version is not None else temples_version()}:{rounded_lat}:{rounded_lng}:{rounded_radius}:"
+        f"{int(include_raw_data)}:{flags_mask}:{min_rating}"
+    )
+    
+    # Create a hash of the parameters for a shorter key
+    return hashlib.md5(params_str.encode()).hexdigest()
+
+
+def parse_nearby_temples_params(query_params):
+    """
+    (lat, lng, radius, include_raw_data, flags_mask, min_rating) from the
+    nearby temples query parameters. Raises ValueError/TypeError when invalid,
+    including radii over NEARBY_TEMPLES_MAX_RADIUS.
+    """
+    lat = float(query_params.get('lat'))
+    lng = float(query_params.get('lng'))
+    radius = float(query_params.get('radius', 5))  # Default 5km radius
+    max_radius = getattr(settings, 'NEARBY_TEMPLES_MAX_RADIUS', 100)
+    # float() accepts 'inf' and 'nan'
+    if not (math.isfinite(lat) and math.isfinite(lng) and 0 < radius <= max_radius):
+        raise ValueError(radius)
+    include_raw_data = parse_bool(query_params.get('details'), default=True)
+    min_rating = query_params.get('min_rating')
+    min_rating = float(min_rating) if min_rating is not None else None
+    flags_mask = 0
+    for field, bit in FLAG_BITS.items():
+        if parse_bool(query_params.get(field)):
+            flags_mask |= bit
+    return lat, lng, radius, include_raw_data, flags_mask, min_rating
+
+
+def nearby_temples_queryset(include_raw_data):
+    temples = Temple.objects.all()
+    if include_raw_data:
+        temples = temples.select_related('details')
+    return temples
+
+
+def serialize_nearby_temples(matches, temples, include_raw_data):
+    """
+    Serialize grid matches (distance, temple_id) with the loaded temples, keeping
+    the grid's nearest-first order.
+    """
+    serializer_context = {'include_raw_data': include_raw_data}
+    nearby_temples = []
+    for distance, temple_id in matches:
+        temple = temples.get(temple_id)
+        if temple is None:
+            continue
+        temple_data = TempleSerializer(temple, context=serializer_context).data
+        temple_data['distance'] = round(distance, 2)  # Round to 2 decimal places
+        nearby_temples.append(temple_data)
+    return nearby_temples
+
+
+def encode_nearby_temples(nearby_temples):
+    """
+    The cached form of a nearby temples result: the temple ids, for the crowd
+    counts, and the encoded temple list.
+    """
+    return [temple['id'] for temple in nearby_temples], encode_json(nearby_temples)
+
+
+def nearby_temples_data(cached, crowd_counts):
+    """
+    Response data for an encoded nearby temples result, with the live crowd
+    counts of its temples (see CrowdTracker.counts()) added.
+    """
+    temple_ids, encoded_temples = cached
+    return {
+        "count": len(temple_ids),
+        "temples": JSONFragment(encoded_temples),
+        # Users at each listed temple right now; temples nobody is at are left out
+        "crowd_counts": crowd_counts,
+    }
+
+
 class ListNearbyTemples(APIView):
-    def _generate_cache_key(self, lat, lng, radius):
-        """
-        Generate a unique cache key based on the input parameters.
-        Round coordinates to 4 decimal places to ensure nearby requests hit the same cache.
-        """
-        # Round coordinates to reduce cache key variations for very close coordinates
-        rounded_lat = round(lat, 4)
-        rounded_lng = round(lng, 4)
-        rounded_radius = round(radius, 1)
-        
-        # Create a string with the parameters
-        params_str = f"nearby_temples:{rounded_lat}:{rounded_lng}:{rounded_radius}"
-        
-        # Create a hash of the parameters for a shorter key
-        return hashlib.md5(params_str.encode()).hexdigest()
+    # The temples, on a cache miss, and their crowd counts
+    query_budget = 2
 
     def get(self, request):
         """
@@ -250,58 +394,43 @@ class ListNearbyTemples(APIView):
         - lat: latitude (required)
         - lng: longitude (required)
         - radius: radius in kilometers (optional, default=5)
+        - details: include each temple's raw_data (optional, default=true; details=false leaves it out)
+        - srm, chadhava, puja, yatra: only temples with all the given flags set (optional)
+        - min_rating: only temples rated at least this (optional)
+        The response includes crowd_counts, the users at each temple right now.
         """
         try:
             # Get parameters from request
-            lat = float(request.query_params.get('lat'))
-            lng = float(request.query_params.get('lng'))
-            radius = float(request.query_params.get('radius', 5))  # Default 5km radius
+            lat, lng, radius, include_raw_data, flags_mask, min_rating = parse_nearby_temples_params(request.query_params)
 
             # Generate cache key
-            cache_key = self._generate_cache_key(lat, lng, radius)
+            cache_key = nearby_temples_cache_key(lat, lng, radius, include_raw_data, flags_mask, min_rating)
 
-            # Try to get data from cache
+            # Try to get data from cache; it holds the encoded temples, sent as is
             cached_data = cache.get(cache_key)
             if cached_data is not None:
-                return Response({"data": {"temples":json.loads(cached_data)}})
+                return Response({"data": nearby_temples_data(cached_data, crowd_tracker.counts(cached_data[0]))})
 
-            # Convert radius to degrees (approximate)
-            # 1 degree is approximately 111km at the equator
-            radius_degrees = radius / 111.0
-            
-            # Get temples within the bounding box
-            temples = Temple.objects.filter(
-                lat__range=(lat - radius_degrees, lat + radius_degrees),
-                lng__range=(lng - radius_degrees, lng + radius_degrees)
-            )
-            
-            nearby_temples = []
-            
-            # Calculate exact distances and filter temples within radius
-            for temple in temples:
-                distance = calculate_distance(
-                    lat, lng,
-                    temple.lat,
-                    temple.lng
-                )
-                
-                if distance <= radius:
-                    temple_data = TempleSerializer(temple).data
-                    temple_data['distance'] = round(distance, 2)  # Round to 2 decimal places
-                    nearby_temples.append(temple_data)
+            # The grid applies the attribute filters per cell before any distance math,
+            # so only matching temples within the radius are loaded from the database
+            matches = temple_grid.ensure_built().nearby(lat, lng, radius, flags_mask, min_rating)
+
+            temples = nearby_temples_queryset(include_raw_data).in_bulk([temple_id for _, temple_id in matches])
             
-            # Sort by distance
-            nearby_temples.sort(key=lambda x: x['distance'])
+            # Matches are already sorted by distance
+            nearby_temples = serialize_nearby_temples(matches, temples, include_raw_data)
+            cached_data = encode_nearby_temples(nearby_temples)
 
             # Cache the results
             cache_ttl = getattr(settings, 'NEARBY_TEMPLES_CACHE_TTL', 300)  # Default 5 minutes
-            cache.set(cache_key, json.dumps(nearby_temples), cache_ttl)
+            cache.set(cache_key, cached_data, cache_ttl)
             
-            return Response({"data": {"count": len(nearby_temples),"temples": nearby_temples}})
+            return Response({"data": nearby_temples_data(cached_data, crowd_tracker.counts(cached_data[0]))})
             
-        except ValueError as e:
+        except (ValueError, TypeError) as e:
             return Response(
-                {'error': 'Invalid parameters. lat and lng must be valid numbers.'},
+                {'error': 'Invalid parameters. lat, lng, radius and min_rating must be valid numbers, with a radius '
+                          f"up to {getattr(settings, 'NEARBY_TEMPLES_MAX_RADIUS', 100)} km."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
@@ -310,11 +439,216 @@ class ListNearbyTemples(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
+class SearchTemples(APIView):
+    query_budget = 0
+
+    def get(self, request):
+        """
+        Autocomplete temples by name from the in-memory name index.
+        Query parameters:
+        - q: search text (required)
+        - lat, lng: rank nearer temples higher (optional)
+        - limit: maximum number of results (optional, default=10, max=50)
+        """
+        try:
+            query = request.query_params.get('q', '')
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+            lat = request.query_params.get('lat')
+            lng = request.query_params.get('lng')
+            if lat is not None and lng is not None:
+                lat, lng = float(lat), float(lng)
+            else:
+                lat = lng = None
+
+            results = temple_name_index.ensure_built().search(query, limit=limit, lat=lat, lng=lng)
+
+            return Response({"data": {"count": len(results), "results": results}})
+
+        except ValueError:
+            return Response(
+                {'error': 'Invalid parameters. limit, lat and lng must be valid numbers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+def recent_reels_by_temple(temple_ids):
+    """
+    Latest reels (with like counts) for each of the given temples, in one query.
+    """
+    preview_size = getattr(settings, 'TEMPLE_DETAIL_REELS_PREVIEW', 5)
+    recent_reels = with_like_counts(
+        Reels.objects.filter(temple_id__in=temple_ids).select_related('temple')
+    ).annotate(
+        position=Window(RowNumber(), partition_by=F('temple_id'), order_by=F('created_at').desc())
+    ).filter(position__lte=preview_size).order_by('temple_id', 'position')
+
+    reels_by_temple = {temple_id: [] for temple_id in temple_ids}
+    for reel in recent_reels:
+        reels_by_temple[reel.temple_id].append(reel)
+    return reels_by_temple
+
+
+def render_temple_detail(temple, recent_reels=None, cards=None):
+    """
+    Build the representation cached per temple for the detail endpoints:
+    the temple with its raw_data and check-in count plus the latest reels.
+    Callers rendering several temples pass the user cards of all their reels.
+    """
+    if recent_reels is None:
+        recent_reels = recent_reels_by_temple([temple.pk])[temple.pk]
+
+    temple_data = TempleSerializer(temple, context={'include_raw_data': True}).data
+    reels_context = {'user_cards': cards} if cards is not None else {}
+    temple_data['recent_reels'] = ReelsSerializer(recent_reels, many=True, context=reels_context).data
+    return temple_data
+
+
+class GetTemple(APIView):
+    query_budget = 3
+
+    def get(self, request, pk):
+        """
+        Get a temple with its raw_data, check-in count and recent reels.
+        Served from a per-temple cache that signals invalidate on writes.
+        """
+        try:
+            cache_key = temple_detail_cache_key(pk)
+            cached_data = cache.get(cache_key)
+            if cached_data is not None:
+                return Response({"data": JSONFragment(cached_data)})
+
+            temple = get_object_or_404(Temple.objects.select_related('details'), pk=pk)
+            temple_data = render_temple_detail(temple)
+
+            cache_ttl = getattr(settings, 'TEMPLE_DETAIL_CACHE_TTL', 3600)
+            cache.set(cache_key, encode_json(temple_data), cache_ttl)
+
+            return Response({"data": temple_data})
+
+        except Http404:
+            return Response({'error': 'Temple not found'}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ListTemplesBulk(APIView):
+    query_budget = 3
+    MAX_IDS = 100
+
+    def get(self, request):
+        """
+        Get many temples at once from the per-temple detail cache.
+        Query parameters:
+        - ids: comma separated temple ids (required, at most 100)
+        """
+        try:
+            temple_ids = [int(temple_id) for temple_id in request.query_params.get('ids', '').split(',') if temple_id]
+            if not temple_ids or len(temple_ids) > self.MAX_IDS:
+                return Response(
+                    {'error': f'Provide between 1 and {self.MAX_IDS} temple ids.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # One multi-get for every requested temple
+            cache_keys = {temple_id: temple_detail_cache_key(temple_id) for temple_id in temple_ids}
+            cached = cache.get_many(cache_keys.values())
+            temples_data = {
+                temple_id: JSONFragment(cached[cache_key])
+                for temple_id, cache_key in cache_keys.items()
+                if cache_key in cached
+            }
+
+            # Render and cache the misses in one pass
+            missing_ids = [temple_id for temple_id in cache_keys if temple_id not in temples_data]
+            if missing_ids:
+                to_cache = {}
+                reels_by_temple = recent_reels_by_temple(missing_ids)
+                cards = user_cards({reel.user_id for reels in reels_by_temple.values() for reel in reels})
+                for temple in Temple.objects.select_related('details').filter(pk__in=missing_ids):
+                    temples_data[temple.pk] = render_temple_detail(temple, reels_by_temple[temple.pk], cards)
+                    to_cache[cache_keys[temple.pk]] = encode_json(temples_data[temple.pk])
+                cache_ttl = getattr(settings, 'TEMPLE_DETAIL_CACHE_TTL', 3600)
+                cache.set_many(to_cache, cache_ttl)
+
+            return Response({
+                "data": {
+                    "temples": [temples_data[temple_id] for temple_id in cache_keys if temple_id in temples_data],
+                    "not_found": [temple_id for temple_id in cache_keys if temple_id not in temples_data],
+                }
+            })
+
+        except ValueError:
+            return Response(
+                {'error': 'Invalid parameters. ids must be comma separated integers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class TempleCrowdCounts(APIView):
+    query_budget = 1
+    MAX_IDS = 500
+
+    def get(self, request):
+        """
+        Users at each of the given temples right now, from their location
+        pings. Temples nobody is at are left out.
+        Query parameters:
+        - ids: comma separated temple ids (required, at most 500)
+        """
+        try:
+            temple_ids = [int(temple_id) for temple_id in request.query_params.get('ids', '').split(',') if temple_id]
+            if not temple_ids or len(temple_ids) > self.MAX_IDS:
+                return Response(
+                    {'error': f'Provide between 1 and {self.MAX_IDS} temple ids.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            return Response({"data": {"crowd_counts": crowd_tracker.counts(temple_ids)}})
+
+        except ValueError:
+            return Response(
+                {'error': 'Invalid parameters. ids must be comma separated integers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class ListCreateTempleCheckIn(generics.ListCreateAPIView):
+    # A check-in also opens a transaction, updates the user's stats and
+    # moves the list's version stamp
+    query_budget = {'get': 4, 'post': 10}
+    # Check-in lists are rendered on every request; level 1 keeps most of
+    # the size reduction for under half the CPU of level 6
+    compression = {'level': 1}
     serializer_class = UserTempleCheckinSerializer
+
+    def _include_raw_data(self):
+        return parse_bool(self.request.query_params.get('details'), default=True)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_raw_data'] = self._include_raw_data()
+        return context
     
     def get_queryset(self):
-        queryset = UserTempleCheckin.objects.all()
+        queryset = UserTempleCheckin.objects.select_related('temple')
         temple_id = self.kwargs.get('pk')
         user_id = self.request.query_params.get('user_id', None)
         
@@ -322,35 +656,41 @@ class ListCreateTempleCheckIn(generics.ListCreateAPIView):
             queryset = queryset.filter(temple_id=temple_id)
         if user_id:
             queryset = queryset.filter(user_id=user_id)
+        if self._include_raw_data():
+            queryset = queryset.select_related('temple__details')
             
         return queryset.order_by('-checkin_time')
 
     def list(self, request, *args, **kwargs):
+        # Answered from the list's version stamps when the client's copy is current
+        validators = activity_validators('checkins', self.kwargs.get('pk'))
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+
         queryset = self.get_queryset()
         
         # Group check-ins by user and count
-        user_checkins = queryset.values(
-            'user',
-            'user__name'
-        ).annotate(
+        user_checkins = list(queryset.values('user').annotate(
             checkin_count=Count('id')
-        ).order_by('-checkin_count')
-        
-        # Get all check-ins for serialization
-        checkins = self.get_serializer(queryset, many=True).data
-        
-        return Response({
+        ).order_by('-checkin_count'))
+
+        # The check-ins and the counts share one lookup of the users' cards
+        cards = user_cards({row['user'] for row in user_checkins})
+        checkins = self.get_serializer(queryset, many=True, context={**self.get_serializer_context(), 'user_cards': cards}).data
+
+        return set_validators(Response({
             "data": {
                 "checkins": checkins,
-                "user_counts": list(user_checkins)
+                "user_counts": with_user_names(user_checkins, cards)
             }
-        })
+        }), validators)
     
     def create(self, request, *args, **kwargs):
         try:
             # Get temple_id from URL
             temple_id = kwargs.get('pk')
-            temple = get_object_or_404(Temple, pk=temple_id)
+            temple = get_object_or_404(Temple.objects.select_related('details'), pk=temple_id)
             
             # Get user_id from request
             user_id = request.data.get('user')
@@ -361,12 +701,7 @@ class ListCreateTempleCheckIn(generics.ListCreateAPIView):
                 )
             
             # Check if user has checked in within last 6 hours
-            six_hours_ago = timezone.now() - timedelta(hours=6)
-            recent_checkin = UserTempleCheckin.objects.filter(
-                user_id=user_id,
-                temple_id=temple_id,
-                checkin_time__gte=six_hours_ago
-            ).first()
+            recent_checkin = recent_checkin_for(user_id, temple_id)
             
             if recent_checkin:
                 return Response(
@@ -382,12 +717,16 @@ class ListCreateTempleCheckIn(generics.ListCreateAPIView):
             
             serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
-                # Increment the temple's checkin_count
-                temple.checkin_count = F('checkin_count') + 1
-                temple.save()
-                
-                # Create the check-in
-                self.perform_create(serializer)
+                # The counters (this one and the user's stats, updated by
+                # signals) commit together with the check-in
+                with transaction.atomic():
+                    # Increment the temple's checkin_count
+                    temple.checkin_count = F('checkin_count') + 1
+                    temple.save(update_fields=['checkin_count', 'updated_at'])
+
+                    # Create the check-in, on the temple loaded above so the
+                    # response's raw data needs no query of its own
+                    serializer.save(temple=temple)
                 return Response({"data": serializer.data}, status=status.HTTP_201_CREATED)
             return Response({"data": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -397,167 +736,489 @@ class ListCreateTempleCheckIn(generics.ListCreateAPIView):
             )
 
 
+def ranked_checkins(temple_id):
+    """
+    Check-in counts per user for a temple, highest first, with their rank.
+    """
+    # Get all check-ins for this temple grouped by user with rank
+    user_checkins = list(UserTempleCheckin.objects.filter(
+        temple_id=temple_id
+    ).values('user_id').annotate(
+        checkin_count=Count('id')
+    ).order_by('-checkin_count'))
+    cards = user_cards({checkin['user_id'] for checkin in user_checkins})
+
+    # Add rank to each user's check-in count
+    ranked_checkins = []
+    for rank, checkin in enumerate(with_user_names(user_checkins, cards, 'user_id'), start=1):
+        checkin['rank'] = rank
+        ranked_checkins.append(checkin)
+    return ranked_checkins
+
+
+def recent_checkin_for(user_id, temple_id):
+    """
+    The user's check-in at the temple within the cooldown window, if any.
+    """
+    return UserTempleCheckin.objects.select_related('user', 'temple__details').filter(
+        user_id=user_id,
+        temple_id=temple_id,
+        checkin_time__gte=timezone.now() - CHECKIN_COOLDOWN
+    ).first()
+
+
+def checkin_range(query_params, temple):
+    """
+    (is_within_range, distance_message) for the lat/lng query parameters.
+    """
+    # Get user's current location from query params
+    user_lat = query_params.get('lat')
+    user_lng = query_params.get('lng')
+    
+    # Check if user is within 200 meters of temple
+    is_within_range = False
+    distance_message = None
+    if user_lat and user_lng:
+        try:
+            user_lat = float(user_lat)
+            user_lng = float(user_lng)
+            distance = calculate_distance(
+                user_lat, user_lng,
+                temple.lat, temple.lng
+            )
+            is_within_range = distance <= CHECKIN_RADIUS_KM
+            if not is_within_range:
+                distance_message = f"You are {round(distance * 1000)} meters away from the temple. Please come within 200 meters to check in."
+        except (ValueError, TypeError):
+            distance_message = "Invalid location coordinates provided."
+    return is_within_range, distance_message
+
+
+def checkin_status(query_params, temple, recent_checkin, ranked_checkins):
+    """
+    Response data for a user's check-in status at a temple.
+    """
+    is_within_range, distance_message = checkin_range(query_params, temple)
+    
+    # Calculate hours remaining until next check-in
+    hours_remaining = None
+    if recent_checkin:
+        next_checkin_time = recent_checkin.checkin_time + CHECKIN_COOLDOWN
+        hours_remaining = round((next_checkin_time - timezone.now()).total_seconds() / 3600, 1)
+    
+    return {
+        "user": UserTempleCheckinSerializer(recent_checkin).data,
+        "checkin_counts": ranked_checkins,
+        "checkin_enabled": not bool(recent_checkin) and is_within_range,
+        "last_checkin_time": recent_checkin.checkin_time if recent_checkin else None,
+        "next_checkin_available_after": hours_remaining,
+        "is_within_range": is_within_range,
+        "distance_message": distance_message
+    }
+
+
+def no_checkin_status(query_params, temple, ranked_checkins):
+    """
+    Response data when the user has never checked in at the temple.
+    """
+    is_within_range, distance_message = checkin_range(query_params, temple)
+    return {
+        "user": None,
+        "checkin_counts": ranked_checkins,
+        "checkin_enabled": is_within_range,
+        "last_checkin_time": None,
+        "next_checkin_available_after": None,
+        "is_within_range": is_within_range,
+        "distance_message": distance_message
+    }
+
+
 class GetUserTempleCheckIn(APIView):
+    query_budget = 5
+
     def get(self, request, user_id, temple_id):
         """
         Get a specific temple check-in by user_id and temple_id along with check-in counts
         """
         try:
-            # Get the specific check-in
-            checkin = get_object_or_404(
-                UserTempleCheckin.objects.select_related('user', 'temple'),
+            # Get the user's latest check-in; users usually have several at a temple
+            checkin = UserTempleCheckin.objects.select_related('user', 'temple').filter(
                 user_id=user_id,
                 temple_id=temple_id
-            )
-            
-            # Get temple coordinates
-            temple = checkin.temple
-            
-            # Get user's current location from query params
-            user_lat = request.query_params.get('lat')
-            user_lng = request.query_params.get('lng')
-            
-            # Check if user is within 200 meters of temple
-            is_within_range = False
-            distance_message = None
-            if user_lat and user_lng:
-                try:
-                    user_lat = float(user_lat)
-                    user_lng = float(user_lng)
-                    distance = calculate_distance(
-                        user_lat, user_lng,
-                        temple.lat, temple.lng
-                    )
-                    # Convert 200 meters to kilometers (0.2 km)
-                    is_within_range = distance <= 0.2
-                    if not is_within_range:
-                        distance_message = f"You are {round(distance * 1000)} meters away from the temple. Please come within 200 meters to check in."
-                except (ValueError, TypeError):
-                    distance_message = "Invalid location coordinates provided."
+            ).order_by('-checkin_time').first()
+            if checkin is None:
+                raise Http404
             
             # Check if user has checked in within last 6 hours
-            six_hours_ago = timezone.now() - timedelta(hours=6)
-            recent_checkin = UserTempleCheckin.objects.filter(
-                user_id=user_id,
-                temple_id=temple_id,
-                checkin_time__gte=six_hours_ago
-            ).first()
-            
-            # Calculate hours remaining until next check-in
-            hours_remaining = None
-            if recent_checkin:
-                next_checkin_time = recent_checkin.checkin_time + timedelta(hours=6)
-                hours_remaining = round((next_checkin_time - timezone.now()).total_seconds() / 3600, 1)
-            
-            # Get all check-ins for this temple grouped by user with rank
-            user_checkins = UserTempleCheckin.objects.filter(
-                temple_id=temple_id
-            ).values(
-                'user_id',
-                'user__name'
-            ).annotate(
-                checkin_count=Count('id')
-            ).order_by('-checkin_count')
-            
-            # Add rank to each user's check-in count
-            ranked_checkins = []
-            for rank, checkin in enumerate(user_checkins, start=1):
-                checkin['rank'] = rank
-                ranked_checkins.append(checkin)
-            
-            serializer = UserTempleCheckinSerializer(recent_checkin)
+            recent_checkin = recent_checkin_for(user_id, temple_id)
 
             return Response({
-                "data": {
-                    "user": serializer.data,
-                    "checkin_counts": ranked_checkins,
-                    "checkin_enabled": not bool(recent_checkin) and is_within_range,
-                    "last_checkin_time": recent_checkin.checkin_time if recent_checkin else None,
-                    "next_checkin_available_after": hours_remaining,
-                    "is_within_range": is_within_range,
-                    "distance_message": distance_message
-                }
+                "data": checkin_status(request.query_params, checkin.temple, recent_checkin, ranked_checkins(temple_id))
             })
         except Exception as e:
             # Get check-in counts even if user check-in not found
-            user_checkins = UserTempleCheckin.objects.filter(
-                temple_id=temple_id
-            ).values(
-                'user_id',
-                'user__name'
-            ).annotate(
-                checkin_count=Count('id')
-            ).order_by('-checkin_count')
-            
-            # Add rank to each user's check-in count
-            ranked_checkins = []
-            for rank, checkin in enumerate(user_checkins, start=1):
-                checkin['rank'] = rank
-                ranked_checkins.append(checkin)
+            user_checkins = ranked_checkins(temple_id)
             
             # Get temple coordinates
             temple = get_object_or_404(Temple, pk=temple_id)
             
-            # Get user's current location from query params
-            user_lat = request.query_params.get('lat')
-            user_lng = request.query_params.get('lng')
-            
-            # Check if user is within 200 meters of temple
-            is_within_range = False
-            distance_message = None
-            if user_lat and user_lng:
-                try:
-                    user_lat = float(user_lat)
-                    user_lng = float(user_lng)
-                    distance = calculate_distance(
-                        user_lat, user_lng,
-                        temple.lat, temple.lng
-                    )
-                    # Convert 200 meters to kilometers (0.2 km)
-                    is_within_range = distance <= 0.2
-                    if not is_within_range:
-                        distance_message = f"You are {round(distance * 1000)} meters away from the temple. Please come within 200 meters to check in."
-                except (ValueError, TypeError):
-                    distance_message = "Invalid location coordinates provided."
-            
+            return Response({
+                "data": no_checkin_status(request.query_params, temple, user_checkins)
+            }, status=status.HTTP_200_OK)
+
+
+def recent_checkin_times(user_id, temple_ids):
+    """
+    {temple_id: time of the user's latest check-in within the cooldown
+    window} for those of the temples the user checked in at. Read from the
+    database, which every process sees alike, in one query on the
+    (user, temple, checkin_time) index.
+    """
+    return dict(
+        UserTempleCheckin.objects.filter(
+            user_id=user_id,
+            temple_id__in=temple_ids,
+            checkin_time__gte=timezone.now() - CHECKIN_COOLDOWN
+        ).values('temple_id').annotate(
+            latest=Max('checkin_time')
+        ).values_list('temple_id', 'latest')
+    )
+
+
+class TempleGeofence(APIView):
+    query_budget = 1
+
+    def get(self, request):
+        """
+        Temples whose check-in geofence contains a point, nearest first, with
+        the user's check-in cooldown at each. Answered from the in-memory
+        geofence grid and at most one indexed query, so clients can call it
+        on every location update.
+        Query parameters:
+        - lat: latitude (required)
+        - lng: longitude (required)
+        - user_id: user whose cooldown to include (optional)
+        """
+        try:
+            lat = float(request.query_params.get('lat'))
+            lng = float(request.query_params.get('lng'))
+            user_id = request.query_params.get('user_id')
+
+            matches = temple_geofences.ensure_built().containing(lat, lng)
+            checkin_times = recent_checkin_times(user_id, [temple_id for _, temple_id, *_ in matches]) if user_id and matches else {}
+
+            now = timezone.now()
+            temples = []
+            for distance, temple_id, name, temple_lat, temple_lng in matches:
+                last_checkin_time = checkin_times.get(temple_id)
+                hours_remaining = None
+                if last_checkin_time is not None:
+                    hours_remaining = round((last_checkin_time + CHECKIN_COOLDOWN - now).total_seconds() / 3600, 1)
+                temples.append({
+                    "id": temple_id,
+                    "name": name,
+                    "lat": temple_lat,
+                    "lng": temple_lng,
+                    "distance": round(distance, 3),
+                    "checkin_enabled": last_checkin_time is None,
+                    "last_checkin_time": last_checkin_time,
+                    "next_checkin_available_after": hours_remaining,
+                })
+
+            return Response({"data": {"count": len(temples), "temples": temples}})
+
+        except (ValueError, TypeError):
+            return Response(
+                {'error': 'Invalid parameters. lat and lng must be valid numbers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class TempleViewport(APIView):
+    query_budget = 0
+    # Viewports holding more temples than this get clusters even at detail zoom
+    MAX_TEMPLES = 500
+
+    def get(self, request):
+        """
+        Temples in a map viewport. Below the detail zoom level they come as
+        clusters (count, centroid and the highest rated temple) from the
+        precomputed cluster pyramid; from it on, one by one.
+        Query parameters:
+        - min_lat, min_lng, max_lat, max_lng: bounding box (required)
+        - zoom: map zoom level (required)
+        """
+        try:
+            min_lat = float(request.query_params.get('min_lat'))
+            min_lng = float(request.query_params.get('min_lng'))
+            max_lat = float(request.query_params.get('max_lat'))
+            max_lng = float(request.query_params.get('max_lng'))
+            zoom = int(request.query_params.get('zoom'))
+            check_bounds(min_lat, min_lng, max_lat, max_lng)
+            if zoom < 0:
+                raise ValueError('Invalid viewport')
+
+            pyramid = temple_clusters.ensure_built()
+            temples = None
+            if zoom >= DETAIL_ZOOM:
+                temples = pyramid.temples(min_lat, min_lng, max_lat, max_lng, self.MAX_TEMPLES)
+            if temples is not None:
+                return Response({"data": {
+                    "zoom": zoom,
+                    "clustered": False,
+                    "count": len(temples),
+                    "temples": [
+                        {"id": temple_id, "name": name, "lat": lat, "lng": lng, "rating": rating}
+                        for temple_id, name, lat, lng, rating in temples
+                    ],
+                }})
+
+            clusters = pyramid.clusters(min_lat, min_lng, max_lat, max_lng, zoom)
+            return Response({"data": {
+                "zoom": zoom,
+                "clustered": True,
+                "count": sum(cluster["count"] for cluster in clusters),
+                "clusters": clusters,
+            }})
+
+        except (ValueError, TypeError):
+            return Response(
+                {'error': 'Invalid parameters. min_lat, min_lng, max_lat and max_lng must be numbers '
+                          'describing a bounding box within latitudes -90 to 90 and longitudes -180 to 180, '
+                          'and zoom a non-negative integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PlanYatraRoute(APIView):
+    query_budget = 1
+    MAX_TEMPLES = 200
+
+    def get(self, request):
+        """
+        Order in which to visit a set of temples from a start point, planned
+        with nearest neighbour and 2-opt over a cached distance matrix.
+        Query parameters:
+        - lat: start latitude (required)
+        - lng: start longitude (required)
+        - ids: comma separated temple ids (at most 200)
+        - radius: without ids, plan over the yatra temples within this many km
+          of the start (the nearest 200; at most NEARBY_TEMPLES_MAX_RADIUS)
+        - round_trip: whether the route returns to the start (default: false)
+        """
+        try:
+            lat = float(request.query_params.get('lat'))
+            lng = float(request.query_params.get('lng'))
+            round_trip = parse_bool(request.query_params.get('round_trip'))
+            ids_param = request.query_params.get('ids')
+            if ids_param:
+                temple_ids = list(dict.fromkeys(int(temple_id) for temple_id in ids_param.split(',') if temple_id))
+            elif request.query_params.get('radius'):
+                radius = float(request.query_params.get('radius'))
+                # Bounded like nearby temples, whose grid lookup this shares
+                max_radius = getattr(settings, 'NEARBY_TEMPLES_MAX_RADIUS', 100)
+                if not (math.isfinite(lat) and math.isfinite(lng) and 0 < radius <= max_radius):
+                    raise ValueError(radius)
+                matches = temple_grid.ensure_built().nearby(lat, lng, radius, FLAG_BITS['yatra'])
+                temple_ids = [temple_id for _, temple_id in matches[:self.MAX_TEMPLES]]
+            else:
+                raise ValueError('ids or radius is required')
+            if len(temple_ids) > self.MAX_TEMPLES:
+                return Response(
+                    {'error': f'A route can visit at most {self.MAX_TEMPLES} temples.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            rows = list(Temple.objects.filter(pk__in=temple_ids).order_by('id').values_list('id', 'name', 'lat', 'lng'))
+            order, total_distance = plan_route(
+                (lat, lng), [(temple_id, temple_lat, temple_lng) for temple_id, _, temple_lat, temple_lng in rows], round_trip
+            )
+
+            temples = []
+            previous_lat, previous_lng = lat, lng
+            for position in order:
+                temple_id, name, temple_lat, temple_lng = rows[position]
+                temples.append({
+                    "id": temple_id,
+                    "name": name,
+                    "lat": temple_lat,
+                    "lng": temple_lng,
+                    "leg_distance": round(calculate_distance(previous_lat, previous_lng, temple_lat, temple_lng), 2),
+                })
+                previous_lat, previous_lng = temple_lat, temple_lng
+
+            found_ids = {row[0] for row in rows}
             return Response({
                 "data": {
-                    "user": None,
-                    "checkin_counts": ranked_checkins,
-                    "checkin_enabled": is_within_range,
-                    "last_checkin_time": None,
-                    "next_checkin_available_after": None,
-                    "is_within_range": is_within_range,
-                    "distance_message": distance_message
+                    "count": len(temples),
+                    "round_trip": round_trip,
+                    "total_distance": round(total_distance, 2),
+                    "temples": temples,
+                    "not_found": [temple_id for temple_id in temple_ids if temple_id not in found_ids],
                 }
-            }, status=status.HTTP_200_OK)
+            })
+
+        except (ValueError, TypeError):
+            return Response(
+                {'error': 'Invalid parameters. lat, lng and radius must be valid numbers, ids comma separated '
+                          'integers, and either ids or radius is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+def temple_reels_queryset(temple_id):
+    return Reels.objects.filter(temple_id=temple_id).select_related('temple').order_by('-created_at')
+
+
+def reel_user_counts(queryset):
+    # Group reels by user and count; with_user_names() adds the names
+    return queryset.values('user').annotate(
+        reel_count=Count('id')
+    ).order_by('-reel_count')
 
 
 class ListTempleReels(generics.ListAPIView):
+    query_budget = 4
     serializer_class = ReelsSerializer
     
     def get_queryset(self):
-        temple_id = self.kwargs.get('pk')
-        return Reels.objects.filter(temple_id=temple_id).select_related('user', 'temple').order_by('-created_at')
+        return temple_reels_queryset(self.kwargs.get('pk'))
 
     def list(self, request, *args, **kwargs):
+        validators = activity_validators('reels', self.kwargs.get('pk'))
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+
         queryset = self.get_queryset()
-        
-        # Group reels by user and count
-        user_reels = queryset.values(
-            'user',
-            'user__name'
-        ).annotate(
-            reel_count=Count('id')
-        ).order_by('-reel_count')
-        
-        # Get all reels for serialization
-        reels = self.get_serializer(queryset, many=True).data
-        
-        return Response({
+
+        # Get all reels, with like counts in the same query; the counts
+        # reuse the reels' lookup of the users' cards
+        reels = list(with_like_counts(queryset))
+        cards = user_cards({reel.user_id for reel in reels})
+        user_reels = with_user_names(reel_user_counts(queryset), cards)
+
+        return set_validators(Response({
             "data": {
-                "reels": reels,
-                "user_counts": list(user_reels)
+                "reels": self.get_serializer(reels, many=True, context={**self.get_serializer_context(), 'user_cards': cards}).data,
+                "user_counts": user_reels
             }
-        })
+        }), validators)
+
+
+
+class PerformanceMetrics(APIView):
+    query_budget = 0
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Per-endpoint latency histograms for this worker process.
+        Query parameters:
+        - reset: clear the histograms after reading them (optional)
+        """
+        snapshot = endpoint_stats.snapshot()
+        if parse_bool(request.query_params.get('reset')):
+            endpoint_stats.reset()
+        return Response({"data": {"endpoints": snapshot}})
+
+
+class ExportRows(APIView):
+    # The watermark query; the chunks are read while the response streams
+    query_budget = 1
+    permission_classes = [IsAdminUser]
+    batchable = False
 
+    def perform_content_negotiation(self, request, force=False):
+        # format= picks the export format, not one of DRF's renderers; errors
+        # fall back to the default renderer instead of a 404
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, table):
+        """
+        Stream the check-ins, locations or reels created in a time range,
+        oldest first. The X-Export-Watermark header holds the position of the
+        last row; passing it back as after= exports only newer rows.
+        Query parameters:
+        - format: ndjson (default) or csv
+        - since: ISO 8601 datetime, rows created at or after it (optional)
+        - until: ISO 8601 datetime, rows created before it (optional)
+        - after: watermark of an earlier export (optional)
+        """
+        try:
+            export_format = request.query_params.get('format', 'ndjson')
+            after = request.query_params.get('after')
+            export = Export(
+                table,
+                since=parse_time(request.query_params.get('since'), 'since'),
+                until=parse_time(request.query_params.get('until'), 'until'),
+                after=parse_watermark(after) if after else None,
+            )
+            response = StreamingHttpResponse(export.stream(export_format), content_type=FORMATS[export_format])
+            if export.watermark:
+                response['X-Export-Watermark'] = export.watermark
+            if export_format == 'csv':
+                response['Content-Disposition'] = f'attachment; filename="{table}.csv"'
+            return response
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BatchRequests(APIView):
+    # Replaced by the sum of the sub-requests' budgets once they are resolved
+    query_budget = 0
+    batchable = False
+
+    def post(self, request):
+        """
+        Run several API requests in one round trip and return their
+        responses in order. Consecutive GET requests run in parallel; writes
+        run one at a time, in order. The sub-requests share the client's
+        session and one request cache, so a user card or other cached entry
+        is fetched once per batch.
+        Request body:
+        - requests: list of {"method": "GET", "path": "/api/nearby-temples",
+          "query": {...}, "headers": {...}, "body": {...}}; method defaults
+          to GET, the rest is optional (max BATCH_MAX_REQUESTS). headers may
+          hold If-None-Match and If-Modified-Since; responses carrying an
+          ETag or Last-Modified report them under "headers"
+        """
+        try:
+            specs = request.data.get('requests') if isinstance(request.data, dict) else None
+            if not isinstance(specs, list) or not specs:
+                return Response({'error': 'requests must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+            max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+            if len(specs) > max_requests:
+                return Response({'error': f'At most {max_requests} requests per batch'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                sub_requests = [SubRequest(request._request, spec) for spec in specs]
+            except BatchError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            query_log = getattr(request._request, '_query_log', None)
+            if query_log is not None:
+                budgets = [sub_request.budget() for sub_request in sub_requests]
+                query_log.budget = None if None in budgets else sum(budgets)
+
+            with request_cache():
+                responses = run_batch(sub_requests)
+            return Response({"data": {"responses": responses}})
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
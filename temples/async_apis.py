@@ -0,0 +1,249 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+
+from .apis import (
+    checkin_status, encode_nearby_temples, latest_location_times_near, latest_locations_at, locations_within,
+    nearby_temples_cache_key, nearby_temples_data, nearby_temples_queryset, no_checkin_status, not_modified,
+    parse_nearby_temples_params, ranked_checkins, recent_checkin_for, reel_user_counts, serialize_nearby_temples,
+    serialize_nearby_users, set_validators, temple_reels_queryset,
+)
+from .caches import aactivity_validators, atemples_version
+from .crowd import crowd_tracker
+from .live import EventStream, nearby_users_hub
+from .models import Temple, UserTempleCheckin
+from .renderers import TimedJSONRenderer
+from .serializers import ReelsSerializer, with_like_counts
+from .spatial import temple_grid
+from .user_cards import auser_cards, with_user_names
+
+
+# Async versions of the geo and feed endpoints, served under api/async/ by an
+# ASGI server. They return the same payloads as their APIView counterparts
+# in apis.py, which stay the WSGI entry points.
+
+
+renderer = TimedJSONRenderer()
+
+# Threads, and so database connections, available to the concurrent reads of
+# all async requests in this process together
+query_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_QUERY_THREADS', 32), thread_name_prefix='async-query'
+)
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    # Rendered with the same renderer as the DRF views so both paths return identical bytes
+    return HttpResponse(renderer.render(data), content_type='application/json', status=status)
+
+
+async def run_in_thread(func, *args):
+    """
+    Run a blocking ORM call on a thread of query_executor.
+
+    The async ORM sends every query of a request to one shared thread, so
+    queries gathered with asyncio.gather() would still run one after another.
+    Independent reads go through here instead so they overlap. Each executor
+    thread keeps its connection between calls, making the executor a pool of
+    ASYNC_QUERY_THREADS connections; a connection that failed is dropped.
+    """
+    def call():
+        try:
+            return func(*args)
+        except Exception:
+            close_old_connections()
+            raise
+    return await sync_to_async(call, thread_sensitive=False, executor=query_executor)()
+
+
+class AsyncListNearbyTemples(View):
+    query_budget = 2
+
+    async def get(self, request):
+        """
+        Async version of ListNearbyTemples, with the same query parameters.
+        """
+        try:
+            lat, lng, radius, include_raw_data, flags_mask, min_rating = parse_nearby_temples_params(request.GET)
+
+            version = await atemples_version()
+            cache_key = nearby_temples_cache_key(lat, lng, radius, include_raw_data, flags_mask, min_rating, version)
+
+            cached_data = await cache.aget(cache_key)
+            if cached_data is not None:
+                return json_response({"data": nearby_temples_data(cached_data, await crowd_tracker.acounts(cached_data[0]))})
+
+            # Rebuilding the grid reads every temple, so it happens off the event loop
+            if not temple_grid.is_current(version):
+                await sync_to_async(temple_grid.ensure_built)()
+            matches = temple_grid.nearby(lat, lng, radius, flags_mask, min_rating)
+
+            temples = await nearby_temples_queryset(include_raw_data).ain_bulk([temple_id for _, temple_id in matches])
+            nearby_temples = serialize_nearby_temples(matches, temples, include_raw_data)
+            cached_data = encode_nearby_temples(nearby_temples)
+
+            cache_ttl = getattr(settings, 'NEARBY_TEMPLES_CACHE_TTL', 300)  # Default 5 minutes
+            await cache.aset(cache_key, cached_data, cache_ttl)
+
+            return json_response({"data": nearby_temples_data(cached_data, await crowd_tracker.acounts(cached_data[0]))})
+
+        except (ValueError, TypeError):
+            return json_response(
+                {'error': 'Invalid parameters. lat, lng, radius and min_rating must be valid numbers, with a radius '
+                          f"up to {getattr(settings, 'NEARBY_TEMPLES_MAX_RADIUS', 100)} km."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return json_response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncListNearbyUsers(View):
+    query_budget = 3
+
+    async def get(self, request):
+        """
+        Async version of ListNearbyUsers, with the same query parameters.
+        """
+        try:
+            lat = float(request.GET.get('lat'))
+            lng = float(request.GET.get('lng'))
+            radius = float(request.GET.get('radius', 2))  # Default 2km radius
+
+            # The second query needs the first one's results, so they run in sequence
+            location_times = [loc async for loc in latest_location_times_near(lat, lng, radius)]
+            latest_locations = [location async for location in latest_locations_at(location_times)]
+            nearby_locations = locations_within(latest_locations, lat, lng, radius)
+            cards = await auser_cards({location.user_id for _, location in nearby_locations})
+            nearby_users = serialize_nearby_users(nearby_locations, cards)
+
+            return json_response({"data": {
+                'count': len(nearby_users),
+                'results': nearby_users
+            }})
+
+        except (ValueError, TypeError):
+            return json_response({
+                'error': 'Invalid parameters. Please provide valid lat, lng, and radius values.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return json_response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncNearbyUsersStream(View):
+    query_budget = 3
+    MAX_RADIUS = 50
+
+    async def get(self, request):
+        """
+        Server-sent events for the users near a point, replacing polling of
+        nearby-users. The first event is a "snapshot" with the nearby-users
+        payload; after that each location ping sends "enter" (the user's
+        nearby-users entry), "move" (user_id, last_lat, last_lng, distance)
+        or "leave" (user_id). Clients should treat "enter" as an upsert.
+
+        Query parameters:
+        - lat: Latitude of the point
+        - lng: Longitude of the point
+        - radius: Search radius in kilometers (default: 2, at most 50)
+        """
+        try:
+            lat = float(request.GET.get('lat'))
+            lng = float(request.GET.get('lng'))
+            radius = float(request.GET.get('radius', 2))  # Default 2km radius
+            if not 0 < radius <= self.MAX_RADIUS:
+                raise ValueError(radius)
+        except (ValueError, TypeError):
+            return json_response({
+                'error': f'Invalid parameters. Please provide valid lat, lng, and a radius up to {self.MAX_RADIUS} km.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Subscribed before the snapshot is read, so no ping in between is missed
+        subscription = nearby_users_hub.subscribe(lat, lng, radius)
+        try:
+            location_times = [loc async for loc in latest_location_times_near(lat, lng, radius)]
+            latest_locations = [location async for location in latest_locations_at(location_times)]
+            nearby_locations = locations_within(latest_locations, lat, lng, radius)
+            cards = await auser_cards({location.user_id for _, location in nearby_locations})
+            nearby_users = serialize_nearby_users(nearby_locations, cards)
+            nearby_users_hub.mark_visible(subscription, [user['user_id'] for user in nearby_users])
+        except Exception as e:
+            nearby_users_hub.unsubscribe(subscription)
+            return json_response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        snapshot = ('snapshot', {'count': len(nearby_users), 'results': nearby_users})
+        response = StreamingHttpResponse(
+            EventStream(nearby_users_hub, subscription, [snapshot]), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class AsyncListTempleReels(View):
+    query_budget = 4
+
+    async def get(self, request, pk):
+        """
+        Async version of ListTempleReels. The reels and the per-user counts
+        are loaded concurrently, then the users' cards in one lookup.
+        """
+        try:
+            validators = await aactivity_validators('reels', pk)
+            response = not_modified(request, validators)
+            if response is not None:
+                return response
+
+            queryset = temple_reels_queryset(pk)
+            reels, user_reels = await asyncio.gather(
+                run_in_thread(list, with_like_counts(queryset)),
+                run_in_thread(list, reel_user_counts(queryset)),
+            )
+            cards = await auser_cards({row['user'] for row in user_reels})
+            return set_validators(json_response({
+                "data": {
+                    "reels": ReelsSerializer(reels, many=True, context={'user_cards': cards}).data,
+                    "user_counts": with_user_names(user_reels, cards)
+                }
+            }), validators)
+        except Exception as e:
+            return json_response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncGetUserTempleCheckIn(View):
+    query_budget = 5
+
+    async def get(self, request, user_id, temple_id):
+        """
+        Async version of GetUserTempleCheckIn. The user's check-in, the
+        cooldown check and the leaderboard are loaded concurrently.
+        """
+        try:
+            checkin, recent_checkin, leaderboard = await asyncio.gather(
+                run_in_thread(
+                    UserTempleCheckin.objects.select_related('user', 'temple').filter(
+                        user_id=user_id, temple_id=temple_id
+                    ).order_by('-checkin_time').first
+                ),
+                run_in_thread(recent_checkin_for, user_id, temple_id),
+                run_in_thread(ranked_checkins, temple_id),
+            )
+
+            if checkin is not None:
+                data = checkin_status(request.GET, checkin.temple, recent_checkin, leaderboard)
+            else:
+                temple = await Temple.objects.filter(pk=temple_id).afirst()
+                if temple is None:
+                    return json_response({'detail': 'No Temple matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+                data = no_checkin_status(request.GET, temple, leaderboard)
+
+            return json_response({"data": data})
+        except Exception as e:
+            return json_response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
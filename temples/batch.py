@@ -0,0 +1,178 @@
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urlencode, urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.views import APIView
+
+from .query_budget import view_budget
+from .renderers import JSONFragment
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+METHODS = SAFE_METHODS + ('POST', 'PUT', 'PATCH', 'DELETE')
+# Headers a sub-request may set for itself, and those of its response
+# reported back; conditional headers of the batch itself are not passed on
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _worker_pool():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BATCH_WORKERS', 4), thread_name_prefix='batch'
+                )
+    return _executor
+
+
+class SubRequest:
+    """
+    One entry of a batch: the request built for its view, or the error
+    response it gets instead when it can't be run.
+    """
+
+    def __init__(self, parent, spec):
+        if not isinstance(spec, dict) or not isinstance(spec.get('path'), str):
+            raise BatchError('Each request needs a path.')
+        self.method = str(spec.get('method', 'GET')).upper()
+        if self.method not in METHODS:
+            raise BatchError(f'Unsupported method {self.method!r}.')
+        query = spec.get('query') or {}
+        if not isinstance(query, dict):
+            raise BatchError('query must be an object.')
+        headers = spec.get('headers') or {}
+        if not isinstance(headers, dict) or not set(headers) <= set(CONDITIONAL_HEADERS):
+            raise BatchError(f"headers may only hold {', '.join(CONDITIONAL_HEADERS)}.")
+
+        url = urlsplit(spec['path'])
+        query_string = '&'.join(part for part in (url.query, urlencode(query, doseq=True)) if part)
+        self.error = None
+        self.match = None
+        try:
+            self.match = resolve(url.path)
+        except Resolver404:
+            self.error = (404, f'No route matches {url.path!r}.')
+            return
+        view_class = getattr(self.match.func, 'view_class', None)
+        if view_class is None or not issubclass(view_class, APIView) or iscoroutinefunction(self.match.func):
+            self.error = (400, f'{url.path!r} is not a batchable API route.')
+        elif not getattr(view_class, 'batchable', True):
+            self.error = (400, f'{url.path!r} can not be batched.')
+        self.view_class = view_class
+        self.request = self._build(parent, url.path, query_string, headers, spec.get('body'))
+
+    def _build(self, parent, path, query_string, headers, body):
+        content = b'' if body is None else json.dumps(body).encode()
+        request = HttpRequest()
+        request.method = self.method
+        request.path = request.path_info = path
+        request.META = {
+            **{key: value for key, value in parent.META.items() if not key.startswith('HTTP_IF_')},
+            **{'HTTP_' + name.upper().replace('-', '_'): str(value) for name, value in headers.items()},
+            'REQUEST_METHOD': self.method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query_string,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(content)),
+            # Sub-responses are embedded in the batch's JSON
+            'HTTP_ACCEPT': 'application/json',
+        }
+        request.GET = QueryDict(query_string)
+        request.COOKIES = parent.COOKIES
+        request._stream = io.BytesIO(content)
+        request._read_started = False
+        request.resolver_match = self.match
+        # The client's session and user, looked up at most once for the batch
+        for attribute in ('session', 'user'):
+            if hasattr(parent, attribute):
+                setattr(request, attribute, getattr(parent, attribute))
+        return request
+
+    def budget(self):
+        return 0 if self.error else view_budget(self.view_class, self.method)
+
+    def run(self):
+        if self.error:
+            status, message = self.error
+            return {"status": status, "body": {"error": message}}
+        try:
+            response = self.match.func(self.request, *self.match.args, **self.match.kwargs)
+            if response.streaming:
+                return {"status": 400, "body": {"error": 'Streaming responses can not be batched.'}}
+            if hasattr(response, 'render'):
+                response.render()
+        except Exception as e:
+            return {"status": 500, "body": {"error": str(e)}}
+        if not response.content:
+            body = None
+        elif response.get('Content-Type', '').startswith('application/json'):
+            # Already rendered; embedded as is
+            body = JSONFragment(response.content)
+        else:
+            body = response.content.decode(response.charset, 'replace')
+        result = {"status": response.status_code, "body": body}
+        validators = {name: response[name] for name in VALIDATOR_HEADERS if response.has_header(name)}
+        if validators:
+            result["headers"] = validators
+        return result
+
+
+def _run_in_worker(context, sub_request):
+    # Worker threads keep their own database connections between batches,
+    # for as long as CONN_MAX_AGE allows, like request threads do
+    close_old_connections()
+    try:
+        return context.run(sub_request.run)
+    finally:
+        close_old_connections()
+
+
+def run_batch(sub_requests):
+    """
+    Responses of the sub-requests, in order. Consecutive reads run in
+    parallel on the worker pool; each write runs on its own, on the calling
+    thread, after everything before it and before everything after it, so a
+    batch behaves as if its requests were sent one by one.
+    """
+    responses = [None] * len(sub_requests)
+    reads = []
+
+    def run_reads():
+        if len(reads) == 1:
+            responses[reads[0]] = sub_requests[reads[0]].run()
+        elif reads:
+            # Each worker gets its own copy of the context, holding the
+            # request's query log, metrics, replica and request cache
+            futures = [
+                (index, _worker_pool().submit(_run_in_worker, copy_context(), sub_requests[index]))
+                for index in reads
+            ]
+            for index, future in futures:
+                responses[index] = future.result()
+        reads.clear()
+
+    for index, sub_request in enumerate(sub_requests):
+        if sub_request.method in SAFE_METHODS:
+            reads.append(index)
+            continue
+        run_reads()
+        responses[index] = sub_request.run()
+    run_reads()
+    return responses
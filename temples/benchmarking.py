@@ -0,0 +1,43 @@
+import math
+import statistics
+import subprocess
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of an unsorted list of numbers.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_latencies(latencies_ms):
+    """
+    p50/p95/p99/mean/max of a list of latencies in milliseconds.
+    """
+    if not latencies_ms:
+        return {'count': 0}
+    return {
+        'count': len(latencies_ms),
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p95_ms': round(percentile(latencies_ms, 95), 3),
+        'p99_ms': round(percentile(latencies_ms, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies_ms), 3),
+        'max_ms': round(max(latencies_ms), 3),
+    }
+
+
+def git_revision():
+    """
+    Current commit hash, so benchmark results can be matched to the code.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,215 @@
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import DataVersion
+from .query_budget import unbudgeted
+
+
+# DataVersion row holding the temples version, and its value until first bumped
+TEMPLES_VERSION = 'temples'
+INITIAL_TEMPLES_VERSION = 1
+
+# The temples version as last read by this process, and when (monotonic)
+_temples_version = (None, 0.0)
+
+# Entries read from or written to the cache during the current request
+# scope; None outside of one
+_request_cache = ContextVar('request_cache', default=None)
+
+
+@contextmanager
+def request_cache():
+    """
+    Remember the entries cached_get_many() reads within the block, so work
+    sharing the block (the sub-requests of a batch, including those run on
+    other threads with a copy of the context) looks each key up once.
+    """
+    token = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+def cached_get_many(keys):
+    """
+    cache.get_many(), answered from the request cache where it can be.
+    """
+    local = _request_cache.get()
+    if local is None:
+        return cache.get_many(keys)
+    found = {key: local[key] for key in keys if key in local}
+    missing = [key for key in keys if key not in found]
+    if missing:
+        fetched = cache.get_many(missing)
+        local.update(fetched)
+        found.update(fetched)
+    return found
+
+
+def cached_set_many(values, timeout):
+    local = _request_cache.get()
+    if local is not None:
+        local.update(values)
+    cache.set_many(values, timeout)
+
+
+def cached_delete_many(keys):
+    local = _request_cache.get()
+    if local is not None:
+        for key in keys:
+            local.pop(key, None)
+    cache.delete_many(keys)
+
+
+def _remember_temples_version(version):
+    global _temples_version
+    _temples_version = (version, time.monotonic())
+
+
+def _temples_version_is_fresh():
+    version, checked = _temples_version
+    return version is not None and time.monotonic() - checked < getattr(settings, 'TEMPLES_VERSION_CHECK_SECONDS', 1.0)
+
+
+def temples_version():
+    """
+    Current generation of the temple data set. Caches derived from the
+    Temple table (nearby results, spatial indexes) include it in their keys,
+    so bumping it invalidates all of them at once. It is kept in the
+    database for all processes and re-read at most every
+    TEMPLES_VERSION_CHECK_SECONDS.
+    """
+    if not _temples_version_is_fresh():
+        with unbudgeted():
+            version = DataVersion.objects.filter(name=TEMPLES_VERSION).values_list('value', flat=True).first()
+        _remember_temples_version(version or INITIAL_TEMPLES_VERSION)
+    return _temples_version[0]
+
+
+async def atemples_version():
+    """
+    temples_version() for async views.
+    """
+    if not _temples_version_is_fresh():
+        with unbudgeted():
+            version = await DataVersion.objects.filter(name=TEMPLES_VERSION).values_list('value', flat=True).afirst()
+        _remember_temples_version(version or INITIAL_TEMPLES_VERSION)
+    return _temples_version[0]
+
+
+def _new_temples_version():
+    # Random rather than counted, so a version is never handed out twice,
+    # even after a rolled back bump
+    return secrets.randbits(62) or INITIAL_TEMPLES_VERSION
+
+
+def invalidate_temple_caches():
+    """
+    Drop every cache derived from the Temple table, in every process. Call
+    once after bulk changes (imports, seeding) rather than per row.
+    """
+    version = _new_temples_version()
+    DataVersion.objects.bulk_create(
+        [DataVersion(name=TEMPLES_VERSION, value=version)],
+        update_conflicts=True, unique_fields=['name'], update_fields=['value'],
+    )
+    _remember_temples_version(version)
+
+
+def advance_temples_version():
+    """
+    Move the temples version on after a change to a single temple, which
+    this process applies to its own indexes in place. Returns (previous, new)
+    when nothing else changed the version in between, so indexes current at
+    previous are current at new; otherwise (None, new).
+    """
+    previous = DataVersion.objects.filter(name=TEMPLES_VERSION).values_list('value', flat=True).first()
+    version = _new_temples_version()
+    if previous is None or not DataVersion.objects.filter(name=TEMPLES_VERSION, value=previous).update(value=version):
+        invalidate_temple_caches()
+        return None, _temples_version[0]
+    _remember_temples_version(version)
+    return previous, version
+
+
+def temple_detail_cache_key(temple_id):
+    return f'temple_detail:{temple_id}'
+
+
+def invalidate_temple_detail(temple_id):
+    cache.delete(temple_detail_cache_key(temple_id))
+
+
+def user_card_cache_key(user_id):
+    return f'user_card:{user_id}'
+
+
+def invalidate_user_cards(user_ids):
+    cached_delete_many([user_card_cache_key(user_id) for user_id in user_ids])
+
+
+# Version stamps of the check-in and reel lists: DataVersion rows holding the
+# microsecond time of the last write to a temple's list, written in the same
+# transaction as the write so no process can pair the new stamp with the old
+# rows. User names appear in every list, so a user's rename (or a bulk load)
+# moves a stamp shared by all of them.
+ACTIVITY_KINDS = ('checkins', 'reels')
+SHARED_ACTIVITY_STAMP = 'activity'
+
+
+def activity_stamp_name(kind, temple_id):
+    return f'{kind}:{temple_id}'
+
+
+def _stamp_names(kind, temple_id):
+    return (activity_stamp_name(kind, temple_id), SHARED_ACTIVITY_STAMP)
+
+
+def _write_stamps(names):
+    stamp = time.time_ns() // 1000
+    # Lists are written over and over, so their rows usually exist already
+    if DataVersion.objects.filter(name__in=names).update(value=stamp) < len(names):
+        DataVersion.objects.bulk_create(
+            [DataVersion(name=name, value=stamp) for name in names],
+            update_conflicts=True, unique_fields=['name'], update_fields=['value'],
+        )
+
+
+def touch_temple_activity(temple_id, kinds=ACTIVITY_KINDS):
+    _write_stamps([activity_stamp_name(kind, temple_id) for kind in kinds])
+
+
+def touch_all_activity():
+    _write_stamps([SHARED_ACTIVITY_STAMP])
+
+
+def _validators(kind, temple_id, stamps):
+    # A list nothing was written to yet has stamp 0, and no Last-Modified
+    temple_stamp, shared_stamp = (stamps.get(name, 0) for name in _stamp_names(kind, temple_id))
+    etag = f'"{kind}-{temple_id}-{temple_stamp:x}-{shared_stamp:x}"'
+    return etag, max(temple_stamp, shared_stamp) // 1_000_000 or None
+
+
+def _stamps(kind, temple_id):
+    return DataVersion.objects.filter(name__in=_stamp_names(kind, temple_id)).values_list('name', 'value')
+
+
+def activity_validators(kind, temple_id):
+    """
+    (ETag, Last-Modified timestamp or None) of a temple's check-in or reel
+    list, from its stamps alone, in one query.
+    """
+    return _validators(kind, temple_id, dict(_stamps(kind, temple_id)))
+
+
+async def aactivity_validators(kind, temple_id):
+    """
+    activity_validators() for async views.
+    """
+    return _validators(kind, temple_id, {name: value async for name, value in _stamps(kind, temple_id)})
@@ -0,0 +1,151 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
+
+from .exports import ExportError, format_watermark, parse_watermark
+
+
+# Query parameter holding the position of the last row of the previous page
+CURSOR_VAR = 'after'
+
+INTEGER_KEYS = ('AutoField', 'BigAutoField', 'SmallAutoField')
+
+
+def estimated_row_count(model, using):
+    """
+    Cheap estimate of the rows in a model's table, or None: the planner's
+    statistics on PostgreSQL and MySQL, the highest id on SQLite, which keeps
+    none without ANALYZE and hands out ids in increasing order.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        if model._meta.pk.get_internal_type() not in INTEGER_KEYS:
+            return None
+        return model._default_manager.using(using).order_by('-pk').values_list('pk', flat=True).first() or 0
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for a table that was never analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts without reading the whole table: the table's estimated size when
+    the changelist is unfiltered and large, otherwise an exact count that
+    stops at ADMIN_COUNT_LIMIT rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', 10000)
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Pages newest first on (keyset_field, pk), starting each page after the
+    last row of the previous one instead of at an OFFSET, so every page
+    costs the same however deep it is. Pages are linked with next and
+    first links rather than numbers.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_ordering(self, request, queryset):
+        # The order of the (keyset_field, id) index, which the cursor is a position in
+        return [f'-{self.model_admin.keyset_field}', '-pk']
+
+    def get_results(self, request):
+        # Links to filters and searches start from the first page again
+        self.params.pop(CURSOR_VAR, None)
+        self.filter_params.pop(CURSOR_VAR, None)
+
+        field = self.model_admin.keyset_field
+        queryset = self.queryset
+        cursor = request.GET.get(CURSOR_VAR)
+        if cursor:
+            try:
+                value, pk = parse_watermark(cursor)
+            except ExportError:
+                raise IncorrectLookupParameters
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+        rows = list(queryset[:self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_next or bool(cursor)
+        self.paginator = paginator
+        self.keyset_paging = True
+        self.first_page_url = self.get_query_string() if cursor else None
+        self.next_page_url = (
+            self.get_query_string({CURSOR_VAR: format_watermark(getattr(rows[-1], field), rows[-1].pk)})
+            if has_next else None
+        )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist for activity tables too large to count, sort or page through
+    with OFFSET: estimated counts, keyset paging on (keyset_field, id), which
+    needs an index on those columns, and no sortable columns.
+
+    search_fields name fields of related tables ('user__name'). Each search
+    term is looked up in those tables first and the matching ids then go
+    through the foreign key indexes of this one, rather than a LIKE over a
+    join with every row.
+    """
+    keyset_field = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    sortable_by = ()
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            matches = Q()
+            for field in self.get_search_fields(request):
+                relation, _, related_field = field.partition('__')
+                related_model = self.model._meta.get_field(relation).related_model
+                related = related_model._default_manager.filter(**{f'{related_field}__icontains': bit})
+                matches |= Q(**{f'{relation}__in': related.values('pk')})
+            queryset = queryset.filter(matches)
+        return queryset, False
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+# Cached entries that signals drop when the rows behind them change. The
+# signals only reach the cache of the process that made the change, so with
+# more than one process the cache has to be shared for the others to see it.
+INVALIDATED_CACHES = (
+    'temple details (TEMPLE_DETAIL_CACHE_TTL)',
+    'user cards (USER_CARD_CACHE_TTL)',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Warn when the default cache is local to each process outside of debug
+    and test runs, which are served by a single process.
+    """
+    if settings.DEBUG or getattr(settings, 'TESTING', False) or not isinstance(caches['default'], LocMemCache):
+        return []
+    return [
+        Warning(
+            'The default cache is local to each process, so changes do not '
+            f"invalidate the cached {', '.join(INVALIDATED_CACHES)} of other processes.",
+            hint=(
+                'Use a cache shared by all worker processes, such as '
+                'temples.cache_backends.InstrumentedRedisCache, or silence '
+                'temples.W001 when serving from a single process.'
+            ),
+            id='temples.W001',
+        )
+    ]
@@ -0,0 +1,204 @@
+from math import floor
+
+from django.conf import settings
+
+from .indexes import TempleIndex
+from .models import Temple
+
+
+# Cells are a quarter of a map tile wide at every zoom level: 90 degrees at
+# zoom 0, halving with each level. From DETAIL_ZOOM on, viewports list the
+# temples themselves instead of clusters.
+ZOOM0_CELL_DEGREES = 90.0
+DETAIL_ZOOM = getattr(settings, 'CLUSTER_DETAIL_ZOOM', 14)
+
+
+class Cluster:
+    """
+    The temples of one pyramid cell: their count, coordinate sums for the
+    centroid, and the representative temple, the highest rated one.
+    """
+    __slots__ = ('count', 'sum_lat', 'sum_lng', 'representative')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lng = 0.0
+        # (temple_id, name, lat, lng, rating)
+        self.representative = None
+
+    def add(self, temple):
+        self.count += 1
+        self.sum_lat += temple[2]
+        self.sum_lng += temple[3]
+        if self.representative is None or ranks_before(temple, self.representative):
+            self.representative = temple
+
+    def as_dict(self):
+        temple_id, name, lat, lng, rating = self.representative
+        return {
+            "count": self.count,
+            "lat": round(self.sum_lat / self.count, 6),
+            "lng": round(self.sum_lng / self.count, 6),
+            "temple": {"id": temple_id, "name": name, "lat": lat, "lng": lng, "rating": rating},
+        }
+
+
+def check_bounds(min_lat, min_lng, max_lat, max_lng):
+    """
+    Raise ValueError unless the bounding box is on the map: latitudes within
+    +-90, longitudes within +-180, each minimum at most its maximum. Rejects
+    NaN and infinite bounds, which no cell range can be computed for.
+    """
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError('Invalid bounding box')
+
+
+def ranks_before(temple, other):
+    # Highest rating first, then lowest id so the choice is stable
+    return (-temple[4], temple[0]) < (-other[4], other[0])
+
+
+def best_of(temples):
+    best = None
+    for temple in temples:
+        if best is None or ranks_before(temple, best):
+            best = temple
+    return best
+
+
+class TempleClusterPyramid(TempleIndex):
+    """
+    Temple clusters precomputed for every zoom level below DETAIL_ZOOM.
+
+    Level z splits the map into cells of ZOOM0_CELL_DEGREES / 2**z, so each
+    cell covers exactly four cells of the level below and a temple's cell
+    at any level follows from its cell at the finest one. The finest level
+    keeps its temples; the others keep only aggregates. Adding or removing
+    a temple touches one cell per level, and a lost representative is
+    picked again from the four cells below.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.finest_zoom = DETAIL_ZOOM - 1
+        self.finest_cell_degrees = ZOOM0_CELL_DEGREES / 2 ** self.finest_zoom
+        # levels[zoom] maps (row, col) to a Cluster
+        self._levels = [{} for _ in range(DETAIL_ZOOM)]
+        # Temples of each finest-level cell: (row, col) -> {temple_id: temple}
+        self._members = {}
+        self._temples = {}
+
+    def finest_cell(self, lat, lng):
+        return (floor(lat / self.finest_cell_degrees), floor(lng / self.finest_cell_degrees))
+
+    def _cells(self, finest_key):
+        # (zoom, key) from the finest level up to zoom 0
+        row, col = finest_key
+        for zoom in range(self.finest_zoom, -1, -1):
+            shift = self.finest_zoom - zoom
+            yield zoom, (row >> shift, col >> shift)
+
+    def _add(self, temple):
+        finest_key = self.finest_cell(temple[2], temple[3])
+        self._temples[temple[0]] = temple
+        self._members.setdefault(finest_key, {})[temple[0]] = temple
+        for zoom, key in self._cells(finest_key):
+            cluster = self._levels[zoom].get(key)
+            if cluster is None:
+                cluster = self._levels[zoom][key] = Cluster()
+            cluster.add(temple)
+
+    def build(self):
+        self._levels = [{} for _ in range(DETAIL_ZOOM)]
+        self._members = {}
+        self._temples = {}
+        for temple in Temple.objects.values_list('id', 'name', 'lat', 'lng', 'rating').iterator(chunk_size=2000):
+            self._add(temple)
+
+    def update(self, temple):
+        self.remove(temple.pk)
+        self._add((temple.pk, temple.name, temple.lat, temple.lng, temple.rating))
+
+    def remove(self, temple_id):
+        temple = self._temples.pop(temple_id, None)
+        if temple is None:
+            return
+        finest_key = self.finest_cell(temple[2], temple[3])
+        members = self._members[finest_key]
+        del members[temple_id]
+        if not members:
+            del self._members[finest_key]
+        # Bottom up, so a level picking a new representative sees the
+        # levels below already updated
+        for zoom, key in self._cells(finest_key):
+            level = self._levels[zoom]
+            cluster = level[key]
+            cluster.count -= 1
+            if not cluster.count:
+                del level[key]
+                continue
+            cluster.sum_lat -= temple[2]
+            cluster.sum_lng -= temple[3]
+            if cluster.representative[0] == temple_id:
+                if zoom == self.finest_zoom:
+                    cluster.representative = best_of(members.values())
+                else:
+                    below = self._levels[zoom + 1]
+                    row, col = key
+                    children = (below.get((2 * row + dr, 2 * col + dc)) for dr in (0, 1) for dc in (0, 1))
+                    cluster.representative = best_of(child.representative for child in children if child is not None)
+
+    def _in_range(self, level, min_row, min_col, max_row, max_col):
+        # Walk the cells of the range, or the level's non-empty cells when
+        # the range holds more cells than that (a huge viewport)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) <= len(level):
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    cluster = level.get((row, col))
+                    if cluster is not None:
+                        yield (row, col), cluster
+        else:
+            for (row, col), cluster in list(level.items()):
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    yield (row, col), cluster
+
+    def clusters(self, min_lat, min_lng, max_lat, max_lng, zoom):
+        """
+        Clusters of the cells at zoom (capped at the finest level) that
+        overlap the bounding box, largest first.
+        """
+        check_bounds(min_lat, min_lng, max_lat, max_lng)
+        zoom = max(0, min(zoom, self.finest_zoom))
+        cell_degrees = ZOOM0_CELL_DEGREES / 2 ** zoom
+        level = self._levels[zoom]
+        # A cluster emptied by a concurrent removal has count 0 until it is dropped
+        clusters = [
+            cluster.as_dict() for _, cluster in self._in_range(
+                level,
+                floor(min_lat / cell_degrees), floor(min_lng / cell_degrees),
+                floor(max_lat / cell_degrees), floor(max_lng / cell_degrees),
+            ) if cluster.count
+        ]
+        clusters.sort(key=lambda cluster: -cluster['count'])
+        return clusters
+
+    def temples(self, min_lat, min_lng, max_lat, max_lng, limit):
+        """
+        (temple_id, name, lat, lng, rating) of the temples inside the
+        bounding box, or None when there are more than limit of them.
+        """
+        check_bounds(min_lat, min_lng, max_lat, max_lng)
+        min_row, min_col = self.finest_cell(min_lat, min_lng)
+        max_row, max_col = self.finest_cell(max_lat, max_lng)
+        temples = []
+        for key, _ in self._in_range(self._levels[self.finest_zoom], min_row, min_col, max_row, max_col):
+            for temple in tuple(self._members.get(key, {}).values()):
+                if min_lat <= temple[2] <= max_lat and min_lng <= temple[3] <= max_lng:
+                    temples.append(temple)
+                    if len(temples) > limit:
+                        return None
+        return temples
+
+
+temple_clusters = TempleClusterPyramid()
@@ -0,0 +1,60 @@
+import gzip
+import zlib
+
+from django.conf import settings
+
+
+# Content codings the server can produce, preferred first on equal quality
+ENCODINGS = ('gzip', 'deflate')
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    The encoding in ENCODINGS the client ranks highest in its Accept-Encoding
+    header, or None if it accepts neither.
+    """
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding, level):
+    if encoding == 'gzip':
+        # A fixed mtime keeps the output identical for identical content
+        return gzip.compress(content, compresslevel=level, mtime=0)
+    # HTTP's "deflate" is the zlib format, not a raw deflate stream
+    return zlib.compress(content, level)
+
+
+def view_compression(view_class):
+    """
+    (min_bytes, level) for responses of a view. Views tune it with
+    compression = {'min_bytes': 512, 'level': 4}, or opt out with
+    compression = None; unset keys fall back to COMPRESSION_MIN_BYTES and
+    COMPRESSION_LEVEL.
+    """
+    defaults = {
+        'min_bytes': getattr(settings, 'COMPRESSION_MIN_BYTES', 1024),
+        'level': getattr(settings, 'COMPRESSION_LEVEL', 6),
+    }
+    config = getattr(view_class, 'compression', defaults) if view_class is not None else defaults
+    if config is None:
+        return None
+    config = {**defaults, **config}
+    return config['min_bytes'], config['level']
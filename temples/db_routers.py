@@ -0,0 +1,53 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Database alias the current request reads from; None reads from the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def start_replica_reads():
+    """
+    Send the reads of the current request to one replica, picked at random so
+    load spreads across them while each request sees a single snapshot.
+    Returns a token for end_replica_reads(), or None without replicas.
+    """
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    if not replicas:
+        return None
+    return _read_alias.set(random.choice(replicas))
+
+
+def end_replica_reads(token):
+    if token is not None:
+        _read_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary; reads go to the replica chosen for the current
+    request by ReplicaRoutingMiddleware, or to the primary outside of one
+    (management commands, write requests, clients pinned after a write) and
+    inside transactions on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        # Reads inside a transaction on the primary must see its writes
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema along with the data from the primary
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Location, Reels, UserTempleCheckin
+
+
+# Exportable tables: name -> (model, columns). Rows are exported in
+# (created_at, id) order, which the (created_at, id) index of each table serves.
+EXPORTS = {
+    'checkins': (UserTempleCheckin, ('id', 'user_id', 'temple_id', 'checkin_time', 'created_at', 'updated_at')),
+    'locations': (Location, ('id', 'user_id', 'lat', 'lng', 'created_at', 'updated_at')),
+    'reels': (Reels, ('id', 'user_id', 'temple_id', 'video_url', 'thumbnail', 'created_at', 'updated_at')),
+}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def format_watermark(created_at, row_id):
+    return f'{created_at.isoformat()},{row_id}'
+
+
+def _parse_datetime(value):
+    # parse_datetime() returns None for malformed values but raises
+    # ValueError for well-formed impossible ones, such as month 13
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        return None
+
+
+def parse_watermark(watermark):
+    """
+    (created_at, id) of a watermark returned by an earlier export.
+    """
+    created_at, _, row_id = watermark.rpartition(',')
+    created_at = _parse_datetime(created_at)
+    if created_at is None or not row_id.isdigit():
+        raise ExportError(f'Invalid watermark: {watermark!r}')
+    return created_at, int(row_id)
+
+
+def parse_time(value, name):
+    if value is None:
+        return None
+    parsed = _parse_datetime(value)
+    if parsed is None:
+        raise ExportError(f'{name} must be an ISO 8601 datetime.')
+    return parsed
+
+
+def _after(created_at, row_id):
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=row_id)
+
+
+def _up_to(created_at, row_id):
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=row_id)
+
+
+class Export:
+    """
+    Rows of one table created in [since, until) and after a watermark, read
+    in chunks of EXPORT_CHUNK_SIZE by keyset pagination on (created_at, id).
+    Each chunk is its own short query, so memory use and lock time don't
+    grow with the table.
+
+    The export stops at the newest row that existed when it was prepared;
+    that row's watermark is passed back as after= to continue from it.
+    """
+
+    def __init__(self, table, since=None, until=None, after=None):
+        if table not in EXPORTS:
+            raise ExportError(f"Unknown table {table!r}; choose from {', '.join(EXPORTS)}.")
+        self.model, self.columns = EXPORTS[table]
+        self.chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+        queryset = self.model.objects.all()
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        if until is not None:
+            queryset = queryset.filter(created_at__lt=until)
+        if after is not None:
+            queryset = queryset.filter(_after(*after))
+        self.queryset = queryset
+
+        self.end = queryset.order_by('-created_at', '-id').values_list('created_at', 'id').first()
+        # With nothing new, the caller's watermark is handed back unchanged
+        watermark = self.end or after
+        self.watermark = format_watermark(*watermark) if watermark else None
+
+    def chunks(self):
+        """
+        Lists of row tuples, in (created_at, id) order.
+        """
+        if self.end is None:
+            return
+        bounded = self.queryset.filter(_up_to(*self.end)).order_by('created_at', 'id')
+        created_at_index = self.columns.index('created_at')
+        position = None
+        while True:
+            queryset = bounded.filter(_after(*position)) if position is not None else bounded
+            rows = list(queryset.values_list(*self.columns)[:self.chunk_size])
+            if not rows:
+                return
+            yield rows
+            if len(rows) < self.chunk_size:
+                return
+            position = (rows[-1][created_at_index], rows[-1][0])
+
+    def ndjson(self):
+        """
+        One JSON object per line, one bytes block per chunk.
+        """
+        columns = self.columns
+        for rows in self.chunks():
+            yield ''.join(
+                json.dumps(dict(zip(columns, map(_plain, row))), separators=(',', ':')) + '\n' for row in rows
+            ).encode()
+
+    def csv(self):
+        """
+        A header line, then one line per row, one bytes block per chunk.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        for rows in self.chunks():
+            writer.writerows([map(_plain, row) for row in rows])
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # Header of an empty export
+            yield buffer.getvalue().encode()
+
+    def stream(self, export_format):
+        if export_format not in FORMATS:
+            raise ExportError(f"Unknown format {export_format!r}; choose from {', '.join(FORMATS)}.")
+        return self.ndjson() if export_format == 'ndjson' else self.csv()
+
+
+def _plain(value):
+    # Full precision, unlike the API's JSON encoder which keeps milliseconds
+    return value.isoformat() if isinstance(value, datetime) else value
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from math import floor
+
+from django.conf import settings
+
+from .geo import calculate_distance
+from .indexes import TempleIndex
+from .models import Temple
+from .spatial import degree_window
+
+
+# A user can check in within this distance of a temple, once per cooldown
+CHECKIN_RADIUS_KM = 0.2
+CHECKIN_COOLDOWN = timedelta(hours=6)
+
+
+class TempleGeofenceIndex(TempleIndex):
+    """
+    Fine grid mapping each cell to the temples whose check-in geofence
+    (CHECKIN_RADIUS_KM around the temple) overlaps it. A point is looked up
+    in its single cell and checked against the few temples listed there, so
+    the cost does not grow with the number of temples nearby.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # About 220 m, so a geofence spans at most 3 x 3 cells
+        self.cell_degrees = getattr(settings, 'GEOFENCE_CELL_DEGREES', 0.002)
+        self._temples = {}
+        self._cells = {}
+
+    def cell_key(self, lat, lng):
+        return (floor(lat / self.cell_degrees), floor(lng / self.cell_degrees))
+
+    def _fence_cells(self, lat, lng):
+        lat_degrees, lng_degrees = degree_window(lat, CHECKIN_RADIUS_KM)
+        min_row, min_col = self.cell_key(lat - lat_degrees, lng - lng_degrees)
+        max_row, max_col = self.cell_key(lat + lat_degrees, lng + lng_degrees)
+        return [(row, col) for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1)]
+
+    def build(self):
+        temples = {}
+        cells = {}
+        for temple_id, name, lat, lng in Temple.objects.values_list('id', 'name', 'lat', 'lng').iterator(chunk_size=2000):
+            temples[temple_id] = (name, lat, lng)
+            for key in self._fence_cells(lat, lng):
+                cells.setdefault(key, []).append(temple_id)
+        # Cells hold tuples that are replaced rather than changed, so lookups
+        # running during an update see either the old or the new list
+        self._cells = {key: tuple(temple_ids) for key, temple_ids in cells.items()}
+        self._temples = temples
+
+    def update(self, temple):
+        self.remove(temple.pk)
+        self._temples[temple.pk] = (temple.name, temple.lat, temple.lng)
+        for key in self._fence_cells(temple.lat, temple.lng):
+            self._cells[key] = self._cells.get(key, ()) + (temple.pk,)
+
+    def remove(self, temple_id):
+        entry = self._temples.pop(temple_id, None)
+        if entry is None:
+            return
+        for key in self._fence_cells(entry[1], entry[2]):
+            remaining = tuple(other_id for other_id in self._cells.get(key, ()) if other_id != temple_id)
+            if remaining:
+                self._cells[key] = remaining
+            else:
+                self._cells.pop(key, None)
+
+    def containing(self, lat, lng):
+        """
+        (distance_km, temple_id, name, temple_lat, temple_lng) of the temples
+        whose geofence contains the point, nearest first.
+        """
+        matches = []
+        for temple_id in self._cells.get(self.cell_key(lat, lng), ()):
+            entry = self._temples.get(temple_id)
+            if entry is None:
+                continue
+            name, temple_lat, temple_lng = entry
+            distance = calculate_distance(lat, lng, temple_lat, temple_lng)
+            if distance <= CHECKIN_RADIUS_KM:
+                matches.append((distance, temple_id, name, temple_lat, temple_lng))
+        matches.sort()
+        return matches
+
+
+temple_geofences = TempleGeofenceIndex()
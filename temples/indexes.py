@@ -0,0 +1,95 @@
+import logging
+import threading
+
+from django.db import DatabaseError
+
+from .caches import temples_version
+from .query_budget import unbudgeted
+
+
+logger = logging.getLogger(__name__)
+
+# Temple columns the in-memory indexes read; saves touching only other
+# columns (e.g. the check-in counter) skip index maintenance
+INDEXED_FIELDS = frozenset(('name', 'lat', 'lng', 'rating', 'srm', 'chadhava', 'puja', 'yatra'))
+
+
+class TempleIndex:
+    """
+    Base class for per-process, in-memory indexes over the Temple table.
+
+    Subclasses implement build(), which loads everything from the database,
+    plus update()/remove() for single temples. Every change moves the shared
+    temples version on, so the indexes of other processes rebuild on their
+    next use. Single-row saves are also applied incrementally, through
+    signals, to this process's indexes; bulk changes (see
+    caches.invalidate_temple_caches) rebuild them too.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+
+    def is_current(self, version):
+        return self._version == version
+
+    def ensure_built(self):
+        version = temples_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    with unbudgeted():
+                        self.build()
+                    self._version = version
+        return self
+
+    def build(self):
+        raise NotImplementedError
+
+    def update(self, temple):
+        raise NotImplementedError
+
+    def remove(self, temple_id):
+        raise NotImplementedError
+
+    def apply_update(self, temple, previous, version):
+        """
+        Apply a change to one temple that moved the temples version from
+        previous to version (see caches.advance_temples_version). Only an
+        index built in this process and current up to the change is updated
+        in place; any other rebuilds on its next use.
+        """
+        with self._lock:
+            if self._version is not None and self._version == previous:
+                # Advanced first, since the grid writes its snapshot under
+                # the index's version from update() when not in a transaction
+                self._version = version
+                self.update(temple)
+
+    def apply_remove(self, temple_id, previous, version):
+        with self._lock:
+            if self._version is not None and self._version == previous:
+                self._version = version
+                self.remove(temple_id)
+
+
+def registered_indexes():
+    from .clusters import temple_clusters
+    from .geofence import temple_geofences
+    from .search import temple_name_index
+    from .spatial import temple_grid
+
+    return [temple_name_index, temple_grid, temple_geofences, temple_clusters]
+
+
+def warm_up():
+    """
+    Build every in-memory temple index so the first requests served by a
+    worker do not pay for it. Called from the WSGI/ASGI entry points.
+    """
+    for index in registered_indexes():
+        try:
+            index.ensure_built()
+        except DatabaseError:
+            # Tables not migrated yet; the index builds on first use instead
+            logger.warning('Skipping warm-up of %s', type(index).__name__, exc_info=True)
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import timedelta
+from math import floor
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+from django.utils import timezone
+
+from .geo import calculate_distance
+from .models import Location
+from .renderers import encode_json
+from .spatial import degree_window
+from .user_cards import user_cards, user_data
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One client following the users within radius km of a point. Events are
+    queued on the client's event loop; a client that falls MAX_PENDING
+    events behind is marked overflowed and should start over.
+    """
+    MAX_PENDING = 1000
+
+    def __init__(self, lat, lng, radius, loop):
+        self.lat = lat
+        self.lng = lng
+        self.radius = radius
+        self.loop = loop
+        self.queue = asyncio.Queue(self.MAX_PENDING)
+        self.overflowed = False
+        self.cells = []
+        # Users currently inside the radius, as the client last heard
+        self.visible = set()
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def next_event(self, timeout):
+        """
+        The next (event, data) pair, or None after timeout seconds without one.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class NearbyUsersHub:
+    """
+    Fan-out of location pings to the nearby-users subscriptions of this
+    process.
+
+    Pings are read back from the Location table rather than taken from the
+    process that saved them, so every worker's subscribers hear about the
+    pings any worker served, once committed. While the hub has subscribers
+    a poller thread reads the rows added since its last look every
+    LIVE_POLL_SECONDS, in id order, which on SQLite (one writer at a time)
+    is commit order.
+
+    Subscriptions are indexed by the grid cells their radius overlaps, so a
+    ping is only checked against the subscriptions of its own cell, plus
+    those that were showing the user (to tell them the user left). Each
+    subscription gets "enter", "move" and "leave" events.
+    """
+    POLL_BATCH = 500
+    # How far before the first subscription the poller starts reading, for
+    # pings saved just before it but committed after the snapshot was read
+    START_SLACK = timedelta(seconds=1)
+
+    def __init__(self):
+        self.cell_degrees = getattr(settings, 'LIVE_CELL_DEGREES', 0.05)
+        self.poll_seconds = getattr(settings, 'LIVE_POLL_SECONDS', 0.5)
+        self._lock = threading.Lock()
+        self._cells = {}
+        # user_id -> subscriptions currently showing the user
+        self._showing = {}
+        self._poller = None
+
+    def cell_key(self, lat, lng):
+        return (floor(lat / self.cell_degrees), floor(lng / self.cell_degrees))
+
+    def subscribe(self, lat, lng, radius):
+        """
+        Register a subscription for the running event loop.
+        """
+        subscription = Subscription(lat, lng, radius, asyncio.get_running_loop())
+        lat_degrees, lng_degrees = degree_window(lat, radius)
+        min_row, min_col = self.cell_key(lat - lat_degrees, lng - lng_degrees)
+        max_row, max_col = self.cell_key(lat + lat_degrees, lng + lng_degrees)
+        subscription.cells = [(row, col) for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1)]
+        with self._lock:
+            for key in subscription.cells:
+                self._cells.setdefault(key, set()).add(subscription)
+            if self._poller is None:
+                self._poller = threading.Thread(
+                    target=self._poll, args=(timezone.now() - self.START_SLACK,), name='nearby-users-hub', daemon=True
+                )
+                self._poller.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for key in subscription.cells:
+                subscribers = self._cells.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._cells[key]
+            for user_id in subscription.visible:
+                showing = self._showing.get(user_id)
+                if showing is not None:
+                    showing.discard(subscription)
+                    if not showing:
+                        del self._showing[user_id]
+            subscription.visible.clear()
+
+    def mark_visible(self, subscription, user_ids):
+        """
+        Record the users a subscription's client already has, e.g. from its
+        initial snapshot.
+        """
+        with self._lock:
+            for user_id in user_ids:
+                subscription.visible.add(user_id)
+                self._showing.setdefault(user_id, set()).add(subscription)
+
+    def _poll(self, since):
+        # Publishes the new Location rows until the last subscription is gone
+        last_id = None
+        try:
+            while True:
+                with self._lock:
+                    if not self._cells:
+                        self._poller = None
+                        return
+                close_old_connections()
+                try:
+                    while True:
+                        locations = Location.objects.order_by('id')
+                        if last_id is None:
+                            locations = locations.filter(created_at__gte=since)
+                        else:
+                            locations = locations.filter(id__gt=last_id)
+                        locations = list(locations[:self.POLL_BATCH])
+                        for location in locations:
+                            self.publish(location)
+                        if locations:
+                            last_id = locations[-1].id
+                        if len(locations) < self.POLL_BATCH:
+                            break
+                except DatabaseError:
+                    # Tried again on the next round, from the same row
+                    logger.exception('Reading location pings failed')
+                time.sleep(self.poll_seconds)
+        finally:
+            with self._lock:
+                if self._poller is threading.current_thread():
+                    self._poller = None
+            connections.close_all()
+
+    def publish(self, location):
+        """
+        Fan a new location of a user out to the affected subscriptions.
+        Called from the poller thread.
+        """
+        if not self._cells:
+            return
+        user_id = location.user_id
+        entry = None
+        with self._lock:
+            candidates = self._cells.get(self.cell_key(location.lat, location.lng), set()) | self._showing.get(user_id, set())
+            for subscription in candidates:
+                distance = calculate_distance(subscription.lat, subscription.lng, location.lat, location.lng)
+                inside = distance <= subscription.radius
+                was_visible = user_id in subscription.visible
+                if inside and not was_visible:
+                    if entry is None:
+                        entry = self._user_data(location)
+                    if not entry:
+                        # The user was deleted
+                        continue
+                    event = ('enter', {**entry, 'distance': round(distance, 2)})
+                    subscription.visible.add(user_id)
+                    self._showing.setdefault(user_id, set()).add(subscription)
+                elif inside:
+                    event = ('move', {
+                        'user_id': user_id, 'last_lat': location.lat, 'last_lng': location.lng,
+                        'distance': round(distance, 2),
+                    })
+                elif was_visible:
+                    event = ('leave', {'user_id': user_id})
+                    subscription.visible.discard(user_id)
+                    self._showing[user_id].discard(subscription)
+                    if not self._showing[user_id]:
+                        del self._showing[user_id]
+                else:
+                    continue
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+    def _user_data(self, location):
+        # Same fields as the nearby-users results, from the user's card
+        card = user_cards([location.user_id]).get(location.user_id)
+        return user_data(card, location) if card is not None else {}
+
+
+nearby_users_hub = NearbyUsersHub()
+
+
+def sse_event(event, data):
+    return b'event: ' + event.encode() + b'\ndata: ' + encode_json(data) + b'\n\n'
+
+
+class EventStream:
+    """
+    Server-sent events for a subscription: the initial events, then the
+    hub's events as they arrive, with a comment line every
+    LIVE_HEARTBEAT_SECONDS so proxies keep the connection open. A client
+    that fell too far behind gets a "reset" event and the stream ends;
+    it should reconnect for a fresh snapshot.
+
+    Passed to StreamingHttpResponse, which calls close() when the response
+    is done, so the subscription is dropped even if the stream never started.
+    """
+
+    def __init__(self, hub, subscription, initial_events=()):
+        self.hub = hub
+        self.subscription = subscription
+        self.initial_events = list(initial_events)
+        self.heartbeat_seconds = getattr(settings, 'LIVE_HEARTBEAT_SECONDS', 15)
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        try:
+            for event, data in self.initial_events:
+                yield sse_event(event, data)
+            while True:
+                item = await self.subscription.next_event(self.heartbeat_seconds)
+                if self.subscription.overflowed:
+                    yield sse_event('reset', {'reason': 'Too many pending events.'})
+                    return
+                if item is None:
+                    yield b': keepalive\n\n'
+                else:
+                    yield sse_event(*item)
+        finally:
+            self.close()
+
+    def close(self):
+        self.hub.unsubscribe(self.subscription)
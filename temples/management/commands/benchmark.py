@@ -0,0 +1,221 @@
+import json
+import logging
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from temples import urls as temple_urls
+from temples.benchmarking import git_revision, summarize_latencies
+from temples.models import Location, Reels, ReelsLike, Temple, User, UserTempleCheckin
+
+
+API_PREFIX = '/api/'
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+# Routes served both by an APIView and by an async view under async/
+ASYNC_ROUTES = ('nearby-users', 'nearby-temples', 'temples/<int:pk>/reels', 'temples/<int:temple_id>/check-ins/<str:user_id>')
+
+
+def route_cases():
+    """
+    Sample request builders keyed by the route strings in temples/urls.py.
+    Each builder takes a sample dict and returns (method, path, data).
+    """
+    cases = {
+        'create-user': lambda s: ('post', 'create-user', {'user_id': s['user_id'], 'name': s['user_name']}),
+        'nearby-users': lambda s: ('get', 'nearby-users', {'lat': s['lat'], 'lng': s['lng'], 'radius': 2}),
+        'nearby-temples': lambda s: ('get', 'nearby-temples', {'lat': s['lat'], 'lng': s['lng'], 'radius': 5}),
+        'temples/search': lambda s: ('get', 'temples/search', {'q': s['temple_name'][:4], 'lat': s['lat'], 'lng': s['lng']}),
+        'temples/bulk': lambda s: ('get', 'temples/bulk', {'ids': ','.join(map(str, s['temple_ids']))}),
+        'temples/geofence': lambda s: ('get', 'temples/geofence', {'lat': s['lat'], 'lng': s['lng'], 'user_id': s['user_id']}),
+        'temples/crowd': lambda s: ('get', 'temples/crowd', {'ids': ','.join(map(str, s['temple_ids']))}),
+        'temples/viewport': lambda s: ('get', 'temples/viewport', {
+            'min_lat': s['lat'] - 0.5, 'min_lng': s['lng'] - 0.5, 'max_lat': s['lat'] + 0.5, 'max_lng': s['lng'] + 0.5,
+            'zoom': 9,
+        }),
+        'yatra/route': lambda s: ('get', 'yatra/route', {
+            'lat': s['lat'], 'lng': s['lng'], 'ids': ','.join(map(str, s['temple_ids'])),
+        }),
+        'temples/<int:pk>': lambda s: ('get', f"temples/{s['temple_id']}", {}),
+        'temples/<int:pk>/check-ins': lambda s: ('get', f"temples/{s['temple_id']}/check-ins", {}),
+        'temples/<int:temple_id>/check-ins/<str:user_id>': lambda s: (
+            'get', f"temples/{s['temple_id']}/check-ins/{s['user_id']}", {'lat': s['lat'], 'lng': s['lng']}
+        ),
+        'temples/<int:pk>/reels': lambda s: ('get', f"temples/{s['temple_id']}/reels", {}),
+        'locations': lambda s: ('get', 'locations', {'user_id': s['user_id']}),
+        'locations/<int:pk>/': lambda s: ('get', f"locations/{s['location_id']}/", {}),
+        # The app's startup reads in one round trip
+        'batch': lambda s: ('post', 'batch', {'requests': [
+            {'path': API_PREFIX + 'nearby-temples', 'query': {'lat': s['lat'], 'lng': s['lng'], 'radius': 5}},
+            {'path': API_PREFIX + 'nearby-users', 'query': {'lat': s['lat'], 'lng': s['lng'], 'radius': 2}},
+        ] + [
+            {'path': f"{API_PREFIX}temples/{temple_id}/check-ins/{s['user_id']}", 'query': {'lat': s['lat'], 'lng': s['lng']}}
+            for temple_id in s['temple_ids'][:3]
+        ]}),
+    }
+    # The async routes take the same requests as their sync counterparts
+    for route in ASYNC_ROUTES:
+        cases[f'async/{route}'] = async_case(cases[route])
+    return cases
+
+
+def async_case(build):
+    def build_async(sample):
+        method, path, data = build(sample)
+        return method, f'async/{path}', data
+    return build_async
+
+
+def load_samples(rng, count):
+    """
+    Request parameters drawn from the current database, one dict per sample.
+    """
+    temple_ids = list(Temple.objects.order_by('?').values_list('id', flat=True)[:max(count, 20)])
+    user_ids = list(User.objects.order_by('?').values_list('user_id', flat=True)[:count])
+    location_id = Location.objects.values_list('id', flat=True).first()
+    if not temple_ids or not user_ids:
+        raise CommandError('No data to benchmark; run the seed command first.')
+
+    temples = Temple.objects.in_bulk(temple_ids)
+    users = User.objects.in_bulk(user_ids)
+    samples = []
+    for i in range(count):
+        temple = temples[temple_ids[i % len(temple_ids)]]
+        user = users[user_ids[i % len(user_ids)]]
+        samples.append({
+            'temple_id': temple.id,
+            'temple_name': temple.name,
+            'temple_ids': rng.sample(temple_ids, min(20, len(temple_ids))),
+            'lat': temple.lat,
+            'lng': temple.lng,
+            'user_id': user.user_id,
+            'user_name': user.name,
+            'location_id': location_id or 0,
+        })
+    return samples
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every route in temples/urls.py against the current database: "
+        "p50/p95/p99 latency, queries per request and peak Python memory. "
+        "Results are written as JSON so runs can be compared between commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--samples', type=int, default=10, help='Distinct temples/users to rotate through')
+        parser.add_argument('--route', action='append', help='Only benchmark routes containing this text')
+        parser.add_argument('--cold', action='store_true', help='Disable the cache so every request hits the database')
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--compare', help='Previous results file to compare p50/p95 against')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['random_seed'])
+        samples = load_samples(rng, options['samples'])
+        cases = route_cases()
+        client = Client()
+
+        # 4xx responses (e.g. unauthenticated routes) would log on every request
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        routes = {}
+        cache_settings = override_settings(CACHES=DUMMY_CACHES) if options['cold'] else nullcontext()
+        with cache_settings:
+            for pattern in temple_urls.urlpatterns:
+                route = str(pattern.pattern)
+                if options['route'] and not any(text in route for text in options['route']):
+                    continue
+                if route not in cases:
+                    routes[route] = {'skipped': 'no sample request defined'}
+                    continue
+                routes[route] = self._benchmark_route(client, cases[route], samples, options['iterations'])
+                self.stderr.write(f"{route}: p50={routes[route]['p50_ms']} ms")
+
+        results = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cold_cache': options['cold'],
+                'iterations': options['iterations'],
+                'rows': {
+                    model.__name__: model.objects.count()
+                    for model in (Temple, User, Location, UserTempleCheckin, Reels, ReelsLike)
+                },
+            },
+            'routes': routes,
+        }
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fp:
+                fp.write(output)
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _request(self, client, build, sample):
+        method, path, data = build(sample)
+        if method == 'get':
+            return client.get(API_PREFIX + path, data)
+        return client.generic(method.upper(), API_PREFIX + path, json.dumps(data), content_type='application/json')
+
+    def _benchmark_route(self, client, build, samples, iterations):
+        # One warm-up request so lazy index builds are not counted
+        self._request(client, build, samples[0])
+
+        latencies = []
+        query_counts = []
+        statuses = set()
+        for i in range(iterations):
+            sample = samples[i % len(samples)]
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = self._request(client, build, sample)
+                latencies.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(queries))
+            statuses.add(response.status_code)
+
+        # Peak memory is measured on a separate request since tracing slows everything down
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._request(client, build, samples[0])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            **summarize_latencies(latencies),
+            'queries_median': statistics.median(query_counts),
+            'queries_max': max(query_counts),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'response_bytes': len(response.content),
+            'statuses': sorted(statuses),
+        }
+
+    def _compare(self, path, results):
+        with open(path) as fp:
+            previous = json.load(fp)
+
+        self.stderr.write(f"\nvs {previous['meta'].get('revision')} ({path})")
+        for route, current in results['routes'].items():
+            before = previous['routes'].get(route)
+            if not before or 'p50_ms' not in before or 'p50_ms' not in current:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms', 'queries_median'):
+                if before[key]:
+                    changes.append(f'{key} {before[key]} -> {current[key]} ({current[key] / before[key]:.2f}x)')
+            self.stderr.write(f'{route:<50} ' + '  '.join(changes))
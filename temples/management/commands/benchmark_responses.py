@@ -0,0 +1,102 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from temples.compression import compress
+from temples.management.commands.benchmark import API_PREFIX, DUMMY_CACHES, load_samples
+from temples.renderers import FastJSONRenderer, JSONFragment, encode_json, orjson
+
+
+# Payloads measured: name -> builder taking a sample and returning (path, query)
+PAYLOADS = {
+    'nearby-temples': lambda s: ('nearby-temples', {'lat': s['lat'], 'lng': s['lng'], 'radius': 10, 'details': 'false'}),
+    'nearby-temples?details': lambda s: ('nearby-temples', {'lat': s['lat'], 'lng': s['lng'], 'radius': 10, 'details': 'true'}),
+    'check-ins': lambda s: (f"temples/{s['temple_id']}/check-ins", {'details': 'false'}),
+    'check-ins?details': lambda s: (f"temples/{s['temple_id']}/check-ins", {'details': 'true'}),
+}
+
+COMPRESSIONS = (('gzip', 1), ('gzip', 4), ('gzip', 6), ('gzip', 9), ('deflate', 6))
+
+
+def cpu_us(func, repeat):
+    """
+    Mean CPU time of func() in microseconds.
+    """
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return round((time.process_time() - start) / repeat * 1e6, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bytes and CPU per response for the nearby-temples and check-ins "
+        "payloads: DRF's JSONRenderer against the fast renderer (json module and "
+        "orjson), fresh and served from the cache, then each compression setting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help='Encodings timed per measurement')
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        sample = load_samples(random.Random(options['random_seed']), 1)[0]
+        repeat = options['repeat']
+        client = Client()
+
+        drf_renderer = JSONRenderer()
+        json_renderer = FastJSONRenderer()
+        json_renderer.use_orjson = False
+        renderers = {'drf': drf_renderer, 'json': json_renderer}
+        if orjson is not None:
+            renderers['orjson'] = FastJSONRenderer()
+
+        report = {}
+        with override_settings(CACHES=DUMMY_CACHES):
+            for name, build in PAYLOADS.items():
+                path, query = build(sample)
+                # Decoded from the body since nearby results hold pre-encoded fragments
+                data = json.loads(client.get(API_PREFIX + path, query).content)
+                body = drf_renderer.render(data)
+
+                # A cache hit used to decode the stored payload and encode it again;
+                # now the stored bytes are embedded as a fragment
+                stored_str = json.dumps(data['data'])
+                stored_bytes = encode_json(data['data'])
+                encoding = {
+                    f'{renderer_name}': cpu_us(lambda renderer=renderer: renderer.render(data), repeat)
+                    for renderer_name, renderer in renderers.items()
+                }
+                encoding['drf cached'] = cpu_us(lambda: drf_renderer.render({'data': json.loads(stored_str)}), repeat)
+                for renderer_name, renderer in renderers.items():
+                    if renderer is not drf_renderer:
+                        encoding[f'{renderer_name} cached'] = cpu_us(
+                            lambda renderer=renderer: renderer.render({'data': JSONFragment(stored_bytes)}), repeat
+                        )
+
+                compression = {'identity': {'bytes': len(body), 'cpu_us': 0.0}}
+                for method, level in COMPRESSIONS:
+                    compression[f'{method}-{level}'] = {
+                        'bytes': len(compress(body, method, level)),
+                        'cpu_us': cpu_us(lambda: compress(body, method, level), repeat),
+                    }
+                report[name] = {'encode_cpu_us': encoding, 'compression': compression}
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for name, result in report.items():
+            identity = result['compression']['identity']['bytes']
+            self.stdout.write(f'{name} ({identity} bytes)')
+            self.stdout.write('  encode: ' + '  '.join(f'{key}={value} us' for key, value in result['encode_cpu_us'].items()))
+            for method, measured in result['compression'].items():
+                if method != 'identity':
+                    self.stdout.write(
+                        f"  {method}: {measured['bytes']} bytes ({measured['bytes'] / identity:.0%}) "
+                        f"{measured['cpu_us']} us"
+                    )
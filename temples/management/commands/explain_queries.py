@@ -0,0 +1,133 @@
+import json
+import logging
+import random
+import re
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+
+from temples import urls as temple_urls
+from temples.management.commands.benchmark import API_PREFIX, DUMMY_CACHES, load_samples, route_cases
+from temples.query_budget import _unbudgeted, call_site
+
+
+# "SCAN temples_location" reads the whole table, and so does walking a whole
+# index ("SCAN temples_location USING INDEX ..."). "SEARCH ..." rows and scans
+# of subqueries or CTEs are fine. Older SQLite versions say "SCAN TABLE".
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX \w+)?$')
+
+
+class QueryCollector:
+    """
+    connection.execute_wrapper hook keeping the SELECTs each route runs, with
+    their parameters and call site. Index rebuilds (unbudgeted queries) are
+    left out since they read whole tables on purpose.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.route = None
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.route is not None and not many and not _unbudgeted.get() and sql.lstrip().upper().startswith('SELECT'):
+            with self._lock:
+                self.queries.setdefault(self.route, {}).setdefault(sql, (params, call_site()))
+        return execute(sql, params, many, context)
+
+
+def query_plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[3] for row in cursor.fetchall()]
+
+
+def full_scans(plan, tables):
+    return [match.group(1) for match in map(FULL_SCAN.match, plan) if match and match.group(1) in tables]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every route in temples/urls.py, run EXPLAIN QUERY PLAN on each "
+        "SELECT the views issue and fail if any of them scans a whole table. "
+        "The cache is bypassed and writes made by the requests are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route', action='append', help='Only check routes containing this text')
+        parser.add_argument('--allow', action='append', default=[], help='Table that may be scanned in full (small lookup tables)')
+        parser.add_argument('--random-seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('explain_queries reads SQLite query plans; run it against a SQLite database.')
+
+        samples = load_samples(random.Random(options['random_seed']), 1)
+        cases = route_cases()
+        tables = set(connection.introspection.table_names()) - set(options['allow'])
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        collector = QueryCollector()
+        self._install(collector)
+        client = Client()
+        statuses = {}
+        # Without the cache every view reaches the database; budgets are the
+        # query_budget middleware's business, not this command's
+        with override_settings(CACHES=DUMMY_CACHES, QUERY_BUDGET_ENFORCE=False), transaction.atomic():
+            for pattern in temple_urls.urlpatterns:
+                route = str(pattern.pattern)
+                if route not in cases or (options['route'] and not any(text in route for text in options['route'])):
+                    continue
+                collector.route = route
+                response = self._request(client, cases[route](samples[0]))
+                if response.status_code in (401, 403):
+                    # Routes behind IsAuthenticated/IsAdminUser are retried with an admin session
+                    if '_auth_user_id' not in client.session:
+                        client.force_login(get_user_model().objects.create_superuser('explain-queries', password=None))
+                    collector.queries.pop(route, None)
+                    response = self._request(client, cases[route](samples[0]))
+                    client.logout()
+                statuses[route] = response.status_code
+            collector.route = None
+            transaction.set_rollback(True)
+
+        failures = 0
+        for route, status in statuses.items():
+            queries = collector.queries.get(route, {})
+            self.stdout.write(f'{route}: {len(queries)} distinct queries')
+            if status >= 400:
+                self.stdout.write(self.style.WARNING(f'  responded {status}; its queries may not all have run'))
+            for sql, (params, site) in queries.items():
+                plan = query_plan(sql, params)
+                scans = full_scans(plan, tables)
+                if scans:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f"  full scan of {', '.join(scans)} at {site}"))
+                    self.stdout.write(f'    {sql[:300]}')
+                if scans or options['verbosity'] > 1:
+                    for line in plan:
+                        self.stdout.write(f'    | {line}')
+
+        if failures:
+            raise CommandError(f'{failures} queries scan a whole table.')
+        self.stdout.write(self.style.SUCCESS('No full table scans.'))
+
+    def _request(self, client, case):
+        method, path, data = case
+        if method == 'get':
+            return client.get(API_PREFIX + path, data)
+        return client.generic(method.upper(), API_PREFIX + path, json.dumps(data), content_type='application/json')
+
+    def _install(self, collector):
+        def install(sender, connection, **kwargs):
+            if collector not in connection.execute_wrappers:
+                connection.execute_wrappers.append(collector)
+
+        # Async views run their queries on worker threads with connections of their own
+        connection_created.connect(install, weak=False)
+        for conn in connections.all():
+            install(None, conn)
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from temples.exports import EXPORTS, FORMATS, Export, ExportError, parse_time, parse_watermark
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the check-ins, locations or reels created in a time range as NDJSON "
+        "or CSV, oldest first, in constant memory. The watermark of the last row is "
+        "printed to stderr; pass it back with --after to export only newer rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+        parser.add_argument('--since', help='ISO 8601 datetime; rows created at or after it')
+        parser.add_argument('--until', help='ISO 8601 datetime; rows created before it')
+        parser.add_argument('--after', help='Watermark of an earlier export')
+        parser.add_argument('--output', help='File to write to (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            export = Export(
+                options['table'],
+                since=parse_time(options['since'], 'since'),
+                until=parse_time(options['until'], 'until'),
+                after=parse_watermark(options['after']) if options['after'] else None,
+            )
+        except ExportError as e:
+            raise CommandError(e)
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for block in export.stream(options['format']):
+                output.write(block)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+        if export.watermark:
+            self.stderr.write(f'Watermark: {export.watermark}')
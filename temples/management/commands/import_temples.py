@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from temples.caches import invalidate_temple_caches, touch_all_activity
+from temples.models import Temple, TempleDetails, compress_raw_data
+from temples.spatial import temple_grid
+
+
+READ_SIZE = 64 * 1024
+
+# SQLite allows a single writer and fails (rather than waits) when two
+# deferred transactions both try to upgrade to a write lock, so writes are
+# serialized there; parsing and compression still run in parallel
+sqlite_write_lock = threading.Lock()
+
+
+def iter_json_array(fp):
+    """
+    Yield the items of a top-level JSON array one at a time, keeping only the
+    current read buffer in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = fp.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Expected a JSON array')
+    buffer = buffer[1:]
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # Item spans beyond the buffer, read more and retry
+            if eof:
+                raise
+            chunk = fp.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+        if len(buffer) < READ_SIZE and not eof:
+            chunk = fp.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+
+
+def iter_places(path):
+    """
+    Yield place dicts from a Google Places dump in either JSONL or JSON array form.
+    """
+    with open(path, encoding='utf-8') as fp:
+        first = fp.read(1)
+        while first and first.isspace():
+            first = fp.read(1)
+        fp.seek(0)
+
+        if first == '[':
+            yield from iter_json_array(fp)
+            return
+
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def normalize_place(place):
+    """
+    Map a Places API record (legacy or v1 format) to Temple fields.
+    Returns None for records without a place id or coordinates.
+    """
+    place_id = place.get('place_id') or place.get('id')
+    location = (place.get('geometry') or {}).get('location') or place.get('location') or {}
+    lat = location.get('lat', location.get('latitude'))
+    lng = location.get('lng', location.get('longitude'))
+    if not place_id or lat is None or lng is None:
+        return None
+
+    name = place.get('name')
+    if isinstance(place.get('displayName'), dict):
+        name = place['displayName'].get('text') or name
+
+    return {
+        'google_place_id': place_id,
+        'name': (name or '')[:128],
+        'lat': float(lat),
+        'lng': float(lng),
+        'rating': float(place.get('rating') or 0.0),
+        'compressed_data': compress_raw_data(place),
+    }
+
+
+def upsert_chunk(places):
+    """
+    Upsert one chunk of places and their compressed raw data. Runs on a worker
+    thread, so it closes its own database connection when done.
+    """
+    try:
+        rows = {}
+        for place in places:
+            row = normalize_place(place)
+            if row:
+                rows[row['google_place_id']] = row  # last record for a place id wins
+
+        if not rows:
+            return 0
+
+        if connection.vendor == 'sqlite':
+            with sqlite_write_lock:
+                return write_rows(rows)
+        return write_rows(rows)
+    finally:
+        connection.close()
+
+
+def write_rows(rows):
+    with transaction.atomic():
+        Temple.objects.bulk_create(
+            [
+                Temple(
+                    google_place_id=row['google_place_id'],
+                    name=row['name'],
+                    lat=row['lat'],
+                    lng=row['lng'],
+                    rating=row['rating'],
+                )
+                for row in rows.values()
+            ],
+            update_conflicts=True,
+            unique_fields=['google_place_id'],
+            update_fields=['name', 'lat', 'lng', 'rating', 'updated_at'],
+        )
+        temple_ids = dict(
+            Temple.objects.filter(google_place_id__in=rows).values_list('google_place_id', 'id')
+        )
+        TempleDetails.objects.bulk_create(
+            [
+                TempleDetails(temple_id=temple_ids[place_id], compressed_data=row['compressed_data'])
+                for place_id, row in rows.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['temple'],
+            update_fields=['compressed_data', 'updated_at'],
+        )
+    return len(rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a Google Places dump (JSONL or JSON array) and upsert temples in "
+        "batches keyed on google_place_id. Interrupted imports resume from the "
+        "last completed batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the Places dump')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Ignore any existing checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        workers = max(1, options['workers'])
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+
+        skip_chunks = 0 if options['restart'] else self._load_checkpoint(checkpoint_path, path, batch_size)
+        if skip_chunks:
+            self.stdout.write(f'Resuming after {skip_chunks} completed batches')
+
+        places = iter_places(path)
+        for _ in range(skip_chunks):
+            if not list(islice(places, batch_size)):
+                break
+
+        # Chunks finish out of order; the checkpoint only advances over the
+        # contiguous prefix of completed chunks so a resume never skips work.
+        completed = set()
+        watermark = skip_chunks
+        imported = 0
+        pending = {}
+
+        def drain(return_when):
+            nonlocal watermark, imported
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                index = pending.pop(future)
+                imported += future.result()
+                completed.add(index)
+            while watermark in completed:
+                completed.discard(watermark)
+                watermark += 1
+            self._save_checkpoint(checkpoint_path, path, batch_size, watermark)
+
+        chunk_index = skip_chunks
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while True:
+                    chunk = list(islice(places, batch_size))
+                    if not chunk:
+                        break
+                    pending[executor.submit(upsert_chunk, chunk)] = chunk_index
+                    chunk_index += 1
+
+                    # Bound the number of chunks held in memory
+                    if len(pending) >= workers * 2:
+                        drain(FIRST_COMPLETED)
+
+                while pending:
+                    drain(FIRST_COMPLETED)
+        except Exception as e:
+            raise CommandError(
+                f'Import stopped after {watermark} complete batches ({e}). '
+                f'Re-run the command to resume.'
+            )
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        invalidate_temple_caches()
+        # The check-in and reel lists show the new rows without their signals
+        touch_all_activity()
+        if temple_grid.snapshot_path:
+            # Running workers switch to the new temples without a table scan
+            temple_grid.write_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Upserted {imported} temples in {chunk_index - skip_chunks} batches'
+        ))
+
+    def _load_checkpoint(self, checkpoint_path, path, batch_size):
+        try:
+            with open(checkpoint_path) as fp:
+                checkpoint = json.load(fp)
+        except (OSError, ValueError):
+            return 0
+
+        if checkpoint.get('source') != os.path.abspath(path) or checkpoint.get('size') != os.path.getsize(path):
+            raise CommandError(f'{checkpoint_path} belongs to a different file; use --restart')
+        if checkpoint.get('batch_size') != batch_size:
+            raise CommandError(f'Resume with --batch-size {checkpoint.get("batch_size")} or use --restart')
+        return checkpoint.get('completed_batches', 0)
+
+    def _save_checkpoint(self, checkpoint_path, path, batch_size, completed_batches):
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump({
+                'source': os.path.abspath(path),
+                'size': os.path.getsize(path),
+                'batch_size': batch_size,
+                'completed_batches': completed_batches,
+            }, fp)
+        os.replace(tmp_path, checkpoint_path)
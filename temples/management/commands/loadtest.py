@@ -0,0 +1,273 @@
+import asyncio
+import io
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+from temples.benchmarking import summarize_latencies
+from temples.management.commands.benchmark import API_PREFIX, ASYNC_ROUTES, DUMMY_CACHES, load_samples, route_cases
+from temples.management.commands.replay_traffic import send
+
+
+def build_requests(route, samples, count):
+    """
+    (path, query) pairs for a route, cycling through the samples.
+    """
+    build = route_cases()[route]
+    requests = []
+    for i in range(count):
+        method, path, data = build(samples[i % len(samples)])
+        requests.append((API_PREFIX + path, urlencode(data)))
+    return requests
+
+
+def wsgi_get(application, path, query):
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'wsgi.input': io.BytesIO()}
+    setup_testing_defaults(environ)
+    statuses = []
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in body:
+            pass
+    finally:
+        # Fires request_finished, which releases the thread's connection
+        body.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_get(application, path, query):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    done = asyncio.Event()
+    request_sent = False
+    statuses = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect while the view runs
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send_message(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    await application(scope, receive, send_message)
+    return statuses[0]
+
+
+class InFlight:
+    """
+    Tracks how many requests are being served at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the routes that have an async version: the APIView under WSGI "
+        "against the async view under ASGI, at the same client concurrency. Runs "
+        "Django's WSGI and ASGI handlers in-process unless server URLs are given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route', action='append', choices=ASYNC_ROUTES, help='Only test these routes')
+        parser.add_argument('--concurrency', type=int, default=50, help='Clients sending requests back to back')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per route and mode')
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='Worker threads of the in-process WSGI server')
+        parser.add_argument(
+            '--db-latency-ms', type=float, default=0,
+            help='Add this much latency to every query, as a database on another host would',
+        )
+        parser.add_argument('--cold', action='store_true', help='Disable the cache so every request hits the database')
+        parser.add_argument('--samples', type=int, default=10, help='Distinct temples/users to rotate through')
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--wsgi-url', help='Base URL of a WSGI server (e.g. gunicorn) to test instead')
+        parser.add_argument('--asgi-url', help='Base URL of an ASGI server (e.g. uvicorn) to test instead')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1 or options['wsgi_threads'] < 1:
+            raise CommandError('--concurrency, --requests and --wsgi-threads must be positive')
+
+        samples = load_samples(random.Random(options['random_seed']), options['samples'])
+        # 4xx responses would log on every request
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        if options['db_latency_ms']:
+            self._add_db_latency(options['db_latency_ms'] / 1000)
+
+        report = {}
+        cache_settings = override_settings(CACHES=DUMMY_CACHES) if options['cold'] else nullcontext()
+        with cache_settings:
+            for route in options['route'] or ASYNC_ROUTES:
+                report[route] = {
+                    'wsgi': self._run_wsgi(build_requests(route, samples, options['requests']), options),
+                    'asgi': self._run_asgi(build_requests(f'async/{route}', samples, options['requests']), options),
+                }
+                if not options['json']:
+                    self._print_route(route, report[route])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def _add_db_latency(self, seconds):
+        def delay(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            # Wrappers outlive reconnects, so only add it once per connection
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        # Threads that serve requests open connections of their own
+        connection_created.connect(install, weak=False)
+        for conn in connections.all():
+            install(None, conn)
+
+    def _run_wsgi(self, requests, options):
+        if options['wsgi_url']:
+            return self._run_http(options['wsgi_url'], requests, options)
+
+        application = get_wsgi_application()
+        in_flight = InFlight()
+
+        def serve(path, query):
+            with in_flight:
+                return wsgi_get(application, path, query)
+
+        # The pool stands in for the server's worker threads; requests queue
+        # while every worker is busy, and that wait counts as latency
+        with ThreadPoolExecutor(max_workers=options['wsgi_threads']) as workers:
+            def get(path, query):
+                return workers.submit(serve, path, query).result()
+
+            get(*requests[0])  # warm-up
+            return self._run_threads(get, requests, options['concurrency'], in_flight)
+
+    def _run_http(self, base_url, requests, options):
+        def get(path, query):
+            status, _ = send(base_url, {'method': 'GET', 'path': path, 'query': query}, options['timeout'])
+            return status
+
+        get(*requests[0])  # warm-up
+        return self._run_threads(get, requests, options['concurrency'], None)
+
+    def _run_threads(self, get, requests, concurrency, in_flight):
+        latencies = []
+        statuses = {}
+        lock = threading.Lock()
+        pending = iter(requests)
+
+        def client():
+            while True:
+                with lock:
+                    request = next(pending, None)
+                if request is None:
+                    return
+                start = time.perf_counter()
+                status = get(*request)
+                latency_ms = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(latency_ms)
+                    statuses[str(status or 'error')] = statuses.get(str(status or 'error'), 0) + 1
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        connection.close()
+        return self._result(latencies, statuses, time.perf_counter() - start, in_flight)
+
+    def _run_asgi(self, requests, options):
+        if options['asgi_url']:
+            return self._run_http(options['asgi_url'], requests, options)
+
+        application = get_asgi_application()
+        in_flight = InFlight()
+        latencies = []
+        statuses = {}
+
+        async def client(pending):
+            for path, query in pending:
+                start = time.perf_counter()
+                with in_flight:
+                    status = await asgi_get(application, path, query)
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        async def run():
+            await asgi_get(application, *requests[0])  # warm-up
+            pending = iter(requests)
+            start = time.perf_counter()
+            await asyncio.gather(*(client(pending) for _ in range(options['concurrency'])))
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(run())
+        return self._result(latencies, statuses, elapsed, in_flight)
+
+    def _result(self, latencies, statuses, elapsed, in_flight):
+        return {
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+            'elapsed_s': round(elapsed, 3),
+            'peak_in_flight': in_flight.peak if in_flight else None,
+            'latency': summarize_latencies(latencies),
+            'statuses': statuses,
+        }
+
+    def _print_route(self, route, results):
+        self.stdout.write(route)
+        for mode, result in results.items():
+            latency = result['latency']
+            self.stdout.write(
+                f"  {mode}: {result['throughput_rps']} req/s  p50={latency.get('p50_ms')} "
+                f"p95={latency.get('p95_ms')} p99={latency.get('p99_ms')} ms  "
+                f"in flight<={result['peak_in_flight']}  statuses={result['statuses']}"
+            )
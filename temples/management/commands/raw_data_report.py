@@ -0,0 +1,106 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from temples.models import Temple, TempleDetails
+
+
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Report how much space the compressed temple raw_data takes and how the "
+        "nearby-temples and check-ins endpoints perform with and without details."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lat', type=float, help='Latitude for nearby-temples (default: first temple)')
+        parser.add_argument('--lng', type=float, help='Longitude for nearby-temples (default: first temple)')
+        parser.add_argument('--radius', type=float, default=5)
+        parser.add_argument('--temple', type=int, help='Temple id for check-ins (default: most checked-in temple)')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        report = {
+            'storage': self._storage_report(),
+            'endpoints': self._endpoint_report(options),
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        storage = report['storage']
+        self.stdout.write(
+            f"raw_data rows: {storage['rows']}  json: {storage['json_bytes']} B  "
+            f"compressed: {storage['compressed_bytes']} B  ratio: {storage['ratio']}"
+        )
+        for row in report['endpoints']:
+            self.stdout.write(
+                f"{row['endpoint']:<16} details={str(row['details']).lower():<5} "
+                f"p50={row['p50_ms']:>8} ms  mean={row['mean_ms']:>8} ms  "
+                f"queries={row['queries']:>3}  bytes={row['response_bytes']}"
+            )
+
+    def _storage_report(self):
+        rows = json_bytes = compressed_bytes = 0
+        for details in TempleDetails.objects.iterator(chunk_size=500):
+            rows += 1
+            compressed_bytes += len(details.compressed_data)
+            json_bytes += len(json.dumps(details.raw_data, separators=(',', ':')).encode())
+
+        return {
+            'rows': rows,
+            'json_bytes': json_bytes,
+            'compressed_bytes': compressed_bytes,
+            'ratio': round(compressed_bytes / json_bytes, 3) if json_bytes else None,
+        }
+
+    def _endpoint_report(self, options):
+        temple = Temple.objects.order_by('id').first()
+        if temple is None:
+            raise CommandError('No temples in the database.')
+
+        lat = options['lat'] if options['lat'] is not None else temple.lat
+        lng = options['lng'] if options['lng'] is not None else temple.lng
+        temple_id = options['temple']
+        if temple_id is None:
+            busiest = Temple.objects.annotate(n=Count('usertemplecheckin')).order_by('-n').first()
+            temple_id = busiest.id
+
+        targets = [
+            ('nearby-temples', '/api/nearby-temples', {'lat': lat, 'lng': lng, 'radius': options['radius']}),
+            ('check-ins', f'/api/temples/{temple_id}/check-ins', {}),
+        ]
+
+        client = Client()
+        results = []
+        # Bypass the response caches so every iteration measures the database path
+        with override_settings(CACHES=DUMMY_CACHES):
+            for name, path, params in targets:
+                for details in (False, True):
+                    query = dict(params, details='true' if details else 'false')
+                    timings = []
+                    for _ in range(options['iterations']):
+                        with CaptureQueriesContext(connection) as queries:
+                            start = time.perf_counter()
+                            response = client.get(path, query)
+                            timings.append((time.perf_counter() - start) * 1000)
+                    results.append({
+                        'endpoint': name,
+                        'details': details,
+                        'status': response.status_code,
+                        'p50_ms': round(statistics.median(timings), 2),
+                        'mean_ms': round(statistics.fmean(timings), 2),
+                        'queries': len(queries),
+                        'response_bytes': len(response.content),
+                    })
+        return results
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from temples.stats import reconcile_user_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every user's stats (check-ins, temples visited, reels, likes "
+        "received) from the source tables and fix rows that drifted. Meant to run "
+        "periodically, e.g. nightly from cron; counters changed by writes during "
+        "the run may be overwritten and are corrected by the next one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users recomputed per round of queries')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be fixed')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        checked, fixed = reconcile_user_stats(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        action = 'would fix' if options['dry_run'] else 'fixed'
+        self.stdout.write(f'Checked {checked} users, {action} {fixed} in {(time.perf_counter() - start) * 1000:.0f} ms')
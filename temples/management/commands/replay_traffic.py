@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from temples.benchmarking import summarize_latencies
+
+
+def load_records(path, limit=None):
+    """
+    Recorded requests from a TrafficRecorderMiddleware JSONL file, oldest first.
+    Lines that are not request records are ignored.
+    """
+    records = []
+    with open(path, encoding='utf-8') as fp:
+        for line in fp:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and 'method' in record and 'path' in record and 'ts' in record:
+                records.append(record)
+    records.sort(key=lambda record: record['ts'])
+    return records[:limit] if limit else records
+
+
+def send(base_url, record, timeout):
+    """
+    Send one recorded request. Returns (status, latency_ms); status is None on
+    connection errors.
+    """
+    url = base_url.rstrip('/') + record['path']
+    if record.get('query'):
+        url += '?' + record['query']
+    data = record['body'].encode() if record.get('body') else None
+    request = urllib.request.Request(url, data=data, method=record['method'])
+    if record.get('content_type'):
+        request.add_header('Content-Type', record['content_type'])
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return status, (time.perf_counter() - start) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay requests recorded by TrafficRecorderMiddleware against a running "
+        "server at N times the original rate and report throughput and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(getattr(settings, 'TRAFFIC_RECORD_PATH', settings.BASE_DIR / 'requests.jsonl')))
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--speed', type=float, default=1.0, help='Multiple of the recorded request rate')
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--limit', type=int, help='Replay only the first N requests')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            records = load_records(options['file'], options['limit'])
+        except OSError as e:
+            raise CommandError(str(e))
+        if not records:
+            raise CommandError(f"No recorded requests in {options['file']}")
+        if options['speed'] <= 0:
+            raise CommandError('--speed must be positive')
+
+        report = self.replay(records, options['base_url'], options['speed'], options['workers'], options['timeout'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        latency = report['latency']
+        self.stdout.write(
+            f"{report['completed']} requests in {report['elapsed_s']} s "
+            f"({report['throughput_rps']} req/s, recorded {report['recorded_rps']} req/s x {options['speed']})"
+        )
+        self.stdout.write(
+            f"latency p50={latency.get('p50_ms')} p95={latency.get('p95_ms')} "
+            f"p99={latency.get('p99_ms')} max={latency.get('max_ms')} ms"
+        )
+        self.stdout.write(f"dispatch lag p95={report['dispatch_lag']['p95_ms']} ms  statuses={report['statuses']}")
+
+    def replay(self, records, base_url, speed, workers, timeout):
+        first_ts = records[0]['ts']
+        recorded_span = records[-1]['ts'] - first_ts
+        latencies = []
+        lags = []
+        statuses = Counter()
+        lock = threading.Lock()
+
+        def run(record, scheduled_at):
+            # Lag grows when the pool cannot keep up with the target rate
+            lag_ms = (time.perf_counter() - scheduled_at) * 1000
+            status, latency_ms = send(base_url, record, timeout)
+            with lock:
+                lags.append(lag_ms)
+                latencies.append(latency_ms)
+                statuses[str(status) if status else 'error'] += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for record in records:
+                scheduled_at = start + (record['ts'] - first_ts) / speed
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(run, record, scheduled_at)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'completed': len(latencies),
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+            'recorded_rps': round(len(records) / recorded_span, 2) if recorded_span else None,
+            'latency': summarize_latencies(latencies),
+            'dispatch_lag': summarize_latencies(lags),
+            'statuses': dict(statuses),
+        }
@@ -0,0 +1,258 @@
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from math import cos, radians
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from temples.caches import invalidate_temple_caches, touch_all_activity
+from temples.models import (
+    Location, Reels, ReelsLike, Temple, TempleDetails, User, UserStats, UserTempleCheckin, compress_raw_data,
+)
+from temples.spatial import temple_grid
+from temples.stats import reconcile_user_stats
+
+
+# (name, lat, lng, weight) of cities the synthetic data is clustered around
+CITY_CENTERS = [
+    ('Delhi', 28.6139, 77.2090, 10),
+    ('Mumbai', 19.0760, 72.8777, 9),
+    ('Bengaluru', 12.9716, 77.5946, 8),
+    ('Chennai', 13.0827, 80.2707, 7),
+    ('Kolkata', 22.5726, 88.3639, 7),
+    ('Hyderabad', 17.3850, 78.4867, 7),
+    ('Pune', 18.5204, 73.8567, 5),
+    ('Ahmedabad', 23.0225, 72.5714, 5),
+    ('Jaipur', 26.9124, 75.7873, 4),
+    ('Varanasi', 25.3176, 82.9739, 4),
+    ('Ayodhya', 26.7922, 82.1998, 3),
+    ('Tirupati', 13.6288, 79.4192, 3),
+    ('Madurai', 9.9252, 78.1198, 3),
+    ('Puri', 19.8135, 85.8312, 2),
+    ('Haridwar', 29.9457, 78.1642, 2),
+    ('Ujjain', 23.1765, 75.7885, 2),
+    ('Amritsar', 31.6340, 74.8723, 2),
+    ('Mathura', 27.4924, 77.6737, 2),
+    ('Guwahati', 26.1445, 91.7362, 2),
+    ('Rameswaram', 9.2876, 79.3129, 1),
+]
+
+DEITIES = ['Shiva', 'Hanuman', 'Ganesh', 'Durga', 'Kali', 'Krishna', 'Ram', 'Lakshmi', 'Venkateswara',
+           'Murugan', 'Ayyappa', 'Jagannath', 'Meenakshi', 'Saraswati', 'Narasimha', 'Balaji']
+SUFFIXES = ['Mandir', 'Temple', 'Devasthanam', 'Kovil', 'Dham', 'Peeth']
+FIRST_NAMES = ['Aarav', 'Asha', 'Vivaan', 'Diya', 'Arjun', 'Ananya', 'Ishaan', 'Kavya', 'Rohan', 'Meera',
+               'Karthik', 'Lakshmi', 'Siddharth', 'Priya', 'Aditya', 'Sneha', 'Rahul', 'Pooja']
+
+BATCH_SIZE = 5000
+
+
+@contextmanager
+def writable_timestamps(*fields):
+    """
+    Let bulk_create keep the generated timestamps instead of auto_now_add
+    overwriting them with the current time.
+    """
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic temples, users, locations, check-ins, reels and likes "
+        "clustered around real city centers. --scale sets the size of the largest "
+        "table (locations); other tables are derived from it unless given explicitly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=10_000)
+        parser.add_argument('--temples', type=int)
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--locations', type=int)
+        parser.add_argument('--checkins', type=int)
+        parser.add_argument('--reels', type=int)
+        parser.add_argument('--likes', type=int)
+        parser.add_argument('--spread-km', type=float, default=15, help='Std deviation of points around a city')
+        parser.add_argument('--days', type=int, default=30, help='Spread timestamps over this many days')
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete existing rows first')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        counts = {
+            'temples': options['temples'] if options['temples'] is not None else max(scale // 10, 1),
+            'users': options['users'] if options['users'] is not None else max(scale // 10, 1),
+            'locations': options['locations'] if options['locations'] is not None else scale,
+            'checkins': options['checkins'] if options['checkins'] is not None else scale // 2,
+            'reels': options['reels'] if options['reels'] is not None else scale // 20,
+            'likes': options['likes'] if options['likes'] is not None else scale // 5,
+        }
+        if counts['temples'] < 1 or counts['users'] < 1:
+            raise CommandError('At least one temple and one user are needed.')
+
+        self.random = random.Random(options['random_seed'])
+        self.spread_km = options['spread_km']
+        self.now = timezone.now()
+        self.window_seconds = options['days'] * 86400
+        self.city_weights = [city[3] for city in CITY_CENTERS]
+
+        if options['clear']:
+            # Raw deletes skip per-row signals and cascade collection, children first
+            for model in (ReelsLike, Reels, UserTempleCheckin, Location, TempleDetails, Temple, UserStats, User):
+                model.objects.all()._raw_delete(model.objects.db)
+
+        self._seed_users(counts['users'])
+        self._seed_temples(counts['temples'])
+        temple_ids = array('q', Temple.objects.values_list('id', flat=True))
+        user_ids = list(User.objects.values_list('user_id', flat=True))
+
+        self._seed_locations(counts['locations'], user_ids)
+        self._seed_checkins(counts['checkins'], user_ids, temple_ids)
+        self._seed_reels(counts['reels'], user_ids, temple_ids)
+        reel_ids = array('q', Reels.objects.values_list('id', flat=True))
+        self._seed_likes(counts['likes'], user_ids, reel_ids)
+
+        # Keep the denormalized counter consistent with the generated check-ins
+        checkins = UserTempleCheckin.objects.filter(temple=OuterRef('pk')).values('temple').annotate(n=Count('id')).values('n')
+        Temple.objects.update(checkin_count=Coalesce(Subquery(checkins), 0))
+        # Bulk inserts skip the signals that maintain user stats
+        reconcile_user_stats()
+
+        invalidate_temple_caches()
+        # The check-in and reel lists show the new rows without their signals
+        touch_all_activity()
+        if temple_grid.snapshot_path:
+            # Running workers switch to the new temples without a table scan
+            temple_grid.write_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+        ))
+
+    def _point(self):
+        _, lat, lng, _ = self.random.choices(CITY_CENTERS, weights=self.city_weights)[0]
+        sigma_lat = self.spread_km / 111.0
+        sigma_lng = self.spread_km / (111.0 * cos(radians(lat)))
+        return self.random.gauss(lat, sigma_lat), self.random.gauss(lng, sigma_lng)
+
+    def _timestamp(self):
+        return self.now - timedelta(seconds=self.random.randrange(self.window_seconds))
+
+    def _insert(self, model, total, make_row, timestamp_fields=('created_at',), **bulk_kwargs):
+        fields = [model._meta.get_field(name) for name in timestamp_fields]
+        created = 0
+        with writable_timestamps(*fields):
+            while created < total:
+                size = min(BATCH_SIZE, total - created)
+                with transaction.atomic():
+                    model.objects.bulk_create([make_row(created + i) for i in range(size)], **bulk_kwargs)
+                created += size
+        self.stdout.write(f'  {model.__name__}: {total}')
+
+    def _seed_users(self, total):
+        offset = User.objects.count()
+
+        def make_row(n):
+            n += offset
+            return User(
+                user_id=f'seed-user-{n}',
+                name=f'{self.random.choice(FIRST_NAMES)} {n}',
+                image=f'https://picsum.photos/seed/{n}/200',
+                created_at=self._timestamp(),
+            )
+
+        self._insert(User, total, make_row, ignore_conflicts=True)
+
+    def _seed_temples(self, total):
+        offset = Temple.objects.count()
+
+        def make_row(n):
+            n += offset
+            lat, lng = self._point()
+            return Temple(
+                name=f'{self.random.choice(DEITIES)} {self.random.choice(SUFFIXES)} {n}',
+                google_place_id=f'seed-place-{n}',
+                srm=self.random.random() < 0.3,
+                chadhava=self.random.random() < 0.2,
+                puja=self.random.random() < 0.4,
+                yatra=self.random.random() < 0.1,
+                lat=lat,
+                lng=lng,
+                rating=round(self.random.uniform(3.0, 5.0), 1),
+                created_at=self._timestamp(),
+            )
+
+        self._insert(Temple, total, make_row, ignore_conflicts=True)
+
+        # Synthetic Places payloads for the new temples
+        new_temples = Temple.objects.filter(details__isnull=True).values_list('id', 'name', 'google_place_id', 'lat', 'lng', 'rating')
+        batch = []
+        for temple_id, name, place_id, lat, lng, rating in new_temples.iterator(chunk_size=BATCH_SIZE):
+            batch.append(TempleDetails(temple_id=temple_id, compressed_data=compress_raw_data({
+                'place_id': place_id,
+                'name': name,
+                'geometry': {'location': {'lat': lat, 'lng': lng}},
+                'rating': rating,
+                'user_ratings_total': self.random.randrange(10, 5000),
+                'types': ['hindu_temple', 'place_of_worship', 'point_of_interest'],
+            })))
+            if len(batch) >= BATCH_SIZE:
+                TempleDetails.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            TempleDetails.objects.bulk_create(batch)
+
+    def _seed_locations(self, total, user_ids):
+        def make_row(n):
+            lat, lng = self._point()
+            return Location(user_id=self.random.choice(user_ids), lat=lat, lng=lng, created_at=self._timestamp())
+
+        self._insert(Location, total, make_row)
+
+    def _seed_checkins(self, total, user_ids, temple_ids):
+        def make_row(n):
+            checkin_time = self._timestamp()
+            return UserTempleCheckin(
+                user_id=self.random.choice(user_ids),
+                temple_id=self.random.choice(temple_ids),
+                checkin_time=checkin_time,
+                created_at=checkin_time,
+            )
+
+        self._insert(UserTempleCheckin, total, make_row, timestamp_fields=('created_at', 'checkin_time'))
+
+    def _seed_reels(self, total, user_ids, temple_ids):
+        def make_row(n):
+            return Reels(
+                user_id=self.random.choice(user_ids),
+                temple_id=self.random.choice(temple_ids),
+                video_url=f'https://cdn.example.com/reels/{n}.mp4',
+                thumbnail=f'https://cdn.example.com/reels/{n}.jpg',
+                created_at=self._timestamp(),
+            )
+
+        self._insert(Reels, total, make_row)
+
+    def _seed_likes(self, total, user_ids, reel_ids):
+        if not reel_ids:
+            return
+
+        def make_row(n):
+            return ReelsLike(
+                user_id=self.random.choice(user_ids),
+                reel_id=self.random.choice(reel_ids),
+                like=self.random.random() < 0.9,
+                created_at=self._timestamp(),
+            )
+
+        # Duplicate (user, reel) pairs are dropped, so the final count can be slightly lower
+        self._insert(ReelsLike, total, make_row, ignore_conflicts=True)
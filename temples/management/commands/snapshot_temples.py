@@ -0,0 +1,36 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from temples.snapshot import open_snapshot
+from temples.spatial import temple_grid
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the memory-mapped temple snapshot (TEMPLE_SNAPSHOT_PATH) that worker "
+        "processes serve geo queries from. Running workers switch to the new file "
+        "within TEMPLE_SNAPSHOT_CHECK_SECONDS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--info', action='store_true', help='Describe the current snapshot instead of writing one')
+
+    def handle(self, *args, **options):
+        path = temple_grid.snapshot_path
+        if not path:
+            raise CommandError('TEMPLE_SNAPSHOT_PATH is not set.')
+
+        if not options['info']:
+            start = time.perf_counter()
+            temple_grid.write_snapshot()
+            self.stdout.write(f'Wrote {path} in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+        snapshot = open_snapshot(path)
+        if snapshot is None:
+            raise CommandError(f'No readable snapshot at {path}.')
+        self.stdout.write(
+            f'{len(snapshot)} temples in {len(snapshot.keys)} cells, {os.path.getsize(path)} bytes, '
+            f'generation {snapshot.generation}, temples version {snapshot.data_version}'
+        )
@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+def backup_database(source_path, target_path):
+    """
+    Copy a SQLite database into another with the online backup API. The copy
+    is one consistent snapshot; in WAL mode neither readers nor writers of the
+    source wait for it, and readers of the target see the old data until the
+    copy commits.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the read replicas listed in SQLITE_REPLICAS from the primary "
+        "database, once or every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep running and refresh the replicas this often (seconds)')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replicas only copies SQLite databases.')
+        replicas = [(alias, settings.DATABASES[alias]['NAME']) for alias in getattr(settings, 'DATABASE_REPLICAS', [])]
+        if not replicas:
+            raise CommandError('No replicas configured; add database files to SQLITE_REPLICAS.')
+
+        while True:
+            for alias, path in replicas:
+                start = time.perf_counter()
+                backup_database(primary['NAME'], path)
+                self.stdout.write(f'{alias}: copied to {path} in {(time.perf_counter() - start) * 1000:.0f} ms')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,298 @@
+import json
+import random
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from rest_framework.views import APIView
+
+from . import perf
+from .compression import compress, negotiate_encoding, view_compression
+from .db_routers import end_replica_reads, start_replica_reads
+from .query_budget import QueryBudgetExceeded, enforce_budgets, end_query_log, logger as query_budget_logger, start_query_log, view_budget
+
+
+class SyncAndAsyncMiddleware:
+    """
+    Base for middleware that serves WSGI and ASGI requests natively, so async
+    views are not pushed onto a thread by a synchronous middleware.
+    Subclasses implement __call__ for sync chains and __acall__ for async ones.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+
+class TrafficRecorderMiddleware(SyncAndAsyncMiddleware):
+    """
+    Samples API requests into a JSONL file (TRAFFIC_RECORD_PATH) that the
+    replay_traffic command can drive against a server later. Disabled unless
+    TRAFFIC_RECORD_SAMPLE_RATE is above zero.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'TRAFFIC_RECORD_SAMPLE_RATE', 0.0)
+        self.path = getattr(settings, 'TRAFFIC_RECORD_PATH', settings.BASE_DIR / 'requests.jsonl')
+        self.prefix = getattr(settings, 'TRAFFIC_RECORD_PREFIX', '/api/')
+        self.max_body_bytes = getattr(settings, 'TRAFFIC_RECORD_MAX_BODY_BYTES', 64 * 1024)
+
+    def _sampled(self, request):
+        return self.sample_rate and request.path.startswith(self.prefix) and random.random() < self.sample_rate
+
+    def _body(self, request):
+        # Read the body before the view consumes the stream; Django keeps a copy
+        return request.body[:self.max_body_bytes].decode('utf-8', 'replace') if request.method != 'GET' else ''
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._sampled(request):
+            return self.get_response(request)
+
+        body = self._body(request)
+        started_at = time.time()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._write(self._record(request, body, response, started_at, start))
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled(request):
+            return await self.get_response(request)
+
+        body = self._body(request)
+        started_at = time.time()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        await sync_to_async(self._write, thread_sensitive=False)(self._record(request, body, response, started_at, start))
+        return response
+
+    def _record(self, request, body, response, started_at, start):
+        duration_ms = (time.perf_counter() - start) * 1000
+        return {
+            'ts': round(started_at, 6),
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'content_type': request.content_type if body else '',
+            'body': body,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+        }
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as fp:
+                fp.write(line)
+
+
+class PerformanceMiddleware(SyncAndAsyncMiddleware):
+    """
+    Times every request and reports database, cache and render time in a
+    Server-Timing header. Totals are also added to the per-endpoint
+    histograms exposed by the metrics endpoint.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = getattr(settings, 'PERF_METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics, token = perf.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            perf.end_request(token)
+        return self._finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        metrics, token = perf.start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            perf.end_request(token)
+        return self._finish(request, response, metrics, start)
+
+    def _finish(self, request, response, metrics, start):
+        total_ms = (time.perf_counter() - start) * 1000
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_ms:.2f};desc="{metrics.db_count} queries"',
+            f'cache;desc="{metrics.cache_hits} hits {metrics.cache_misses} misses"',
+            f'render;dur={metrics.render_ms:.2f}',
+            f'compress;dur={metrics.compress_ms:.2f}',
+            f'app;dur={total_ms - metrics.db_ms - metrics.render_ms - metrics.compress_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ))
+
+        match = request.resolver_match
+        endpoint = f'{request.method} {match.route if match else "<unresolved>"}'
+        perf.endpoint_stats.record(endpoint, total_ms, metrics)
+        return response
+
+
+class QueryBudgetMiddleware(SyncAndAsyncMiddleware):
+    """
+    Checks each request against the query_budget declared on its view class.
+    Queries run before the view (by other middleware, or to authenticate the
+    client) don't count towards it. Over-budget requests log their SQL
+    grouped by call site and, when budgets are enforced (debug and test
+    runs), raise QueryBudgetExceeded.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        query_log, token = start_query_log()
+        request._query_log = query_log
+        try:
+            response = self.get_response(request)
+        finally:
+            end_query_log(token)
+        return self._check(request, response, query_log)
+
+    async def __acall__(self, request):
+        query_log, token = start_query_log()
+        request._query_log = query_log
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_query_log(token)
+        return self._check(request, response, query_log)
+
+    def _check(self, request, response, query_log):
+        if query_log.over_budget():
+            match = request.resolver_match
+            report = query_log.report(f'{request.method} {match.route if match else request.path}')
+            if enforce_budgets():
+                raise QueryBudgetExceeded(report)
+            query_budget_logger.warning(report)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if view_class is None:
+            return
+        if issubclass(view_class, APIView) and hasattr(request, 'user'):
+            # DRF views authenticate every request. The session and user
+            # lookups are the same whatever the view, so they run here,
+            # before the budget starts counting.
+            request.user.is_authenticated
+        request._query_log.budget = view_budget(view_class, request.method)
+
+
+class ReplicaRoutingMiddleware(SyncAndAsyncMiddleware):
+    """
+    Reads of GET and HEAD requests go to a read replica. A successful write
+    pins the client to the primary for REPLICA_PIN_SECONDS with a cookie, so
+    it reads its own writes while the replicas catch up.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    PIN_COOKIE = 'read_primary'
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = bool(getattr(settings, 'DATABASE_REPLICAS', []))
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+    def _use_replica(self, request):
+        return request.method in self.SAFE_METHODS and self.PIN_COOKIE not in request.COOKIES
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        token = start_replica_reads() if self._use_replica(request) else None
+        try:
+            response = self.get_response(request)
+        finally:
+            end_replica_reads(token)
+        return self._pin(request, response)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        token = start_replica_reads() if self._use_replica(request) else None
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_replica_reads(token)
+        return self._pin(request, response)
+
+    def _pin(self, request, response):
+        if request.method not in self.SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(self.PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class CompressionMiddleware(SyncAndAsyncMiddleware):
+    """
+    Compresses responses with gzip or deflate, whichever the client ranks
+    higher in Accept-Encoding. Views choose the size threshold and level
+    through their compression attribute (see view_compression()).
+    HTML is never compressed since pages carry CSRF tokens (BREACH), and
+    streaming responses are passed through untouched.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._compression = view_compression(getattr(view_func, 'view_class', None))
+
+    def _compress(self, request, response):
+        # Requests that never reached a view (404s, middleware responses) get the defaults
+        config = request._compression if hasattr(request, '_compression') else view_compression(None)
+        if config is None or response.streaming or response.has_header('Content-Encoding'):
+            return response
+        min_bytes, level = config
+        if len(response.content) < min_bytes or response.get('Content-Type', '').startswith('text/html'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        start = time.perf_counter()
+        compressed = compress(response.content, encoding, level)
+        perf.record_compress((time.perf_counter() - start) * 1000)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The compressed body is a different byte sequence, so a strong ETag no longer applies
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        return response
@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-19 10:00
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_raw_data_to_details(apps, schema_editor):
+    Temple = apps.get_model("temples", "Temple")
+    TempleDetails = apps.get_model("temples", "TempleDetails")
+
+    batch = []
+    for temple_id, raw_data in Temple.objects.values_list("id", "raw_data").iterator(chunk_size=500):
+        if raw_data is None:
+            continue
+        batch.append(TempleDetails(
+            temple_id=temple_id,
+            compressed_data=zlib.compress(json.dumps(raw_data, separators=(",", ":")).encode(), 6),
+        ))
+        if len(batch) >= 500:
+            TempleDetails.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TempleDetails.objects.bulk_create(batch)
+
+
+def restore_raw_data_from_details(apps, schema_editor):
+    Temple = apps.get_model("temples", "Temple")
+    TempleDetails = apps.get_model("temples", "TempleDetails")
+
+    for details in TempleDetails.objects.iterator(chunk_size=500):
+        raw_data = json.loads(zlib.decompress(bytes(details.compressed_data))) if details.compressed_data else None
+        Temple.objects.filter(pk=details.temple_id).update(raw_data=raw_data)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("temples", "0003_temple_google_place_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TempleDetails",
+            fields=[
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "temple",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="details",
+                        serialize=False,
+                        to="temples.temple",
+                    ),
+                ),
+                ("compressed_data", models.BinaryField(default=b"")),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RunPython(move_raw_data_to_details, restore_raw_data_from_details),
+        migrations.RemoveField(
+            model_name="temple",
+            name="raw_data",
+        ),
+    ]
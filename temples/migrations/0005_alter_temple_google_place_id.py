@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+def blank_place_ids_to_null(apps, schema_editor):
+    # Rows created before place ids were tracked share '' which would violate
+    # the unique index; NULLs do not.
+    Temple = apps.get_model("temples", "Temple")
+    Temple.objects.filter(google_place_id="").update(google_place_id=None)
+
+
+def dedupe_place_ids(apps, schema_editor):
+    # Temples sharing a place id were the same place entered twice. The
+    # oldest row keeps the id; the others are moved onto it, along with
+    # their check-ins and reels, and deleted.
+    Temple = apps.get_model("temples", "Temple")
+    TempleDetails = apps.get_model("temples", "TempleDetails")
+    UserTempleCheckin = apps.get_model("temples", "UserTempleCheckin")
+    Reels = apps.get_model("temples", "Reels")
+
+    duplicated = (
+        Temple.objects.filter(google_place_id__isnull=False)
+        .values("google_place_id")
+        .annotate(rows=models.Count("id"))
+        .filter(rows__gt=1)
+        .values_list("google_place_id", flat=True)
+    )
+    for place_id in duplicated:
+        keep, *duplicates = Temple.objects.filter(google_place_id=place_id).order_by("id")
+        duplicate_ids = [temple.id for temple in duplicates]
+        UserTempleCheckin.objects.filter(temple_id__in=duplicate_ids).update(temple_id=keep.id)
+        Reels.objects.filter(temple_id__in=duplicate_ids).update(temple_id=keep.id)
+        if not TempleDetails.objects.filter(temple_id=keep.id).exists():
+            details = TempleDetails.objects.filter(temple_id__in=duplicate_ids).order_by("-temple_id").first()
+            if details is not None:
+                TempleDetails.objects.create(temple_id=keep.id, compressed_data=details.compressed_data)
+        keep.checkin_count = UserTempleCheckin.objects.filter(temple_id=keep.id).count()
+        keep.save(update_fields=["checkin_count"])
+        Temple.objects.filter(id__in=duplicate_ids).delete()
+
+
+def null_place_ids_to_blank(apps, schema_editor):
+    Temple = apps.get_model("temples", "Temple")
+    Temple.objects.filter(google_place_id__isnull=True).update(google_place_id="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("temples", "0004_templedetails"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="temple",
+            name="google_place_id",
+            field=models.CharField(blank=True, default=None, max_length=512, null=True),
+        ),
+        migrations.RunPython(blank_place_ids_to_null, null_place_ids_to_blank),
+        migrations.RunPython(dedupe_place_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="temple",
+            name="google_place_id",
+            field=models.CharField(
+                blank=True, default=None, max_length=512, null=True, unique=True
+            ),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.2 on 2026-10-19 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Foreign keys whose lookups are now served by a composite index that starts
+# with the same column, so their single-column index only slows down writes
+REDUNDANT_FK_INDEXES = [
+    ("location", "user"),
+    ("reels", "temple"),
+    ("reelslike", "reel"),
+    ("usertemplecheckin", "temple"),
+    ("usertemplecheckin", "user"),
+]
+
+
+def single_column_indexes(schema_editor, model, column):
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return [
+        name for name, info in constraints.items()
+        if info["index"] and not info["unique"] and not info["primary_key"] and info["columns"] == [column]
+    ]
+
+
+def drop_redundant_fk_indexes(apps, schema_editor):
+    # Dropping the index directly; an AlterField(db_index=False) would make
+    # SQLite copy each of these tables
+    for model_name, field_name in REDUNDANT_FK_INDEXES:
+        model = apps.get_model("temples", model_name)
+        column = model._meta.get_field(field_name).column
+        for name in single_column_indexes(schema_editor, model, column):
+            schema_editor.execute(schema_editor._delete_index_sql(model, name))
+
+
+def restore_fk_indexes(apps, schema_editor):
+    for model_name, field_name in REDUNDANT_FK_INDEXES:
+        model = apps.get_model("temples", model_name)
+        field = model._meta.get_field(field_name)
+        if not single_column_indexes(schema_editor, model, field.column):
+            schema_editor.execute(schema_editor._create_index_sql(model, fields=[field]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("temples", "0005_alter_temple_google_place_id"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(fields=["user", "created_at"], name="location_user_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(fields=["lat", "lng"], name="location_lat_lng_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reels",
+            index=models.Index(fields=["temple", "created_at"], name="reels_temple_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reelslike",
+            index=models.Index(fields=["reel", "like"], name="reelslike_reel_like_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="temple",
+            index=models.Index(fields=["lat", "lng"], name="temple_lat_lng_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="usertemplecheckin",
+            index=models.Index(fields=["temple", "user"], name="checkin_temple_user_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="usertemplecheckin",
+            index=models.Index(fields=["user", "temple", "checkin_time"], name="checkin_user_temple_time_idx"),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="location",
+                    name="user",
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to="temples.user"),
+                ),
+                migrations.AlterField(
+                    model_name="reels",
+                    name="temple",
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to="temples.temple"),
+                ),
+                migrations.AlterField(
+                    model_name="reelslike",
+                    name="reel",
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to="temples.reels"),
+                ),
+                migrations.AlterField(
+                    model_name="usertemplecheckin",
+                    name="temple",
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to="temples.temple"),
+                ),
+                migrations.AlterField(
+                    model_name="usertemplecheckin",
+                    name="user",
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to="temples.user"),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(drop_redundant_fk_indexes, restore_fk_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-19 19:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_user_stats(apps, schema_editor):
+    # Counts as of this migration, computed here rather than with
+    # temples.stats, which follows the current models
+    User = apps.get_model("temples", "User")
+    UserStats = apps.get_model("temples", "UserStats")
+    UserTempleCheckin = apps.get_model("temples", "UserTempleCheckin")
+    Reels = apps.get_model("temples", "Reels")
+    ReelsLike = apps.get_model("temples", "ReelsLike")
+
+    stats = {user_id: {} for user_id in User.objects.values_list("pk", flat=True)}
+    checkins = UserTempleCheckin.objects.values("user_id").annotate(
+        checkin_count=Count("id"), temples_visited=Count("temple_id", distinct=True)
+    ).order_by()
+    for row in checkins:
+        stats[row["user_id"]].update(checkin_count=row["checkin_count"], temples_visited=row["temples_visited"])
+    for row in Reels.objects.values("user_id").annotate(reels_count=Count("id")).order_by():
+        stats[row["user_id"]]["reels_count"] = row["reels_count"]
+    likes = ReelsLike.objects.filter(like=True).values("reel__user_id").annotate(likes_received=Count("id")).order_by()
+    for row in likes:
+        stats[row["reel__user_id"]]["likes_received"] = row["likes_received"]
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id, **values) for user_id, values in stats.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("temples", "0006_index_pack"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Created at")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Updated at")),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="temples.user",
+                    ),
+                ),
+                ("checkin_count", models.PositiveIntegerField(default=0)),
+                ("temples_visited", models.PositiveIntegerField(default=0)),
+                ("reels_count", models.PositiveIntegerField(default=0)),
+                ("likes_received", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-19 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("temples", "0007_userstats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(fields=["created_at", "id"], name="location_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reels",
+            index=models.Index(fields=["created_at", "id"], name="reels_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="usertemplecheckin",
+            index=models.Index(fields=["created_at", "id"], name="checkin_created_id_idx"),
+        ),
+    ]
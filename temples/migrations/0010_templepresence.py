@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-19 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("temples", "0009_dataversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TemplePresence",
+            fields=[
+                ("user", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="presence", serialize=False, to="temples.user")),
+                ("seen_at", models.DateTimeField()),
+                ("temple", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to="temples.temple")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["temple", "seen_at"], name="presence_temple_seen_idx")],
+            },
+        ),
+    ]
@@ -1,8 +1,29 @@
+import json
+import zlib
+
 from django.db import models
 
 from mixins.models import BaseModel
 
 
+def compress_raw_data(raw_data):
+    """
+    Serialize a Google Places payload to zlib-compressed JSON bytes.
+    """
+    if raw_data is None:
+        return b''
+    return zlib.compress(json.dumps(raw_data, separators=(',', ':')).encode(), 6)
+
+
+def decompress_raw_data(compressed_data):
+    """
+    Inverse of compress_raw_data. Empty payloads decode to None.
+    """
+    if not compressed_data:
+        return None
+    return json.loads(zlib.decompress(bytes(compressed_data)))
+
+
 class User(BaseModel):
     user_id = models.CharField(max_length=100, primary_key=True)
     name = models.CharField(max_length=100)
@@ -12,9 +33,22 @@ class User(BaseModel):
         return self.name
 
 
+class UserStats(BaseModel):
+    """
+    Activity totals shown on a user's profile, kept up to date by the writes
+    that change them (see temples/stats.py) instead of aggregating the
+    check-in, reel and like tables on every read.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    checkin_count = models.PositiveIntegerField(default=0)
+    temples_visited = models.PositiveIntegerField(default=0)
+    reels_count = models.PositiveIntegerField(default=0)
+    likes_received = models.PositiveIntegerField(default=0)
+
+
 class Temple(BaseModel):
     name = models.CharField(max_length=128, default=None)
-    google_place_id = models.CharField(max_length=512, default=None)
+    google_place_id = models.CharField(max_length=512, unique=True, null=True, blank=True, default=None)
     srm = models.BooleanField(default=False)
     chadhava = models.BooleanField(default=False)
     puja = models.BooleanField(default=False)
@@ -23,38 +57,152 @@ class Temple(BaseModel):
     lng = models.FloatField(default=0.0)
     rating = models.FloatField(default=0.0)
     checkin_count = models.PositiveIntegerField(default=0)
-    raw_data = models.JSONField(default=None)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lat', 'lng'], name='temple_lat_lng_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def raw_data(self):
+        """
+        Google Places payload for this temple. It lives in TempleDetails and is
+        only fetched (one extra query, unless select_related('details') was used)
+        when something actually reads it.
+        """
+        try:
+            return self.details.raw_data
+        except TempleDetails.DoesNotExist:
+            return None
+
+    @raw_data.setter
+    def raw_data(self, value):
+        # Written to the TempleDetails row when the temple is saved
+        try:
+            details = self.details
+        except TempleDetails.DoesNotExist:
+            details = TempleDetails(temple=self)
+            self.details = details
+        details.raw_data = value
+        self._unsaved_details = details
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        details = self.__dict__.pop('_unsaved_details', None)
+        if details is not None:
+            details.temple = self
+            details.save()
+
+
+class TempleDetails(BaseModel):
+    """
+    Large, rarely read temple payloads kept out of the hot Temple table.
+    raw_data is stored as zlib-compressed JSON.
+    """
+    temple = models.OneToOneField(Temple, on_delete=models.CASCADE, primary_key=True, related_name='details')
+    compressed_data = models.BinaryField(default=b'')
+
+    @property
+    def raw_data(self):
+        return decompress_raw_data(self.compressed_data)
+
+    @raw_data.setter
+    def raw_data(self, value):
+        self.compressed_data = compress_raw_data(value)
+
 
 class UserTempleCheckin(BaseModel):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    temple = models.ForeignKey(Temple, on_delete=models.CASCADE)
+    # Both foreign keys lead a composite index below, which also serves their lookups
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    temple = models.ForeignKey(Temple, on_delete=models.CASCADE, db_index=False)
     checkin_time = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Leaderboard: check-ins of a temple grouped by user
+            models.Index(fields=['temple', 'user'], name='checkin_temple_user_idx'),
+            # Cooldown: a user's latest check-in at a temple
+            models.Index(fields=['user', 'temple', 'checkin_time'], name='checkin_user_temple_time_idx'),
+            # Exports, read in (created_at, id) order
+            models.Index(fields=['created_at', 'id'], name='checkin_created_id_idx'),
+        ]
+
 
 class Reels(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    temple = models.ForeignKey(Temple, on_delete=models.CASCADE)
+    temple = models.ForeignKey(Temple, on_delete=models.CASCADE, db_index=False)
     video_url = models.URLField()
     thumbnail = models.URLField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # A temple's reels feed, newest first
+            models.Index(fields=['temple', 'created_at'], name='reels_temple_created_idx'),
+            # Exports, read in (created_at, id) order
+            models.Index(fields=['created_at', 'id'], name='reels_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"Reel by {self.user.name} at {self.temple.srm}"
 
 
 class ReelsLike(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    reel = models.ForeignKey(Reels, on_delete=models.CASCADE)
+    reel = models.ForeignKey(Reels, on_delete=models.CASCADE, db_index=False)
     like = models.BooleanField(default=True)
 
     class Meta:
         unique_together = ('user', 'reel')
+        indexes = [
+            # Like counts per reel
+            models.Index(fields=['reel', 'like'], name='reelslike_reel_like_idx'),
+        ]
 
 
 class Location(BaseModel):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     lat = models.FloatField()
     lng = models.FloatField()
+
+    class Meta:
+        indexes = [
+            # A user's latest location
+            models.Index(fields=['user', 'created_at'], name='location_user_created_idx'),
+            # Bounding-box lookups for nearby users
+            models.Index(fields=['lat', 'lng'], name='location_lat_lng_idx'),
+            # Exports, read in (created_at, id) order
+            models.Index(fields=['created_at', 'id'], name='location_created_id_idx'),
+        ]
+
+
+class TemplePresence(models.Model):
+    """
+    The temple a user is at, from their latest location ping inside its
+    check-in geofence (see temples/crowd.py). One row per user, so rows of
+    users who went quiet are replaced on their next ping rather than piling up.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='presence')
+    temple = models.ForeignKey(Temple, on_delete=models.CASCADE, db_index=False)
+    seen_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Crowd counts: users seen at a temple since the presence cutoff
+            models.Index(fields=['temple', 'seen_at'], name='presence_temple_seen_idx'),
+        ]
+
+
+class DataVersion(models.Model):
+    """
+    Named version counters shared by every process through the database, for
+    state derived from the tables that each process keeps in memory or in its
+    own cache (see temples/caches.py).
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
@@ -0,0 +1,160 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Counters for the request being served, collected by PerformanceMiddleware.
+    """
+    __slots__ = ('db_count', 'db_ms', 'cache_hits', 'cache_misses', 'render_ms', 'compress_ms')
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.render_ms = 0.0
+        self.compress_ms = 0.0
+
+
+def current_metrics():
+    return _current.get()
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_cache(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def record_render(duration_ms):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.render_ms += duration_ms
+
+
+def record_compress(duration_ms):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.compress_ms += duration_ms
+
+
+def db_timer(execute, sql, params, many, context):
+    """
+    connection.execute_wrapper hook counting queries and their time.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_count += 1
+        metrics.db_ms += (time.perf_counter() - start) * 1000
+
+
+class EndpointHistogram:
+    __slots__ = (
+        'buckets', 'count', 'total_ms', 'db_count', 'db_ms', 'cache_hits', 'cache_misses', 'render_ms', 'compress_ms',
+    )
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.render_ms = 0.0
+        self.compress_ms = 0.0
+
+    def add(self, total_ms, metrics):
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, total_ms)] += 1
+        self.count += 1
+        self.total_ms += total_ms
+        self.db_count += metrics.db_count
+        self.db_ms += metrics.db_ms
+        self.cache_hits += metrics.cache_hits
+        self.cache_misses += metrics.cache_misses
+        self.render_ms += metrics.render_ms
+        self.compress_ms += metrics.compress_ms
+
+    def percentile(self, pct):
+        """
+        Upper bound of the bucket holding the pct-th percentile request.
+        """
+        target = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return None
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / count, 3),
+            'p50_ms_le': self.percentile(50),
+            'p95_ms_le': self.percentile(95),
+            'p99_ms_le': self.percentile(99),
+            'mean_db_queries': round(self.db_count / count, 2),
+            'mean_db_ms': round(self.db_ms / count, 3),
+            'mean_render_ms': round(self.render_ms / count, 3),
+            'mean_compress_ms': round(self.compress_ms / count, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'buckets': {
+                (f'le_{bound}' if bound is not None else 'inf'): count
+                for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.buckets)
+            },
+        }
+
+
+class EndpointStats:
+    """
+    Per-process latency histograms keyed by "METHOD route".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def record(self, endpoint, total_ms, metrics):
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = EndpointHistogram()
+            histogram.add(total_ms, metrics)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: histogram.as_dict() for endpoint, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+
+endpoint_stats = EndpointStats()
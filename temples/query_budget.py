@@ -0,0 +1,116 @@
+import logging
+import os
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = str(settings.BASE_DIR)
+# Frames from these files are the budget machinery itself, never the culprit
+IGNORED_FILES = (__file__, os.path.join(PROJECT_ROOT, 'temples', 'perf.py'))
+
+
+_unbudgeted = ContextVar('unbudgeted', default=False)
+_current_log = ContextVar('query_log', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+@contextmanager
+def unbudgeted():
+    """
+    Leave the enclosed queries out of the request's budget, for one-off work
+    such as rebuilding an in-memory index.
+    """
+    token = _unbudgeted.set(True)
+    try:
+        yield
+    finally:
+        _unbudgeted.reset(token)
+
+
+def view_budget(view_class, method):
+    """
+    The query budget a view declares for an HTTP method, either as a single
+    number (query_budget = 3) or per method (query_budget = {'get': 2, 'post': 5}).
+    """
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(method.lower())
+    return budget
+
+
+def call_site():
+    """
+    The innermost project frame (outside site-packages) that issued a query.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_ROOT) and 'site-packages' not in filename and filename not in IGNORED_FILES:
+            return f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return '<outside project>'
+
+
+class QueryLog:
+    """
+    The queries a request ran and where they came from, recorded once a
+    budget is known for the request.
+    """
+
+    def __init__(self):
+        self.budget = None
+        self.queries = []
+
+    def over_budget(self):
+        return self.budget is not None and len(self.queries) > self.budget
+
+    def report(self, endpoint):
+        """
+        Human readable summary of the queries grouped by call site, busiest first.
+        """
+        by_site = defaultdict(list)
+        for sql, site in self.queries:
+            by_site[site].append(sql)
+
+        lines = [f'{endpoint} ran {len(self.queries)} queries (budget {self.budget})']
+        for site, statements in sorted(by_site.items(), key=lambda item: -len(item[1])):
+            lines.append(f'  {len(statements)}x {site}')
+            lines.append(f'      {statements[0][:300]}')
+        return '\n'.join(lines)
+
+
+def start_query_log():
+    query_log = QueryLog()
+    return query_log, _current_log.set(query_log)
+
+
+def end_query_log(token):
+    _current_log.reset(token)
+
+
+def budget_hook(execute, sql, params, many, context):
+    """
+    connection.execute_wrapper hook adding each query to the current
+    request's QueryLog.
+    """
+    query_log = _current_log.get()
+    if query_log is not None and query_log.budget is not None and not _unbudgeted.get():
+        query_log.queries.append((sql, call_site()))
+    return execute(sql, params, many, context)
+
+
+def enforce_budgets():
+    """
+    Budgets fail the request in debug and test runs; in production they are
+    only logged.
+    """
+    return getattr(settings, 'QUERY_BUDGET_ENFORCE', settings.DEBUG) or 'PYTEST_CURRENT_TEST' in os.environ
@@ -0,0 +1,224 @@
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from itertools import islice
+from math import cos, hypot, radians
+
+from django.conf import settings
+
+from .geo import calculate_distance
+from .indexes import TempleIndex
+from .models import Temple, TempleDetails
+
+
+NON_WORD = re.compile(r'[\W_]+')
+
+# Scores for the different kinds of match, before distance bias
+NAME_PREFIX_SCORE = 1.0
+WORD_PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.6
+MIN_FUZZY_SIMILARITY = 0.6
+
+# Prefix scans and fuzzy candidate sets are capped so a one-letter query or a
+# trigram shared by every temple ("tem") cannot make a lookup linear
+MAX_PREFIX_SCAN = 300
+MAX_FUZZY_CANDIDATES = 500
+
+KM_PER_DEGREE = 111.0
+
+
+def normalize_name(value):
+    """
+    Case-fold and collapse punctuation/whitespace so 'Shri  Ram-Mandir' and
+    'shri ram mandir' index identically.
+    """
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    return NON_WORD.sub(' ', value).strip()
+
+
+def trigrams(value):
+    padded = f'  {value} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def raw_data_names(raw_data):
+    """
+    Names found in a Google Places payload (legacy 'name' or v1 'displayName').
+    """
+    places = raw_data if isinstance(raw_data, list) else [raw_data]
+    names = []
+    for place in places:
+        if not isinstance(place, dict):
+            continue
+        if isinstance(place.get('name'), str):
+            names.append(place['name'])
+        display_name = place.get('displayName')
+        if isinstance(display_name, dict) and isinstance(display_name.get('text'), str):
+            names.append(display_name['text'])
+    return names
+
+
+class TempleNameIndex(TempleIndex):
+    """
+    Autocomplete index over Temple.name and the names in raw_data.
+
+    Prefix matches come from a sorted list of (key, temple_id, score) tuples,
+    with one key per word start of every name, searched with bisect. Fuzzy
+    matches come from a trigram -> temple ids inverted index.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._temples = {}
+        self._keys = []
+        self._grams = {}
+
+    def build(self):
+        extra_names = {}
+        for details in TempleDetails.objects.only('temple_id', 'compressed_data').iterator(chunk_size=1000):
+            extra_names[details.temple_id] = raw_data_names(details.raw_data)
+
+        self._temples = {}
+        self._keys = []
+        self._grams = {}
+        rows = Temple.objects.values_list('id', 'name', 'lat', 'lng', 'rating').iterator(chunk_size=1000)
+        for temple_id, name, lat, lng, rating in rows:
+            self._add(temple_id, name, lat, lng, rating, extra_names.get(temple_id, []), sort=False)
+        self._keys.sort()
+
+    def update(self, temple):
+        self.remove(temple.pk)
+        self._add(temple.pk, temple.name, temple.lat, temple.lng, temple.rating, raw_data_names(temple.raw_data))
+
+    def remove(self, temple_id):
+        entry = self._temples.pop(temple_id, None)
+        if entry is None:
+            return
+        for key, score in self._name_keys(entry['names']):
+            i = bisect_left(self._keys, (key, temple_id, score))
+            if i < len(self._keys) and self._keys[i] == (key, temple_id, score):
+                del self._keys[i]
+        for gram in entry['grams']:
+            postings = self._grams.get(gram)
+            if postings is not None:
+                postings.discard(temple_id)
+                if not postings:
+                    del self._grams[gram]
+
+    def search(self, query, limit=10, lat=None, lng=None):
+        """
+        Return up to `limit` temples ranked by match quality, optionally biased
+        towards temples near (lat, lng).
+        """
+        # Updates and rebuilds change the index in place, under the same lock
+        with self._lock:
+            return self._search(query, limit, lat, lng)
+
+    def _search(self, query, limit, lat, lng):
+        query = normalize_name(query)
+        if not query:
+            return []
+
+        scores = {}
+
+        # Prefix matches: full-name prefixes score higher than word prefixes
+        # and shorter names rank above longer ones
+        keys = self._keys
+        i = bisect_left(keys, (query,))
+        end = min(len(keys), i + MAX_PREFIX_SCAN)
+        while i < end and keys[i][0].startswith(query):
+            key, temple_id, score = keys[i]
+            score += 0.1 * len(query) / len(key)
+            if score > scores.get(temple_id, 0):
+                scores[temple_id] = score
+            i += 1
+
+        # Fuzzy matches only when prefixes did not fill the page. Candidates
+        # come from the rarest query trigrams, then are scored by the share of
+        # query trigrams their names contain.
+        if len(scores) < limit and len(query) >= 3:
+            query_grams = trigrams(query)
+            postings = sorted(
+                (self._grams[gram] for gram in query_grams if gram in self._grams),
+                key=len
+            )
+            candidates = set()
+            for posting in postings:
+                candidates.update(islice(posting, MAX_FUZZY_CANDIDATES - len(candidates)))
+                if len(candidates) >= MAX_FUZZY_CANDIDATES:
+                    break
+            for temple_id in candidates:
+                if temple_id in scores:
+                    continue
+                similarity = len(query_grams & self._temples[temple_id]['grams']) / len(query_grams)
+                if similarity >= MIN_FUZZY_SIMILARITY:
+                    scores[temple_id] = FUZZY_SCORE * similarity
+
+        if lat is not None and lng is not None:
+            # Equirectangular distance is plenty for ranking; exact haversine
+            # distances are only computed for the returned page
+            bias_km = getattr(settings, 'TEMPLE_SEARCH_DISTANCE_BIAS_KM', 25)
+            lat_scale = cos(radians(lat))
+            temples = self._temples
+            for temple_id, score in scores.items():
+                entry = temples[temple_id]
+                approx_km = KM_PER_DEGREE * hypot(entry['lat'] - lat, (entry['lng'] - lng) * lat_scale)
+                scores[temple_id] = score / (1 + approx_km / bias_km)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], self._temples[item[0]]['rating']))
+
+        results = []
+        for temple_id, score in top:
+            entry = self._temples[temple_id]
+            result = {
+                'id': temple_id,
+                'name': entry['name'],
+                'lat': entry['lat'],
+                'lng': entry['lng'],
+                'rating': entry['rating'],
+                'score': round(score, 4),
+            }
+            if lat is not None and lng is not None:
+                result['distance'] = round(calculate_distance(lat, lng, entry['lat'], entry['lng']), 2)
+            results.append(result)
+        return results
+
+    def _add(self, temple_id, name, lat, lng, rating, extra_names, sort=True):
+        names = []
+        for value in [name, *extra_names]:
+            normalized = normalize_name(value)
+            if normalized and normalized not in names:
+                names.append(normalized)
+
+        grams = set()
+        for normalized in names:
+            grams |= trigrams(normalized)
+
+        self._temples[temple_id] = {
+            'name': name,
+            'lat': lat,
+            'lng': lng,
+            'rating': rating,
+            'names': names,
+            'grams': grams,
+        }
+        for key, score in self._name_keys(names):
+            if sort:
+                insort(self._keys, (key, temple_id, score))
+            else:
+                self._keys.append((key, temple_id, score))
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(temple_id)
+
+    @staticmethod
+    def _name_keys(names):
+        keys = {}
+        for normalized in names:
+            keys[normalized] = NAME_PREFIX_SCORE
+            for match in re.finditer(r' ', normalized):
+                keys.setdefault(normalized[match.end():], WORD_PREFIX_SCORE)
+        return keys.items()
+
+
+temple_name_index = TempleNameIndex()
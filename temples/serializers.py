@@ -1,27 +1,58 @@
+from django.db.models import Count, Q
 from rest_framework import serializers
 from .models import User, Location, Temple, UserTempleCheckin, Reels
+from .user_cards import UserCardListSerializer, UserCardSerializer, UserNameMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+def normalize_raw_data(raw_data):
+    """
+    Google Places payloads are returned to clients as a list of place dicts.
+    """
+    if raw_data is None:
+        return []
+    if isinstance(raw_data, dict):
+        return [raw_data]
+    if isinstance(raw_data, list):
+        return raw_data
+    return []
+
+
+class RawDataOptionalMixin:
+    """
+    Drops the (large, separately stored) raw data field when the view passed
+    include_raw_data=False in the serializer context; it is included otherwise.
+    """
+    raw_data_field = 'raw_data'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('include_raw_data', True):
+            fields.pop(self.raw_data_field, None)
+        return fields
+
+
+class UserSerializer(UserCardSerializer):
     last_lat = serializers.SerializerMethodField()
     last_lng = serializers.SerializerMethodField()
 
-    class Meta:
-        model = User
-        fields = ('user_id', 'name', 'image', 'last_lat', 'last_lng', 'created_at', 'updated_at')
+    class Meta(UserCardSerializer.Meta):
+        fields = ('user_id', 'name', 'image', 'last_lat', 'last_lng', 'stats', 'created_at', 'updated_at')
         read_only_fields = ('created_at', 'updated_at')
 
+    def _last_location(self, obj):
+        # Views that already loaded the latest location attach it as
+        # obj.last_location; otherwise it is fetched once for both fields
+        if not hasattr(obj, 'last_location'):
+            obj.last_location = obj.location_set.order_by('-created_at').first()
+        return obj.last_location
+
     def get_last_lat(self, obj):
-        try:
-            return obj.location_set.order_by('-created_at').first().lat
-        except:
-            return None
+        location = self._last_location(obj)
+        return location.lat if location else None
 
     def get_last_lng(self, obj):
-        try:
-            return obj.location_set.order_by('-created_at').first().lng
-        except:
-            return None
+        location = self._last_location(obj)
+        return location.lng if location else None
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -34,16 +65,15 @@ class UserCreateSerializer(serializers.ModelSerializer):
         }
 
 
-class LocationSerializer(serializers.ModelSerializer):
-    user_name = serializers.CharField(source='user.name', read_only=True)
-
+class LocationSerializer(UserNameMixin, serializers.ModelSerializer):
     class Meta:
         model = Location
         fields = ('id', 'user', 'user_name', 'lat', 'lng', 'created_at', 'updated_at')
         read_only_fields = ('created_at', 'updated_at')
+        list_serializer_class = UserCardListSerializer
 
 
-class TempleSerializer(serializers.ModelSerializer):
+class TempleSerializer(RawDataOptionalMixin, serializers.ModelSerializer):
     distance = serializers.FloatField(required=False)
     raw_data = serializers.SerializerMethodField()
 
@@ -55,20 +85,14 @@ class TempleSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at')
 
     def get_raw_data(self, obj):
-        raw_data = obj.raw_data
-        if raw_data is None:
-            return []
-        if isinstance(raw_data, dict):
-            return [raw_data]
-        if isinstance(raw_data, list):
-            return raw_data
-        return []
+        return normalize_raw_data(obj.raw_data)
+
 
+class UserTempleCheckinSerializer(RawDataOptionalMixin, UserNameMixin, serializers.ModelSerializer):
+    raw_data_field = 'temple_raw_data'
 
-class UserTempleCheckinSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
     temple = serializers.PrimaryKeyRelatedField(queryset=Temple.objects.all())
-    user_name = serializers.CharField(source='user.name', read_only=True)
     temple_name = serializers.CharField(source='temple.name', read_only=True)
     temple_raw_data = serializers.SerializerMethodField()
 
@@ -76,20 +100,13 @@ class UserTempleCheckinSerializer(serializers.ModelSerializer):
         model = UserTempleCheckin
         fields = ('id', 'user', 'user_name', 'temple', 'temple_name', 'checkin_time', 'created_at', 'updated_at', 'temple_raw_data')
         read_only_fields = ('created_at', 'updated_at', 'checkin_time')
+        list_serializer_class = UserCardListSerializer
 
     def get_temple_raw_data(self, obj):
-        raw_data = obj.temple.raw_data
-        if raw_data is None:
-            return []
-        if isinstance(raw_data, dict):
-            return [raw_data]
-        if isinstance(raw_data, list):
-            return raw_data
-        return []
+        return normalize_raw_data(obj.temple.raw_data)
 
 
-class ReelsSerializer(serializers.ModelSerializer):
-    user_name = serializers.CharField(source='user.name', read_only=True)
+class ReelsSerializer(UserNameMixin, serializers.ModelSerializer):
     temple_name = serializers.CharField(source='temple.name', read_only=True)
     like_count = serializers.SerializerMethodField()
 
@@ -97,6 +114,17 @@ class ReelsSerializer(serializers.ModelSerializer):
         model = Reels
         fields = ('id', 'user', 'user_name', 'temple', 'temple_name', 'video_url', 'thumbnail', 'like_count', 'created_at', 'updated_at')
         read_only_fields = ('created_at', 'updated_at')
+        list_serializer_class = UserCardListSerializer
 
     def get_like_count(self, obj):
-        return obj.reelslike_set.filter(like=True).count() 
\ No newline at end of file
+        # Querysets from with_like_counts() carry the count already
+        if hasattr(obj, 'positive_like_count'):
+            return obj.positive_like_count
+        return obj.reelslike_set.filter(like=True).count()
+
+
+def with_like_counts(queryset):
+    """
+    Annotate a Reels queryset with the like count ReelsSerializer reports.
+    """
+    return queryset.annotate(positive_like_count=Count('reelslike', filter=Q(reelslike__like=True))) 
\ No newline at end of file
@@ -0,0 +1,226 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .caches import (
+    advance_temples_version, invalidate_temple_detail, invalidate_user_cards, touch_all_activity, touch_temple_activity,
+)
+from .crowd import crowd_tracker
+from .indexes import INDEXED_FIELDS, registered_indexes
+from .models import Location, Reels, ReelsLike, Temple, TempleDetails, User, UserStats, UserTempleCheckin
+from .perf import db_timer
+from .query_budget import budget_hook
+from .stats import (
+    adjust_user_stats, deleted_with_owner, owner_stats_users, reconcile_user_stats, reel_owner_id, visited_temple,
+)
+
+
+@receiver(connection_created)
+def install_query_hooks(sender, connection, **kwargs):
+    # Every connection gets the hooks, including those opened by worker threads
+    # of async views; they find the current request through context variables.
+    # Inserted first so execute_wrapper() blocks still pop their own wrapper.
+    for hook in (db_timer, budget_hook):
+        if hook not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, hook)
+
+
+def details_follow(temple):
+    # Temple.save() saves a raw_data change right after the temple row, and
+    # the TempleDetails receivers then cover both
+    return '_unsaved_details' in temple.__dict__
+
+
+@receiver(post_save, sender=Temple)
+def update_temple_indexes(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields) or details_follow(instance):
+        return
+    previous, version = advance_temples_version()
+    for index in registered_indexes():
+        index.apply_update(instance, previous, version)
+
+
+@receiver(post_delete, sender=Temple)
+def remove_from_temple_indexes(sender, instance, **kwargs):
+    previous, version = advance_temples_version()
+    for index in registered_indexes():
+        index.apply_remove(instance.pk, previous, version)
+
+
+@receiver(post_save, sender=TempleDetails)
+def update_temple_indexes_for_details(sender, instance, **kwargs):
+    previous, version = advance_temples_version()
+    for index in registered_indexes():
+        index.apply_update(instance.temple, previous, version)
+
+
+@receiver(post_save, sender=Temple)
+@receiver(post_delete, sender=Temple)
+def invalidate_temple_detail_for_temple(sender, instance, **kwargs):
+    if not details_follow(instance):
+        invalidate_temple_detail(instance.pk)
+
+
+@receiver(post_save, sender=TempleDetails)
+@receiver(post_delete, sender=TempleDetails)
+@receiver(post_save, sender=UserTempleCheckin)
+@receiver(post_delete, sender=UserTempleCheckin)
+@receiver(post_save, sender=Reels)
+@receiver(post_delete, sender=Reels)
+def invalidate_temple_detail_for_related(sender, instance, **kwargs):
+    invalidate_temple_detail(instance.temple_id)
+
+
+# Version stamps of the check-in and reel lists move in the same transaction
+# as the write, so a read can't pair the new stamp with the old rows. Rows
+# deleted along with their temple or user are covered by the stamps that
+# delete moves itself.
+
+# Temple fields the check-in and reel lists show; raw data comes from TempleDetails
+LISTED_TEMPLE_FIELDS = {'name'}
+
+
+@receiver(post_save, sender=Temple)
+@receiver(post_delete, sender=Temple)
+def touch_activity_for_temple(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not LISTED_TEMPLE_FIELDS.intersection(update_fields):
+        return
+    touch_temple_activity(instance.pk)
+
+
+@receiver(post_save, sender=TempleDetails)
+@receiver(post_delete, sender=TempleDetails)
+def touch_activity_for_details(sender, instance, origin=None, **kwargs):
+    if not deleted_with_owner(origin):
+        touch_temple_activity(instance.temple_id, ('checkins',))
+
+
+@receiver(post_save, sender=UserTempleCheckin)
+@receiver(post_delete, sender=UserTempleCheckin)
+def touch_checkins(sender, instance, origin=None, **kwargs):
+    if not deleted_with_owner(origin):
+        touch_temple_activity(instance.temple_id, ('checkins',))
+
+
+@receiver(post_save, sender=Reels)
+@receiver(post_delete, sender=Reels)
+def touch_reels(sender, instance, origin=None, **kwargs):
+    if not deleted_with_owner(origin):
+        touch_temple_activity(instance.temple_id, ('reels',))
+
+
+@receiver(post_init, sender=User)
+def remember_listed_name(sender, instance, **kwargs):
+    # Saves compare against it, so only renames move every list's stamp.
+    # Read from __dict__, which leaves a deferred name unloaded (None).
+    instance._listed_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=User)
+def touch_listed_user_names(sender, instance, created, **kwargs):
+    # A new user isn't in any list yet
+    renamed = instance._listed_name is None or instance.name != instance._listed_name
+    instance._listed_name = instance.name
+    if renamed and not created:
+        touch_all_activity()
+
+
+@receiver(post_delete, sender=User)
+def touch_lists_of_deleted_user(sender, instance, **kwargs):
+    # Their check-ins and reels leave the lists without stamps of their own
+    touch_all_activity()
+
+
+@receiver(post_save, sender=Location)
+def record_crowd_ping(sender, instance, created, **kwargs):
+    if created:
+        crowd_tracker.record_ping(instance.user_id, instance.lat, instance.lng)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_card(sender, instance, **kwargs):
+    invalidate_user_cards([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.create(user=instance)
+
+
+@receiver(post_save, sender=UserTempleCheckin)
+def count_checkin(sender, instance, created, **kwargs):
+    if created:
+        first_visit = not visited_temple(instance.user_id, instance.temple_id, exclude_id=instance.pk)
+        adjust_user_stats(instance.user_id, checkin_count=1, temples_visited=int(first_visit))
+
+
+@receiver(post_delete, sender=UserTempleCheckin)
+def uncount_checkin(sender, instance, origin=None, **kwargs):
+    if deleted_with_owner(origin):
+        return
+    last_visit = not visited_temple(instance.user_id, instance.temple_id)
+    adjust_user_stats(instance.user_id, checkin_count=-1, temples_visited=-int(last_visit))
+
+
+@receiver(post_save, sender=Reels)
+def count_reel(sender, instance, created, **kwargs):
+    if created:
+        adjust_user_stats(instance.user_id, reels_count=1)
+
+
+@receiver(post_delete, sender=Reels)
+def uncount_reel(sender, instance, origin=None, **kwargs):
+    if deleted_with_owner(origin):
+        return
+    adjust_user_stats(instance.user_id, reels_count=-1)
+
+
+@receiver(post_init, sender=ReelsLike)
+def remember_like(sender, instance, **kwargs):
+    # Saves compare against it to tell whether a like was given or taken back
+    instance._counted_like = instance.like if instance.pk is not None else False
+
+
+@receiver(post_save, sender=ReelsLike)
+def count_like(sender, instance, **kwargs):
+    delta = int(instance.like) - int(instance._counted_like)
+    instance._counted_like = instance.like
+    owner_id = reel_owner_id(instance) if delta else None
+    if owner_id is not None:
+        adjust_user_stats(owner_id, likes_received=delta)
+        # The reel's like count changed
+        touch_reels_of(instance)
+
+
+@receiver(post_delete, sender=ReelsLike)
+def uncount_like(sender, instance, origin=None, **kwargs):
+    if deleted_with_owner(origin):
+        return
+    owner_id = reel_owner_id(instance) if instance._counted_like else None
+    if owner_id is not None:
+        adjust_user_stats(owner_id, likes_received=-1)
+        touch_reels_of(instance)
+
+
+def touch_reels_of(like):
+    touch_temple_activity(like.reel.temple_id, ('reels',))
+
+
+# Deleting a temple or user cascades to its check-ins, reels and likes. Rather
+# than adjusting counters row by row, the users whose stats it changes are
+# looked up before the delete and recomputed once after it.
+
+@receiver(pre_delete, sender=Temple)
+@receiver(pre_delete, sender=User)
+def find_owner_stats_users(sender, instance, **kwargs):
+    instance._stats_users = owner_stats_users(instance)
+
+
+@receiver(post_delete, sender=Temple)
+@receiver(post_delete, sender=User)
+def reconcile_owner_stats_users(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_stats_users', None)
+    if user_ids:
+        reconcile_user_stats(user_ids=user_ids)
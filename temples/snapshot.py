@@ -0,0 +1,169 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+# Snapshot file layout, little-endian:
+#   header: magic, format, temple count, cell count, data version, generation, cell size
+#   cells, sorted by key: key (Q), first row (I, one extra entry closing the
+#     last cell), union of the rows' flags (B), highest rating (d)
+#   rows, grouped by cell: id (q), lat (d), lng (d), rating (d), flags (B)
+# Every column starts on an 8 byte boundary so it can be cast in place.
+MAGIC = b'TMPLSNAP'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIIIqqd')
+
+# Grid rows and columns are signed; offsetting them keeps packed keys in
+# the same order as (row, col)
+_KEY_OFFSET = 1 << 31
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def cell_key(row, col):
+    return ((row + _KEY_OFFSET) << 32) | (col + _KEY_OFFSET)
+
+
+def _aligned(offset):
+    return (offset + 7) & ~7
+
+
+def write_snapshot(path, rows, cell_degrees, data_version):
+    """
+    Write rows of ((row, col), temple_id, lat, lng, flags, rating) to a
+    snapshot file. The file is written next to path and moved over it in
+    one step, so readers see either the old snapshot or the new one.
+    Returns the new snapshot's generation.
+    """
+    rows = sorted((cell_key(*cell), temple_id, lat, lng, flags, rating) for cell, temple_id, lat, lng, flags, rating in rows)
+
+    keys, starts, cell_flags, max_ratings = array('Q'), array('I'), array('B'), array('d')
+    for position, (key, _, _, _, flags, rating) in enumerate(rows):
+        if not keys or keys[-1] != key:
+            keys.append(key)
+            starts.append(position)
+            cell_flags.append(0)
+            max_ratings.append(rating)
+        cell_flags[-1] |= flags
+        max_ratings[-1] = max(max_ratings[-1], rating)
+    starts.append(len(rows))
+
+    columns = [
+        keys, starts, cell_flags, max_ratings,
+        array('q', (row[1] for row in rows)),
+        array('d', (row[2] for row in rows)),
+        array('d', (row[3] for row in rows)),
+        array('d', (row[5] for row in rows)),
+        array('B', (row[4] for row in rows)),
+    ]
+    generation = time.time_ns()
+
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}.')
+    try:
+        # mkstemp creates the file private to its owner; workers only need to read it
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(rows), len(keys), data_version, generation, cell_degrees))
+            for column in columns:
+                fp.write(b'\0' * (_aligned(fp.tell()) - fp.tell()))
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                fp.write(column.tobytes())
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return generation
+
+
+class TempleSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file. Every process that
+    opens the same file shares one copy of its pages, and opening it costs
+    nothing beyond reading the header; the columns are read in place.
+    Replacing the file does not affect snapshots already open.
+    """
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise SnapshotError('Snapshots can only be read in place on little-endian machines.')
+        with open(path, 'rb') as fp:
+            stat = os.fstat(fp.fileno())
+            if stat.st_size < HEADER.size:
+                raise SnapshotError(f'{path} is not a temple snapshot.')
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.file_id = (stat.st_ino, stat.st_mtime_ns)
+
+        magic, format_version, count, cell_count, self.data_version, self.generation, self.cell_degrees = (
+            HEADER.unpack_from(self._mmap)
+        )
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotError(f'{path} is not a format {FORMAT_VERSION} temple snapshot.')
+
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+
+        def column(fmt, length):
+            nonlocal offset
+            start = _aligned(offset)
+            offset = start + struct.calcsize(fmt) * length
+            if offset > len(view):
+                raise SnapshotError(f'{path} is truncated.')
+            return view[start:offset].cast(fmt)
+
+        self.keys = column('Q', cell_count)
+        self.starts = column('I', cell_count + 1)
+        self.cell_flags = column('B', cell_count)
+        self.max_ratings = column('d', cell_count)
+        self.ids = column('q', count)
+        self.lats = column('d', count)
+        self.lngs = column('d', count)
+        self.ratings = column('d', count)
+        self.flags = column('B', count)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def replaced(self):
+        """
+        Whether the file at path has been replaced since it was opened.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) != self.file_id
+
+    def cells(self, min_row, min_col, max_row, max_col):
+        """
+        (first row, end row, flag union, max rating) of the non-empty cells
+        inside the given range of grid rows and columns.
+        """
+        keys, starts = self.keys, self.starts
+        for row in range(min_row, max_row + 1):
+            first = bisect_left(keys, cell_key(row, min_col))
+            last = bisect_right(keys, cell_key(row, max_col), first)
+            for index in range(first, last):
+                yield starts[index], starts[index + 1], self.cell_flags[index], self.max_ratings[index]
+
+
+def open_snapshot(path):
+    """
+    The snapshot at path, or None when there is none or it can't be read.
+    """
+    try:
+        return TempleSnapshot(path)
+    except (OSError, ValueError, SnapshotError):
+        return None
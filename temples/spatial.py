@@ -0,0 +1,326 @@
+import logging
+import time
+from array import array
+from math import cos, floor, radians
+
+from django.conf import settings
+from django.db import transaction
+
+from .caches import temples_version
+from .geo import calculate_distance
+from .indexes import TempleIndex
+from .models import Temple
+from .query_budget import unbudgeted
+from .snapshot import open_snapshot, write_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.0
+
+# Bit positions of the boolean temple attributes in the per-temple flag byte
+FLAG_FIELDS = ('srm', 'chadhava', 'puja', 'yatra')
+FLAG_BITS = {field: 1 << bit for bit, field in enumerate(FLAG_FIELDS)}
+
+
+def temple_flags(temple):
+    flags = 0
+    for field, bit in FLAG_BITS.items():
+        if getattr(temple, field):
+            flags |= bit
+    return flags
+
+
+def degree_window(lat, radius_km):
+    """
+    Half-widths in degrees of a bounding box covering radius_km around lat.
+    Longitude degrees shrink with latitude, so the box widens accordingly.
+    """
+    lat_degrees = radius_km / KM_PER_DEGREE
+    lng_degrees = radius_km / (KM_PER_DEGREE * max(cos(radians(lat)), 0.01))
+    return lat_degrees, lng_degrees
+
+
+class GridCell:
+    """
+    Temples in one grid cell stored as parallel compact arrays, plus one
+    bitmap per flag (bit i set when the temple at position i has the flag)
+    and cell-wide summaries so whole cells can be skipped.
+    """
+    __slots__ = ('ids', 'lats', 'lngs', 'flags', 'ratings', 'bitmaps', 'flag_union', 'max_rating')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.lats = array('d')
+        self.lngs = array('d')
+        self.flags = array('B')
+        self.ratings = array('d')
+        self.bitmaps = {}
+        self.flag_union = 0
+        self.max_rating = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, temple_id, lat, lng, flags, rating):
+        self.ids.append(temple_id)
+        self.lats.append(lat)
+        self.lngs.append(lng)
+        self.flags.append(flags)
+        self.ratings.append(rating)
+
+    def delete(self, temple_id):
+        position = self.ids.index(temple_id)
+        for column in (self.ids, self.lats, self.lngs, self.flags, self.ratings):
+            del column[position]
+
+    def reindex(self):
+        self.bitmaps = {bit: 0 for bit in FLAG_BITS.values()}
+        for position, flags in enumerate(self.flags):
+            for bit in self.bitmaps:
+                if flags & bit:
+                    self.bitmaps[bit] |= 1 << position
+        self.flag_union = 0
+        for flags in self.flags:
+            self.flag_union |= flags
+        self.max_rating = max(self.ratings, default=0.0)
+
+    def positions(self, flags_mask):
+        """
+        Positions of temples having every flag in flags_mask.
+        """
+        if not flags_mask:
+            return range(len(self.ids))
+        matching = -1
+        for bit, bitmap in self.bitmaps.items():
+            if flags_mask & bit:
+                matching &= bitmap
+        positions = []
+        while matching:
+            low_bit = matching & -matching
+            positions.append(low_bit.bit_length() - 1)
+            matching ^= low_bit
+        return positions
+
+
+class TempleGrid(TempleIndex):
+    """
+    Uniform lat/lng grid over all temples used to answer nearby queries
+    without scanning the Temple table. Attribute filters are applied per cell
+    from the flag bitmaps before any distance math.
+
+    With TEMPLE_SNAPSHOT_PATH set, the grid is kept in a memory-mapped
+    snapshot file shared by all processes instead (see snapshot.py). A
+    process builds from an existing snapshot without querying the table,
+    changes rewrite the file, and every process picks up a new file within
+    TEMPLE_SNAPSHOT_CHECK_SECONDS.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cell_degrees = getattr(settings, 'TEMPLE_GRID_CELL_DEGREES', 0.05)
+        self.snapshot_path = getattr(settings, 'TEMPLE_SNAPSHOT_PATH', None)
+        self.snapshot_check_seconds = getattr(settings, 'TEMPLE_SNAPSHOT_CHECK_SECONDS', 1.0)
+        self._cells = {}
+        self._cell_of = {}
+        self._snapshot = None
+        self._snapshot_checked = 0.0
+
+    def cell_key(self, lat, lng):
+        return (floor(lat / self.cell_degrees), floor(lng / self.cell_degrees))
+
+    def _rows(self):
+        """
+        (temple_id, lat, lng, flags, rating) for every temple.
+        """
+        rows = Temple.objects.values_list('id', 'lat', 'lng', 'rating', *FLAG_FIELDS).iterator(chunk_size=2000)
+        for temple_id, lat, lng, rating, *flag_values in rows:
+            flags = 0
+            for value, bit in zip(flag_values, FLAG_BITS.values()):
+                if value:
+                    flags |= bit
+            yield temple_id, lat, lng, flags, rating
+
+    def build(self):
+        if self.snapshot_path:
+            snapshot = self._load_snapshot()
+            if snapshot is not None:
+                self._use_snapshot(snapshot)
+                return
+
+        cells = {}
+        cell_of = {}
+        for temple_id, lat, lng, flags, rating in self._rows():
+            key = self.cell_key(lat, lng)
+            cells.setdefault(key, GridCell()).append(temple_id, lat, lng, flags, rating)
+            cell_of[temple_id] = key
+
+        for cell in cells.values():
+            cell.reindex()
+        self._cells = cells
+        self._cell_of = cell_of
+        self._snapshot = None
+
+    def write_snapshot(self, version=None):
+        """
+        Write every temple to TEMPLE_SNAPSHOT_PATH and return the generation
+        of the new snapshot.
+        """
+        rows = (
+            (self.cell_key(lat, lng), temple_id, lat, lng, flags, rating)
+            for temple_id, lat, lng, flags, rating in self._rows()
+        )
+        return write_snapshot(
+            self.snapshot_path, rows, self.cell_degrees, version if version is not None else temples_version()
+        )
+
+    def _load_snapshot(self):
+        """
+        The current snapshot, written first if it is missing or stale, or
+        None when it can't be written.
+        """
+        # A snapshot written under another temples version predates a bulk change
+        version = temples_version()
+        snapshot = open_snapshot(self.snapshot_path)
+        if snapshot is None or snapshot.data_version != version or snapshot.cell_degrees != self.cell_degrees:
+            try:
+                self.write_snapshot(version)
+            except OSError:
+                logger.warning('Could not write the temple snapshot %s', self.snapshot_path, exc_info=True)
+                return None
+            snapshot = open_snapshot(self.snapshot_path)
+        return snapshot
+
+    def _use_snapshot(self, snapshot):
+        self._snapshot = snapshot
+        self._snapshot_checked = time.monotonic()
+        self._cells = {}
+        self._cell_of = {}
+
+    def _current_snapshot(self):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if now - self._snapshot_checked >= self.snapshot_check_seconds:
+            self._snapshot_checked = now
+            if snapshot.replaced():
+                # Another process rewrote it. Queries running on the old
+                # snapshot keep their mapping until they finish.
+                with self._lock:
+                    replacement = open_snapshot(self.snapshot_path)
+                    if (
+                        replacement is not None and replacement.cell_degrees == self.cell_degrees
+                        and self._snapshot is snapshot
+                    ):
+                        self._use_snapshot(replacement)
+        return self._snapshot
+
+    def _rewrite_snapshot(self):
+        with self._lock:
+            try:
+                with unbudgeted():
+                    self.write_snapshot(self._version)
+            except OSError:
+                logger.warning('Could not write the temple snapshot %s', self.snapshot_path, exc_info=True)
+                snapshot = None
+            else:
+                snapshot = open_snapshot(self.snapshot_path)
+            if snapshot is not None:
+                self._use_snapshot(snapshot)
+            else:
+                # Rebuilt from the table on next use
+                self._version = None
+
+    def _schedule_rewrite(self):
+        # The file is rewritten whole, once the change is committed, and once
+        # for all the temples a transaction changes. A rolled back transaction
+        # drops its callback, so the next change schedules a new one.
+        connection = transaction.get_connection()
+        if not any(callback == self._rewrite_snapshot for _, callback, _ in connection.run_on_commit):
+            transaction.on_commit(self._rewrite_snapshot)
+
+    def update(self, temple):
+        if self._snapshot is not None:
+            self._schedule_rewrite()
+            return
+        self.remove(temple.pk)
+        key = self.cell_key(temple.lat, temple.lng)
+        cell = self._cells.setdefault(key, GridCell())
+        cell.append(temple.pk, temple.lat, temple.lng, temple_flags(temple), temple.rating)
+        cell.reindex()
+        self._cell_of[temple.pk] = key
+
+    def remove(self, temple_id):
+        if self._snapshot is not None:
+            self._schedule_rewrite()
+            return
+        key = self._cell_of.pop(temple_id, None)
+        if key is None:
+            return
+        cell = self._cells[key]
+        cell.delete(temple_id)
+        if len(cell):
+            cell.reindex()
+        else:
+            del self._cells[key]
+
+    def nearby(self, lat, lng, radius_km, flags_mask=0, min_rating=None):
+        """
+        Return (distance_km, temple_id) pairs within radius_km of (lat, lng),
+        sorted by distance, keeping only temples that have every flag in
+        flags_mask and a rating of at least min_rating.
+        """
+        lat_degrees, lng_degrees = degree_window(lat, radius_km)
+        min_row, min_col = self.cell_key(lat - lat_degrees, lng - lng_degrees)
+        max_row, max_col = self.cell_key(lat + lat_degrees, lng + lng_degrees)
+
+        matches = []
+        for ids, lats, lngs, ratings, positions in self._candidates(
+            min_row, min_col, max_row, max_col, flags_mask, min_rating
+        ):
+            for position in positions:
+                if min_rating is not None and ratings[position] < min_rating:
+                    continue
+                temple_lat = lats[position]
+                temple_lng = lngs[position]
+                # Cheap bounding-box rejection before the haversine
+                if abs(temple_lat - lat) > lat_degrees or abs(temple_lng - lng) > lng_degrees:
+                    continue
+                distance = calculate_distance(lat, lng, temple_lat, temple_lng)
+                if distance <= radius_km:
+                    matches.append((distance, ids[position]))
+
+        matches.sort()
+        return matches
+
+    def _candidates(self, min_row, min_col, max_row, max_col, flags_mask, min_rating):
+        """
+        (ids, lats, lngs, ratings, positions) for each cell in the range that
+        can hold matches; positions are those having every flag in flags_mask.
+        """
+        if self._snapshot is not None:
+            snapshot = self._current_snapshot()
+            flags = snapshot.flags
+            for start, end, flag_union, max_rating in snapshot.cells(min_row, min_col, max_row, max_col):
+                if flag_union & flags_mask != flags_mask:
+                    continue
+                if min_rating is not None and max_rating < min_rating:
+                    continue
+                positions = range(start, end)
+                if flags_mask:
+                    positions = [position for position in positions if flags[position] & flags_mask == flags_mask]
+                yield snapshot.ids, snapshot.lats, snapshot.lngs, snapshot.ratings, positions
+            return
+
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                cell = self._cells.get((row, col))
+                if cell is None:
+                    continue
+                if cell.flag_union & flags_mask != flags_mask:
+                    continue
+                if min_rating is not None and cell.max_rating < min_rating:
+                    continue
+                yield cell.ids, cell.lats, cell.lngs, cell.ratings, cell.positions(flags_mask)
+
+
+temple_grid = TempleGrid()
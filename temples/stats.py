@@ -0,0 +1,146 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, QuerySet
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .caches import invalidate_user_cards
+from .models import Reels, ReelsLike, Temple, User, UserStats, UserTempleCheckin
+
+
+# Counters of UserStats, all maintained by adjust_user_stats()
+STAT_FIELDS = ('checkin_count', 'temples_visited', 'reels_count', 'likes_received')
+
+
+def adjust_user_stats(user_id, **deltas):
+    """
+    Add deltas (e.g. checkin_count=1) to a user's stats in one UPDATE.
+    Called from the signal handlers of the writes that change them; callers
+    wrap those writes in transaction.atomic() so the counters commit or roll
+    back together with them.
+    """
+    changes = {field: Greatest(F(field) + delta, 0) for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    # The stats are part of the user's card; dropped once the new values
+    # are visible, so a concurrent read can't cache the old ones again
+    transaction.on_commit(lambda: invalidate_user_cards([user_id]))
+    if UserStats.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **changes):
+        return
+    # Users inserted in bulk have no stats row until their first activity;
+    # reconcile_user_stats() fills in their history. Decrements are left out
+    # since they also run while the user is being deleted.
+    increments = {field: delta for field, delta in deltas.items() if delta > 0}
+    if increments:
+        _, created = UserStats.objects.get_or_create(user_id=user_id, defaults=increments)
+        if not created:
+            UserStats.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **changes)
+
+
+def visited_temple(user_id, temple_id, exclude_id=None):
+    """
+    Whether the user has a check-in at the temple, other than exclude_id.
+    """
+    checkins = UserTempleCheckin.objects.filter(user_id=user_id, temple_id=temple_id)
+    if exclude_id is not None:
+        checkins = checkins.exclude(pk=exclude_id)
+    return checkins.exists()
+
+
+def reel_owner_id(like):
+    # Reuse the reel when the caller already loaded it
+    if like.reel_id is None:
+        return None
+    if 'reel' in like._state.fields_cache:
+        return like.reel.user_id
+    return Reels.objects.filter(pk=like.reel_id).values_list('user_id', flat=True).first()
+
+
+def deleted_with_owner(origin):
+    """
+    Whether a row is going because a temple or user it belongs to is being
+    deleted (origin being what delete() was called on). The per-row counter
+    updates are skipped for those; the stats of the users they touched are
+    recomputed once the cascade is done, see owner_stats_users().
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in (Temple, User)
+
+
+def owner_stats_users(instance):
+    """
+    Ids of the users whose stats deleting a temple or user changes, other
+    than the deleted user's own: those with check-ins or reels at the
+    temple, or whose reels the user liked.
+    """
+    if isinstance(instance, Temple):
+        users = UserTempleCheckin.objects.filter(temple_id=instance.pk).values_list('user_id').union(
+            Reels.objects.filter(temple_id=instance.pk).values_list('user_id')
+        )
+    else:
+        users = ReelsLike.objects.filter(user_id=instance.pk, like=True).exclude(
+            reel__user_id=instance.pk
+        ).values_list('reel__user_id').distinct()
+    return [user_id for user_id, in users]
+
+
+def compute_user_stats(user_ids):
+    """
+    {user_id: {field: value}} recomputed from the check-in, reel and like
+    tables, for users with any activity among user_ids.
+    """
+    stats = {}
+    checkins = UserTempleCheckin.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        checkin_count=Count('id'), temples_visited=Count('temple_id', distinct=True)
+    ).order_by()
+    for row in checkins:
+        stats.setdefault(row['user_id'], {}).update(checkin_count=row['checkin_count'], temples_visited=row['temples_visited'])
+    reels = Reels.objects.filter(user_id__in=user_ids).values('user_id').annotate(reels_count=Count('id')).order_by()
+    for row in reels:
+        stats.setdefault(row['user_id'], {})['reels_count'] = row['reels_count']
+    likes = ReelsLike.objects.filter(like=True, reel__user_id__in=user_ids).values('reel__user_id').annotate(
+        likes_received=Count('id')
+    ).order_by()
+    for row in likes:
+        stats.setdefault(row['reel__user_id'], {})['likes_received'] = row['likes_received']
+    return stats
+
+
+def reconcile_user_stats(batch_size=1000, dry_run=False, user_ids=None):
+    """
+    Recompute the stats of every user, or of those among user_ids, from the
+    source tables and fix the rows that drifted (writes that skip signals,
+    such as queryset updates and raw SQL) or are missing. Returns (users
+    checked, rows fixed).
+    """
+    checked = fixed = 0
+    users = User.objects.order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    user_ids = list(users.values_list('pk', flat=True))
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        computed = compute_user_stats(batch)
+        existing = UserStats.objects.in_bulk(batch)
+        to_create, to_update = [], []
+        now = timezone.now()
+        for user_id in batch:
+            values = dict.fromkeys(STAT_FIELDS, 0)
+            values.update(computed.get(user_id, {}))
+            stats = existing.get(user_id)
+            if stats is None:
+                to_create.append(UserStats(user_id=user_id, **values))
+            elif any(getattr(stats, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(stats, field, value)
+                stats.updated_at = now
+                to_update.append(stats)
+        checked += len(batch)
+        fixed += len(to_create) + len(to_update)
+        if not dry_run:
+            UserStats.objects.bulk_create(to_create, batch_size=batch_size)
+            UserStats.objects.bulk_update(to_update, (*STAT_FIELDS, 'updated_at'), batch_size=batch_size)
+            fixed_ids = [stats.user_id for stats in to_create + to_update]
+            transaction.on_commit(partial(invalidate_user_cards, fixed_ids))
+    return checked, fixed
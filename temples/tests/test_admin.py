@@ -0,0 +1,83 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth.models import User as AuthUser
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from temples.models import Location, User
+
+
+class KeysetChangeListTests(TestCase):
+    url = '/admin/temples/location/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.pilgrim = User.objects.create(user_id='pilgrim', name='Pilgrim')
+        cls.sadhu = User.objects.create(user_id='sadhu', name='Sadhu')
+        start = timezone.now() - timedelta(hours=1)
+        cls.locations = [
+            Location.objects.create(user=cls.sadhu if i % 4 == 0 else cls.pilgrim, lat=25.3, lng=83.0) for i in range(10)
+        ]
+        # Rows sharing a timestamp, across page boundaries, are told apart by id
+        for i, location in enumerate(cls.locations):
+            location.created_at = start + timedelta(minutes=i // 3)
+        Location.objects.bulk_update(cls.locations, ['created_at'])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        patcher = mock.patch.object(admin.site._registry[Location], 'list_per_page', 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pages(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            cl = response.context['cl']
+            pages.append([location.pk for location in cl.result_list])
+            url = cl.next_page_url and self.url + cl.next_page_url
+        return pages
+
+    def newest_first(self, locations):
+        return [location.pk for location in sorted(locations, key=lambda location: (location.created_at, location.pk), reverse=True)]
+
+    def test_pages_through_every_row_newest_first(self):
+        pages = self.pages(self.url)
+
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertEqual(sum(pages, []), self.newest_first(self.locations))
+
+    def test_next_page_links_keep_the_search(self):
+        pages = self.pages(f'{self.url}?q=sadhu')
+
+        self.assertEqual(sum(pages, []), self.newest_first(self.locations[::4]))
+
+    def test_deeper_pages_cost_the_same(self):
+        def page_queries(url):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            return len(queries), response.context['cl'].next_page_url
+
+        first, next_url = page_queries(self.url)
+        second, _ = page_queries(self.url + next_url)
+        self.assertEqual(first, second)
+
+    def test_invalid_cursor(self):
+        for cursor in ['yesterday', '2024-13-45T00:00:00,5']:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'after': cursor})
+                self.assertRedirects(response, f'{self.url}?e=1', fetch_redirect_response=False)
+
+    @override_settings(ADMIN_COUNT_LIMIT=5)
+    def test_large_unfiltered_tables_show_an_estimated_count(self):
+        estimate = self.client.get(self.url).context['cl'].result_count
+        counted = self.client.get(f'{self.url}?q=sadhu').context['cl'].result_count
+
+        self.assertEqual(estimate, max(location.pk for location in self.locations))
+        self.assertEqual(counted, 3)
@@ -0,0 +1,50 @@
+import random
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from temples.management.commands.benchmark import API_PREFIX, ASYNC_ROUTES, load_samples, route_cases
+
+
+# Async views run their queries on other threads, which need committed data
+class AsyncViewTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        call_command('seed', scale=200, stdout=StringIO())
+        self.samples = load_samples(random.Random(1), 3)
+
+    def get(self, route, sample):
+        _, path, data = route_cases()[route](sample)
+        return self.client.get(API_PREFIX + path, data)
+
+    def test_async_views_answer_like_their_apiviews(self):
+        for route in ASYNC_ROUTES:
+            for sample in self.samples:
+                with self.subTest(route=route, user_id=sample['user_id']):
+                    cache.clear()
+                    expected = self.get(route, sample)
+                    cache.clear()
+                    response = self.get(f'async/{route}', sample)
+
+                    self.assertEqual(response.status_code, expected.status_code)
+                    self.assertEqual(response.json(), expected.json())
+                    self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    def test_invalid_and_missing_like_their_apiviews(self):
+        sample = self.samples[0]
+        for path, data in [
+            ('nearby-users', {'lat': 'north', 'lng': sample['lng']}),
+            ('nearby-temples', {'lat': sample['lat']}),
+            ('nearby-temples', {'lat': sample['lat'], 'lng': sample['lng'], 'radius': 'inf'}),
+            ('temples/999999/reels', {}),
+            (f"temples/999999/check-ins/{sample['user_id']}", {}),
+            (f"temples/{sample['temple_id']}/check-ins/nobody", {'lat': 'north'}),
+        ]:
+            with self.subTest(path=path, data=data):
+                expected = self.client.get(API_PREFIX + path, data)
+                response = self.client.get(f'{API_PREFIX}async/{path}', data)
+
+                self.assertLess(expected.status_code, 500)
+                self.assertEqual((response.status_code, response.json()), (expected.status_code, expected.json()))
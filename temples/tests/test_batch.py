@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from temples.models import Temple, User
+
+
+class BatchTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.temple = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+        self.user = User.objects.create(user_id='pilgrim', name='Pilgrim')
+
+    def batch(self, *specs, status=200):
+        response = self.client.post('/api/batch', {'requests': list(specs)}, content_type='application/json')
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def responses(self, *specs):
+        return self.batch(*specs)['data']['responses']
+
+    def test_reads_answer_like_separate_requests(self):
+        specs = [
+            {'path': f'/api/temples/{self.temple.pk}'},
+            {'path': '/api/temples/search', 'query': {'q': 'kashi'}},
+            {'path': '/api/nearby-temples?lat=25.31&lng=83.01', 'query': {'details': 'false'}},
+        ]
+        responses = self.responses(*specs)
+
+        direct = [
+            self.client.get(f'/api/temples/{self.temple.pk}'),
+            self.client.get('/api/temples/search', {'q': 'kashi'}),
+            self.client.get('/api/nearby-temples', {'lat': 25.31, 'lng': 83.01, 'details': 'false'}),
+        ]
+        self.assertEqual(
+            [(response['status'], response['body']) for response in responses],
+            [(response.status_code, response.json()) for response in direct],
+        )
+
+    def test_writes_run_in_order_between_reads(self):
+        checkins = {'path': f'/api/temples/{self.temple.pk}/check-ins'}
+        responses = self.responses(
+            checkins,
+            {'method': 'POST', 'path': f'/api/temples/{self.temple.pk}/check-ins', 'body': {'user': 'pilgrim'}},
+            checkins,
+        )
+
+        self.assertEqual([response['status'] for response in responses], [200, 201, 200])
+        self.assertEqual(len(responses[0]['body']['data']['checkins']), 0)
+        self.assertEqual(len(responses[2]['body']['data']['checkins']), 1)
+
+    def test_conditional_sub_requests(self):
+        path = f'/api/temples/{self.temple.pk}/reels'
+        first, = self.responses({'path': path})
+        etag = first['headers']['ETag']
+
+        second, = self.responses({'path': path, 'headers': {'If-None-Match': etag}})
+        self.assertEqual((second['status'], second['body']), (304, None))
+
+    def test_failed_sub_requests_answer_on_their_own(self):
+        responses = self.responses(
+            {'path': '/api/nowhere'},
+            {'path': '/api/batch'},
+            {'path': '/api/exports/checkins'},
+            {'path': '/api/temples/search', 'query': {'q': 'kashi', 'limit': 'many'}},
+            {'path': f'/api/temples/{self.temple.pk}'},
+        )
+
+        self.assertEqual([response['status'] for response in responses], [404, 400, 400, 400, 200])
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_invalid_batches(self):
+        self.batch(status=400)
+        self.batch({'path': '/api/temples/search'}, {'path': '/api/temples/search'}, {'path': '/api/temples/search'}, status=400)
+        self.batch({'method': 'TRACE', 'path': '/api/temples/search'}, status=400)
+        self.batch({'path': '/api/temples/search', 'headers': {'Cookie': 'x'}}, status=400)
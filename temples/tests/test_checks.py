@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase, override_settings
+
+from temples.checks import check_shared_cache
+
+
+SHARED_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(DEBUG=False, TESTING=False)
+    def test_process_local_cache_outside_debug(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['temples.W001'])
+
+    @override_settings(DEBUG=True, TESTING=False)
+    def test_debug_runs_are_single_process(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(DEBUG=False, TESTING=True)
+    def test_test_runs_are_single_process(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(DEBUG=False, TESTING=False, CACHES=SHARED_CACHES)
+    def test_other_backends(self):
+        self.assertEqual(check_shared_cache(None), [])
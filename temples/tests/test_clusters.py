@@ -0,0 +1,113 @@
+from io import StringIO
+from math import floor
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from temples.clusters import DETAIL_ZOOM, ZOOM0_CELL_DEGREES, temple_clusters
+from temples.models import Temple
+
+
+# Bounding boxes (min_lat, min_lng, max_lat, max_lng): all of India, north
+# India, around Delhi and around Varanasi
+BOXES = [(6.0, 68.0, 36.0, 98.0), (22.0, 72.0, 32.0, 90.0), (28.0, 76.5, 29.2, 77.8), (25.2, 82.9, 25.4, 83.1)]
+
+
+class TempleClusterPyramidTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed', scale=2000, stdout=StringIO())
+
+    def expected(self, box, zoom):
+        # Clusters computed from a scan of the table: (count, representative id) per cell
+        min_lat, min_lng, max_lat, max_lng = box
+        cell_degrees = ZOOM0_CELL_DEGREES / 2 ** zoom
+        cells = {}
+        for temple in Temple.objects.order_by('-rating', 'id'):
+            row, col = floor(temple.lat / cell_degrees), floor(temple.lng / cell_degrees)
+            if floor(min_lat / cell_degrees) <= row <= floor(max_lat / cell_degrees) and \
+                    floor(min_lng / cell_degrees) <= col <= floor(max_lng / cell_degrees):
+                count, representative = cells.get((row, col), (0, temple.pk))
+                cells[(row, col)] = (count + 1, representative)
+        return sorted(cells.values())
+
+    def clusters(self, box, zoom):
+        return sorted(
+            (cluster['count'], cluster['temple']['id'])
+            for cluster in temple_clusters.ensure_built().clusters(*box, zoom)
+        )
+
+    def assertMatchesScan(self):
+        for box in BOXES:
+            for zoom in (0, 4, 8, DETAIL_ZOOM - 1):
+                with self.subTest(box=box, zoom=zoom):
+                    self.assertEqual(self.clusters(box, zoom), self.expected(box, zoom))
+
+    def test_clusters_match_a_table_scan(self):
+        self.assertMatchesScan()
+
+    def test_follows_moves_and_deletes(self):
+        temple_clusters.ensure_built()
+        best = Temple.objects.order_by('-rating', 'id').first()
+        best.delete()
+        moved = Temple.objects.order_by('id').first()
+        moved.lat, moved.lng = 25.3109, 83.0107
+        moved.save()
+
+        self.assertMatchesScan()
+
+    def test_detail_zoom_temples(self):
+        box = BOXES[2]
+        temples = temple_clusters.ensure_built().temples(*box, limit=500)
+
+        expected = Temple.objects.filter(lat__range=(box[0], box[2]), lng__range=(box[1], box[3]))
+        self.assertEqual(sorted(temple[0] for temple in temples), sorted(expected.values_list('id', flat=True)))
+        self.assertIsNone(temple_clusters.temples(*BOXES[0], limit=len(temples)))
+
+
+class TempleViewportTests(TestCase):
+    url = '/api/temples/viewport'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kashi = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107, rating=4.8)
+        cls.sankat = Temple.objects.create(name='Sankat Mochan', lat=25.2860, lng=82.9990, rating=4.7)
+        cls.delhi = Temple.objects.create(name='Shri Vishnu Mandir', lat=28.6139, lng=77.2090, rating=4.2)
+
+    def viewport(self, zoom, box=(25.2, 82.9, 25.4, 83.1)):
+        min_lat, min_lng, max_lat, max_lng = box
+        response = self.client.get(self.url, {
+            'min_lat': min_lat, 'min_lng': min_lng, 'max_lat': max_lat, 'max_lng': max_lng, 'zoom': zoom,
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_clusters_below_the_detail_zoom(self):
+        data = self.viewport(4, box=(6.0, 68.0, 36.0, 98.0))
+
+        self.assertTrue(data['clustered'])
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(sum(cluster['count'] for cluster in data['clusters']), 3)
+
+    def test_temples_from_the_detail_zoom(self):
+        data = self.viewport(DETAIL_ZOOM)
+
+        self.assertFalse(data['clustered'])
+        self.assertEqual(sorted(temple['id'] for temple in data['temples']), sorted([self.kashi.pk, self.sankat.pk]))
+
+    def test_invalid_viewports(self):
+        valid = {'min_lat': 25.2, 'min_lng': 82.9, 'max_lat': 25.4, 'max_lng': 83.1, 'zoom': 10}
+        for params in [
+            {'min_lat': 'inf'},
+            {'max_lng': 'inf'},
+            {'min_lat': 'nan'},
+            {'max_lat': 91},
+            {'min_lat': -91},
+            {'min_lng': -181},
+            {'max_lng': 180.5},
+            {'min_lat': 26},
+            {'zoom': -1},
+            {'zoom': 'far'},
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, {**valid, **params}).status_code, 400)
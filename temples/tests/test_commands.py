@@ -0,0 +1,209 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase
+
+from temples import urls as temple_urls
+from temples.management.commands import explain_queries
+from temples.management.commands.benchmark import ASYNC_ROUTES, route_cases
+from temples.models import Location, Reels, ReelsLike, Temple, User, UserStats, UserTempleCheckin
+
+
+def seed(**options):
+    call_command('seed', stdout=StringIO(), **options)
+
+
+class SeedCommandTests(TestCase):
+    def test_table_sizes_follow_scale(self):
+        seed(scale=200)
+
+        self.assertEqual(Temple.objects.count(), 20)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Location.objects.count(), 200)
+        self.assertEqual(UserTempleCheckin.objects.count(), 100)
+        self.assertEqual(Reels.objects.count(), 10)
+        self.assertTrue(0 < ReelsLike.objects.count() <= 40)
+
+    def test_explicit_counts_override_scale(self):
+        seed(scale=200, temples=5, users=3, checkins=7)
+
+        self.assertEqual(Temple.objects.count(), 5)
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(UserTempleCheckin.objects.count(), 7)
+
+    def test_denormalized_counters_match_rows(self):
+        seed(scale=200)
+
+        checkins = dict(UserTempleCheckin.objects.values_list('temple').annotate(n=Count('id')))
+        for temple_id, checkin_count in Temple.objects.values_list('id', 'checkin_count'):
+            self.assertEqual(checkin_count, checkins.get(temple_id, 0))
+
+        self.assertEqual(UserStats.objects.count(), User.objects.count())
+        user_checkins = dict(UserTempleCheckin.objects.values_list('user').annotate(n=Count('id')))
+        user_reels = dict(Reels.objects.values_list('user').annotate(n=Count('id')))
+        for stats in UserStats.objects.all():
+            self.assertEqual(stats.checkin_count, user_checkins.get(stats.user_id, 0))
+            self.assertEqual(stats.reels_count, user_reels.get(stats.user_id, 0))
+
+    def test_clear_replaces_existing_rows(self):
+        seed(scale=200)
+        seed(scale=100, clear=True)
+
+        self.assertEqual(Temple.objects.count(), 10)
+        self.assertEqual(Location.objects.count(), 100)
+
+    def test_same_random_seed_gives_same_data(self):
+        seed(scale=100, random_seed=7)
+        first = list(Temple.objects.order_by('id').values_list('name', 'lat', 'lng'))
+        seed(scale=100, random_seed=7, clear=True)
+
+        self.assertEqual(list(Temple.objects.order_by('id').values_list('name', 'lat', 'lng')), first)
+
+    def test_needs_a_temple_and_a_user(self):
+        with self.assertRaises(CommandError):
+            seed(scale=100, temples=0)
+
+
+# The benchmark sends batch and async requests, whose queries run on other
+# threads and so need committed data
+class BenchmarkCommandTests(TransactionTestCase):
+    def benchmark(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            call_command('benchmark', *args, output=path, stderr=StringIO(), **options)
+            with open(path) as fp:
+                return json.load(fp)
+
+    def test_every_route_answers_within_its_query_budget(self):
+        seed(scale=200)
+
+        # Query budgets are enforced in tests, so a route over its budget fails the run
+        results = self.benchmark(iterations=3, samples=3)
+
+        routes = {str(pattern.pattern) for pattern in temple_urls.urlpatterns}
+        self.assertEqual(set(results['routes']), routes)
+        for route, result in results['routes'].items():
+            with self.subTest(route=route):
+                if 'skipped' in result:
+                    continue
+                # The benchmark client isn't logged in
+                expected = [403] if route == 'locations/<int:pk>/' else [200]
+                self.assertEqual(result['statuses'], expected)
+                self.assertGreater(result['response_bytes'], 0)
+
+        self.assertEqual(results['meta']['rows']['Temple'], 20)
+        self.assertEqual(results['meta']['iterations'], 3)
+
+    def test_route_filter(self):
+        seed(scale=100)
+
+        results = self.benchmark(iterations=1, samples=1, route=['temples/search'])
+
+        self.assertEqual(list(results['routes']), ['temples/search'])
+
+    def test_cold_cache_reaches_the_database(self):
+        seed(scale=100)
+
+        results = self.benchmark(iterations=2, samples=1, route=['nearby-temples'], cold=True)
+
+        self.assertEqual(results['routes']['nearby-temples']['statuses'], [200])
+        self.assertGreater(results['routes']['nearby-temples']['queries_median'], 0)
+        self.assertTrue(results['meta']['cold_cache'])
+
+    def test_compare_reports_each_route(self):
+        seed(scale=100)
+        with tempfile.TemporaryDirectory() as directory:
+            previous = os.path.join(directory, 'previous.json')
+            call_command('benchmark', route=['temples/search'], iterations=1, samples=1, output=previous, stderr=StringIO())
+            stderr = StringIO()
+            call_command(
+                'benchmark', route=['temples/search'], iterations=1, samples=1, compare=previous,
+                output=os.path.join(directory, 'current.json'), stderr=stderr,
+            )
+
+        self.assertIn('temples/search', stderr.getvalue().split('vs ')[1])
+
+    def test_needs_seeded_data(self):
+        with self.assertRaises(CommandError):
+            self.benchmark(iterations=1)
+
+
+# The load test serves requests from pools of threads and an event loop
+class LoadtestCommandTests(TransactionTestCase):
+    def loadtest(self, **options):
+        stdout = StringIO()
+        call_command('loadtest', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_runs_both_modes_of_every_async_route(self):
+        seed(scale=100)
+
+        report = json.loads(self.loadtest(requests=6, concurrency=3, wsgi_threads=2, samples=2, json=True))
+
+        self.assertEqual(set(report), set(ASYNC_ROUTES))
+        for route, modes in report.items():
+            for mode, result in modes.items():
+                with self.subTest(route=route, mode=mode):
+                    self.assertEqual(result['statuses'], {'200': 6})
+                    self.assertEqual(result['latency']['count'], 6)
+                    self.assertLessEqual(result['peak_in_flight'], 3)
+
+    def test_text_report(self):
+        seed(scale=100)
+
+        output = self.loadtest(route=['nearby-temples'], requests=2, concurrency=1, samples=1, cold=True)
+
+        self.assertIn('nearby-temples\n  wsgi: ', output)
+        self.assertIn("asgi: ", output)
+
+    def test_invalid_options(self):
+        with self.assertRaisesMessage(CommandError, 'must be positive'):
+            self.loadtest(concurrency=0)
+
+
+class ExplainQueriesCommandTests(TransactionTestCase):
+    def explain(self, **options):
+        stdout = StringIO()
+        call_command('explain_queries', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_every_route_is_served_by_indexes(self):
+        seed(scale=100)
+        counts = [model.objects.count() for model in (Temple, User, UserTempleCheckin, Reels)]
+
+        output = self.explain()
+
+        self.assertIn('No full table scans.', output)
+        routes = {str(pattern.pattern) for pattern in temple_urls.urlpatterns}
+        self.assertIn('nearby-temples: ', output)
+        self.assertTrue(all(f'{route}: ' in output for route in routes if route in route_cases()))
+        # The requests' writes, and the admin it logs in as, are rolled back
+        self.assertEqual([model.objects.count() for model in (Temple, User, UserTempleCheckin, Reels)], counts)
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_reports_full_scans(self):
+        seed(scale=100)
+
+        with mock.patch.object(explain_queries, 'query_plan', return_value=['SCAN temples_temple']):
+            with self.assertRaisesMessage(CommandError, 'queries scan a whole table'):
+                self.explain(route=['temples/bulk'])
+            # Unless the table is allowed
+            self.assertIn('No full table scans.', self.explain(route=['temples/bulk'], allow=['temples_temple']))
+
+    def test_full_scans(self):
+        tables = {'temples_temple', 'temples_location'}
+        plan = [
+            'SCAN temples_temple',
+            'SCAN temples_location USING COVERING INDEX location_user_created_idx',
+            'SEARCH temples_reels USING INDEX reels_temple_created_idx (temple_id=?)',
+            'SCAN temples_userstats',
+            'SCAN CONSTANT ROW',
+        ]
+
+        self.assertEqual(explain_queries.full_scans(plan, tables), ['temples_temple', 'temples_location'])
@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from temples.models import DataVersion, Reels, ReelsLike, Temple, User, UserTempleCheckin
+
+
+class ConditionalListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.temple = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+        cls.other_temple = Temple.objects.create(name='Sankat Mochan', lat=25.2860, lng=82.9990)
+        cls.user = User.objects.create(user_id='pilgrim', name='Pilgrim')
+        UserTempleCheckin.objects.create(user=cls.user, temple=cls.temple)
+        cls.reel = Reels.objects.create(user=cls.user, temple=cls.temple, video_url='https://example.com/reel.mp4')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, path, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(path, headers=headers)
+
+    def assertRevalidates(self, path, change):
+        first = self.get(path)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        self.assertEqual(self.get(path, first['ETag']).status_code, 304)
+
+        change()
+
+        second = self.get(path, first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.get(path, second['ETag']).status_code, 304)
+
+    def test_new_checkin_moves_the_checkins_etag(self):
+        self.assertRevalidates(
+            f'/api/temples/{self.temple.pk}/check-ins',
+            lambda: UserTempleCheckin.objects.create(user=self.user, temple=self.temple),
+        )
+
+    def test_like_moves_the_reels_etag(self):
+        fan = User.objects.create(user_id='fan', name='Fan')
+        self.assertRevalidates(
+            f'/api/temples/{self.temple.pk}/reels', lambda: ReelsLike.objects.create(user=fan, reel=self.reel),
+        )
+
+    def test_rename_moves_every_list_etag(self):
+        def rename():
+            self.user.name = 'Yatri'
+            self.user.save()
+
+        self.assertRevalidates(f'/api/temples/{self.temple.pk}/check-ins', rename)
+
+    def test_create_user_without_changes_keeps_every_list_etag(self):
+        path = f'/api/temples/{self.temple.pk}/check-ins'
+        etag = self.get(path)['ETag']
+        response = self.client.post(
+            '/api/create-user', {'user_id': 'pilgrim', 'name': 'Pilgrim'}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(path, etag).status_code, 304)
+
+    def test_create_user_within_budget_before_any_stamp(self):
+        # Budgets are enforced in tests; the stamp rows are created on first use
+        for data, status in [
+            ({'user_id': 'sadhu', 'name': 'Sadhu'}, 201),
+            ({'user_id': 'sadhu', 'name': 'Sadhu'}, 200),
+            ({'user_id': 'sadhu', 'name': 'Sadhu Baba'}, 200),
+        ]:
+            DataVersion.objects.all().delete()
+            with self.subTest(data=data):
+                response = self.client.post('/api/create-user', data, content_type='application/json')
+                self.assertEqual(response.status_code, status)
+        self.assertTrue(DataVersion.objects.filter(name='activity').exists())
+
+    def test_other_temples_keep_their_etag(self):
+        path = f'/api/temples/{self.other_temple.pk}/check-ins'
+        etag = self.get(path)['ETag']
+        UserTempleCheckin.objects.create(user=self.user, temple=self.temple)
+
+        self.assertEqual(self.get(path, etag).status_code, 304)
+
+    def test_list_never_written_has_no_last_modified(self):
+        DataVersion.objects.all().delete()
+        response = self.get(f'/api/temples/{self.other_temple.pk}/reels')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.get(f'/api/temples/{self.other_temple.pk}/reels', response['ETag']).status_code, 304)
+
+    def test_stamps_are_kept_in_the_database(self):
+        # Read by every process, and rolled back with the write that moved them
+        path = f'/api/temples/{self.temple.pk}/check-ins'
+        etag = self.get(path)['ETag']
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            UserTempleCheckin.objects.create(user=self.user, temple=self.temple)
+            raise RuntimeError
+
+        cache.clear()
+        self.assertEqual(self.get(path, etag).status_code, 304)
+
+
+class AsyncConditionalListTests(TransactionTestCase):
+    def test_async_reels_share_the_stamps(self):
+        temple = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+        user = User.objects.create(user_id='pilgrim', name='Pilgrim')
+        Reels.objects.create(user=user, temple=temple, video_url='https://example.com/reel.mp4')
+        etag = self.client.get(f'/api/temples/{temple.pk}/reels')['ETag']
+
+        response = self.client.get(f'/api/async/temples/{temple.pk}/reels', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        Reels.objects.create(user=user, temple=temple, video_url='https://example.com/other.mp4')
+        response = self.client.get(f'/api/async/temples/{temple.pk}/reels', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']['reels']), 2)
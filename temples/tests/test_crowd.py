@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from temples.crowd import crowd_tracker
+from temples.models import Location, Temple, TemplePresence, User
+
+
+class CrowdTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.temple = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+        cls.other_temple = Temple.objects.create(name='Sankat Mochan', lat=25.2860, lng=82.9990)
+        cls.users = [User.objects.create(user_id=f'pilgrim-{i}', name=f'Pilgrim {i}') for i in range(3)]
+
+    def ping(self, user, lat, lng):
+        Location.objects.create(user=user, lat=lat, lng=lng)
+
+    def crowd_counts(self):
+        response = self.client.get('/api/temples/crowd', {'ids': f'{self.temple.pk},{self.other_temple.pk}'})
+        self.assertEqual(response.status_code, 200)
+        return {int(temple_id): count for temple_id, count in response.json()['data']['crowd_counts'].items()}
+
+    def test_pings_inside_a_geofence_count_towards_its_temple(self):
+        self.ping(self.users[0], 25.3110, 83.0108)
+        self.ping(self.users[1], 25.3108, 83.0106)
+        self.ping(self.users[2], 25.2861, 82.9991)
+
+        self.assertEqual(self.crowd_counts(), {self.temple.pk: 2, self.other_temple.pk: 1})
+
+    def test_a_user_counts_once_where_they_last_pinged(self):
+        self.ping(self.users[0], 25.3110, 83.0108)
+        self.ping(self.users[0], 25.3109, 83.0107)
+        self.ping(self.users[0], 25.2861, 82.9991)
+
+        self.assertEqual(self.crowd_counts(), {self.other_temple.pk: 1})
+
+    def test_pinging_elsewhere_leaves_the_temple(self):
+        self.ping(self.users[0], 25.3110, 83.0108)
+        self.ping(self.users[0], 26.0, 84.0)
+
+        self.assertEqual(self.crowd_counts(), {})
+
+    def test_quiet_users_expire(self):
+        self.ping(self.users[0], 25.3110, 83.0108)
+        self.ping(self.users[1], 25.3110, 83.0108)
+        stale = timezone.now() - timedelta(seconds=crowd_tracker.presence_seconds + 1)
+        TemplePresence.objects.filter(user=self.users[0]).update(seen_at=stale)
+
+        self.assertEqual(self.crowd_counts(), {self.temple.pk: 1})
+
+    def test_presence_is_shared_through_the_database(self):
+        # Recorded by another worker process
+        TemplePresence.objects.create(user=self.users[0], temple=self.temple, seen_at=timezone.now())
+
+        self.assertEqual(crowd_tracker.counts([self.temple.pk]), {self.temple.pk: 1})
+
+    def test_nearby_temples_include_crowd_counts(self):
+        self.ping(self.users[0], 25.3110, 83.0108)
+
+        response = self.client.get('/api/nearby-temples', {'lat': 25.3109, 'lng': 83.0107, 'radius': 1})
+
+        self.assertEqual(response.json()['data']['crowd_counts'], {str(self.temple.pk): 1})
+
+    def test_posted_locations_are_pings(self):
+        for lat, lng in ((25.3110, 83.0108), (25.3109, 83.0107)):
+            response = self.client.post(
+                '/api/locations', {'user': self.users[0].pk, 'lat': lat, 'lng': lng}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.crowd_counts(), {self.temple.pk: 1})
+
+    def test_invalid_ids(self):
+        self.assertEqual(self.client.get('/api/temples/crowd', {'ids': 'a,b'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/temples/crowd').status_code, 400)
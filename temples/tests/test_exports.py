@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User as AuthUser
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from temples.models import Location, User
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        cls.user = User.objects.create(user_id='pilgrim', name='Pilgrim')
+        cls.start = timezone.now() - timedelta(hours=1)
+        cls.locations = [Location.objects.create(user=cls.user, lat=25.3 + i / 100, lng=83.0) for i in range(5)]
+        # Rows sharing a timestamp, across a chunk boundary, are told apart by id
+        for i, location in enumerate(cls.locations):
+            location.created_at = cls.start + timedelta(minutes=i // 3)
+        Location.objects.bulk_update(cls.locations, ['created_at'])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, table='locations', **params):
+        response = self.client.get(f'/api/exports/{table}', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def ids(self, content):
+        return [json.loads(line)['id'] for line in content.splitlines()]
+
+    def test_ndjson_in_created_order_across_chunks(self):
+        response, content = self.export()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(self.ids(content), [location.pk for location in self.locations])
+        last = self.locations[-1]
+        self.assertEqual(response['X-Export-Watermark'], f'{last.created_at.isoformat()},{last.pk}')
+
+    def test_csv(self):
+        response, content = self.export(format='csv')
+
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ['id', 'user_id', 'lat', 'lng', 'created_at', 'updated_at'])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [location.pk for location in self.locations])
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="locations.csv"')
+
+    def test_watermark_continues_after_the_last_row(self):
+        response, _ = self.export()
+        watermark = response['X-Export-Watermark']
+        newer = Location.objects.create(user=self.user, lat=25.4, lng=83.0)
+
+        response, content = self.export(after=watermark)
+        self.assertEqual(self.ids(content), [newer.pk])
+
+        response, content = self.export(after=response['X-Export-Watermark'])
+        self.assertEqual(content, '')
+        self.assertEqual(response['X-Export-Watermark'], f'{newer.created_at.isoformat()},{newer.pk}')
+
+    def test_time_range(self):
+        _, content = self.export(
+            since=(self.start + timedelta(minutes=1)).isoformat(), until=(self.start + timedelta(minutes=2)).isoformat()
+        )
+
+        self.assertEqual(self.ids(content), [location.pk for location in self.locations[3:]])
+
+    def test_invalid_requests(self):
+        for table, params in [
+            ('users', {}),
+            ('locations', {'format': 'xml'}),
+            ('locations', {'after': 'yesterday'}),
+            ('locations', {'after': '2024-13-45T00:00:00,5'}),
+            ('locations', {'since': '2024-02-30T00:00:00'}),
+        ]:
+            with self.subTest(table=table, params=params):
+                self.assertEqual(self.client.get(f'/api/exports/{table}', params).status_code, 400)
+
+    def test_admins_only(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/exports/locations').status_code, 403)
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from temples.models import Temple, User, UserTempleCheckin
+
+
+class GeofenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(user_id='pilgrim', name='Pilgrim')
+        cls.temple = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+        cls.far_temple = Temple.objects.create(name='Sankat Mochan', lat=25.2860, lng=82.9990)
+
+    def setUp(self):
+        cache.clear()
+
+    def geofence(self, **params):
+        response = self.client.get('/api/temples/geofence', {'lat': 25.3110, 'lng': 83.0108, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_only_temples_whose_geofence_contains_the_point(self):
+        data = self.geofence()
+
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['temples'][0]['id'], self.temple.pk)
+        self.assertLess(data['temples'][0]['distance'], 0.2)
+
+    def test_checkin_starts_the_cooldown(self):
+        self.assertTrue(self.geofence(user_id='pilgrim')['temples'][0]['checkin_enabled'])
+
+        UserTempleCheckin.objects.create(user=self.user, temple=self.temple)
+        temple = self.geofence(user_id='pilgrim')['temples'][0]
+
+        self.assertFalse(temple['checkin_enabled'])
+        self.assertAlmostEqual(temple['next_checkin_available_after'], 6.0, delta=0.1)
+
+    def test_cooldown_is_read_from_the_database(self):
+        # A check-in recorded by another process, whose cache this one doesn't share
+        self.geofence(user_id='pilgrim')
+        UserTempleCheckin.objects.bulk_create([UserTempleCheckin(user=self.user, temple=self.temple)])
+
+        self.assertFalse(self.geofence(user_id='pilgrim')['temples'][0]['checkin_enabled'])
+
+    def test_cooldown_ends(self):
+        checkin = UserTempleCheckin.objects.create(user=self.user, temple=self.temple)
+        UserTempleCheckin.objects.filter(pk=checkin.pk).update(checkin_time=timezone.now() - timedelta(hours=7))
+
+        self.assertTrue(self.geofence(user_id='pilgrim')['temples'][0]['checkin_enabled'])
+
+    def test_invalid_coordinates(self):
+        response = self.client.get('/api/temples/geofence', {'lat': 'north', 'lng': 83.0})
+
+        self.assertEqual(response.status_code, 400)
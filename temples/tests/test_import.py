@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+
+from temples.caches import temples_version
+from temples.models import Temple
+
+
+def legacy_place(place_id, name, lat, lng, **fields):
+    return {'place_id': place_id, 'name': name, 'geometry': {'location': {'lat': lat, 'lng': lng}}, **fields}
+
+
+def v1_place(place_id, name, lat, lng, **fields):
+    return {'id': place_id, 'displayName': {'text': name}, 'location': {'latitude': lat, 'longitude': lng}, **fields}
+
+
+class ImportTemplesTests(TransactionTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def dump(self, places, array=False, name='places.json'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as fp:
+            if array:
+                json.dump(places, fp)
+            else:
+                fp.write(''.join(json.dumps(place) + '\n' for place in places))
+        return path
+
+    def run_import(self, path, **options):
+        stdout = StringIO()
+        call_command('import_temples', path, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def temples(self):
+        return {temple.google_place_id: temple for temple in Temple.objects.all()}
+
+    def test_imports_both_formats_of_both_apis(self):
+        places = [
+            legacy_place('legacy', 'Kashi Vishwanath', 25.3109, 83.0107, rating=4.8),
+            v1_place('v1', 'Sankat Mochan', 25.2860, 82.9990, rating=4.7),
+            {'name': 'No place id', 'geometry': {'location': {'lat': 1, 'lng': 1}}},
+            {'place_id': 'no-location', 'name': 'Nowhere'},
+        ]
+        for array in (False, True):
+            with self.subTest(array=array):
+                Temple.objects.all().delete()
+                output = self.run_import(self.dump(places, array=array), batch_size=3, workers=2)
+
+                self.assertIn('Upserted 2 temples in 2 batches', output)
+                temples = self.temples()
+                self.assertEqual(set(temples), {'legacy', 'v1'})
+                self.assertEqual((temples['v1'].name, temples['v1'].lat, temples['v1'].rating), ('Sankat Mochan', 25.2860, 4.7))
+                self.assertEqual(temples['legacy'].raw_data['rating'], 4.8)
+
+    def test_reimport_updates_in_place(self):
+        self.run_import(self.dump([legacy_place('kashi', 'Kashi', 25.3109, 83.0107)]))
+        temple_id = Temple.objects.get().pk
+        version = temples_version()
+
+        self.run_import(self.dump([
+            legacy_place('kashi', 'Kashi Vishwanath', 25.3109, 83.0107),
+            legacy_place('kashi', 'Shri Kashi Vishwanath', 25.3110, 83.0108),
+        ]))
+
+        temple = Temple.objects.get()
+        self.assertEqual((temple.pk, temple.name, temple.lat), (temple_id, 'Shri Kashi Vishwanath', 25.3110))
+        self.assertNotEqual(temples_version(), version)
+
+    def test_resumes_after_the_completed_batches(self):
+        path = self.dump([legacy_place(f'place-{i}', f'Temple {i}', 25 + i / 100, 83) for i in range(4)])
+        with open(f'{path}.checkpoint', 'w') as fp:
+            json.dump({
+                'source': os.path.abspath(path), 'size': os.path.getsize(path), 'batch_size': 2, 'completed_batches': 1,
+            }, fp)
+
+        output = self.run_import(path, batch_size=2)
+
+        self.assertIn('Resuming after 1 completed batches', output)
+        self.assertEqual(set(self.temples()), {'place-2', 'place-3'})
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_resume_needs_the_same_batch_size(self):
+        path = self.dump([legacy_place('kashi', 'Kashi', 25.3109, 83.0107)])
+        with open(f'{path}.checkpoint', 'w') as fp:
+            json.dump({
+                'source': os.path.abspath(path), 'size': os.path.getsize(path), 'batch_size': 2, 'completed_batches': 1,
+            }, fp)
+
+        with self.assertRaisesMessage(CommandError, 'Resume with --batch-size 2'):
+            self.run_import(path, batch_size=500)
+        self.assertIn('Upserted 1 temples', self.run_import(path, restart=True))
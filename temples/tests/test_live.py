@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from temples.live import NearbyUsersHub
+from temples.models import Location, User
+
+
+@override_settings(LIVE_POLL_SECONDS=0.05)
+class NearbyUsersHubTests(TransactionTestCase):
+    lat, lng = 25.3109, 83.0107
+
+    def setUp(self):
+        self.hub = NearbyUsersHub()
+        self.user = User.objects.create(user_id='pilgrim', name='Pilgrim')
+
+    async def ping(self, lat, lng):
+        # bulk_create sends no signals, like a ping saved by another process
+        await sync_to_async(Location.objects.bulk_create)([Location(user=self.user, lat=lat, lng=lng)])
+
+    async def next_event(self, subscription):
+        item = await subscription.next_event(5)
+        self.assertIsNotNone(item)
+        return item
+
+    async def test_pings_saved_anywhere_reach_subscribers(self):
+        subscription = self.hub.subscribe(self.lat, self.lng, 2)
+        try:
+            await self.ping(25.3110, 83.0108)
+            event, data = await self.next_event(subscription)
+            self.assertEqual(event, 'enter')
+            self.assertEqual(data['user_id'], self.user.pk)
+
+            await self.ping(25.3112, 83.0110)
+            event, data = await self.next_event(subscription)
+            self.assertEqual((event, data['last_lat']), ('move', 25.3112))
+
+            await self.ping(28.6139, 77.2090)
+            self.assertEqual(await self.next_event(subscription), ('leave', {'user_id': self.user.pk}))
+        finally:
+            self.hub.unsubscribe(subscription)
+
+    async def test_pings_from_before_the_subscription_are_not_sent(self):
+        await self.ping(25.3110, 83.0108)
+        await sync_to_async(Location.objects.update)(created_at=timezone.now() - timedelta(minutes=5))
+        subscription = self.hub.subscribe(self.lat, self.lng, 2)
+        try:
+            self.assertIsNone(await subscription.next_event(0.3))
+        finally:
+            self.hub.unsubscribe(subscription)
+
+    async def test_the_poller_stops_with_the_last_subscription(self):
+        subscription = self.hub.subscribe(self.lat, self.lng, 2)
+        poller = self.hub._poller
+        self.assertTrue(poller.is_alive())
+        self.hub.unsubscribe(subscription)
+        await sync_to_async(poller.join)(5)
+        self.assertFalse(poller.is_alive())
+        self.assertIsNone(self.hub._poller)
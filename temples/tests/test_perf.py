@@ -0,0 +1,76 @@
+import re
+
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import cache
+from django.test import TestCase
+
+from temples.models import Temple
+from temples.perf import endpoint_stats
+
+
+SERVER_TIMING = re.compile(
+    r'db;dur=\d+\.\d\d;desc="(\d+) queries", '
+    r'cache;desc="(\d+) hits (\d+) misses", '
+    r'render;dur=\d+\.\d\d, '
+    r'compress;dur=\d+\.\d\d, '
+    r'app;dur=-?\d+\.\d\d, '
+    r'total;dur=\d+\.\d\d'
+)
+
+
+class PerformanceMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.temple = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+
+    def setUp(self):
+        cache.clear()
+        endpoint_stats.reset()
+        self.addCleanup(endpoint_stats.reset)
+
+    def server_timing(self, response):
+        match = SERVER_TIMING.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        return tuple(int(value) for value in match.groups())
+
+    def test_server_timing_counts_queries_and_cache_lookups(self):
+        path = f'/api/temples/{self.temple.pk}'
+        # A miss renders from the database, a hit needs no query
+        queries, hits, misses = self.server_timing(self.client.get(path))
+        self.assertGreater(queries, 0)
+        self.assertGreater(misses, 0)
+
+        self.assertEqual(self.server_timing(self.client.get(path)), (0, 1, 0))
+
+    def test_unresolved_requests_are_timed_too(self):
+        response = self.client.get('/api/nowhere')
+
+        self.assertEqual(response.status_code, 404)
+        self.server_timing(response)
+        self.assertIn('GET <unresolved>', endpoint_stats.snapshot())
+
+    def test_metrics_count_each_request(self):
+        for _ in range(3):
+            self.client.get(f'/api/temples/{self.temple.pk}')
+        self.client.force_login(self.admin)
+
+        endpoints = self.client.get('/api/metrics').json()['data']['endpoints']
+
+        stats = endpoints['GET api/temples/<int:pk>']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(sum(stats['buckets'].values()), 3)
+        self.assertEqual((stats['cache_hits'], stats['cache_misses'] > 0), (2, True))
+        self.assertIsNotNone(stats['p99_ms_le'])
+
+    def test_reset(self):
+        self.client.force_login(self.admin)
+        self.client.get('/api/metrics', {'reset': 'true'})
+
+        endpoints = self.client.get('/api/metrics').json()['data']['endpoints']
+        # Only the reset request itself was recorded since
+        self.assertEqual(list(endpoints), ['GET api/metrics'])
+        self.assertEqual(endpoints['GET api/metrics']['count'], 1)
+
+    def test_admins_only(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 403)
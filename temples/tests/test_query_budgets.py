@@ -0,0 +1,78 @@
+import json
+import random
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase
+
+from temples import apis
+from temples.management.commands.benchmark import API_PREFIX, load_samples, route_cases
+from temples.query_budget import QueryBudgetExceeded
+
+
+# Routes the benchmark has no sample request for, as (method, path, data) builders
+ADMIN_CASES = {
+    'metrics': lambda s: ('get', 'metrics', {}),
+    'exports/<str:table>': lambda s: ('get', 'exports/checkins', {}),
+}
+
+
+def send(client, build, sample):
+    method, path, data = build(sample)
+    if method == 'get':
+        return client.get(API_PREFIX + path, data)
+    return client.generic(method.upper(), API_PREFIX + path, json.dumps(data), content_type='application/json')
+
+
+# Batch and async routes query from other threads, which need committed data
+class QueryBudgetTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        call_command('seed', scale=200, stdout=StringIO())
+        self.samples = load_samples(random.Random(1), 3)
+        self.admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def assert_within_budgets(self, client, cases, expected_status):
+        # Budgets are enforced in tests: a request over its budget raises
+        for route, build in cases.items():
+            for sample in self.samples:
+                with self.subTest(route=route, user_id=sample['user_id']):
+                    response = send(client, build, sample)
+                    if route == 'async/nearby-users/stream':
+                        response.close()
+                    self.assertEqual(response.status_code, expected_status(route))
+
+    def test_anonymous_requests(self):
+        self.assert_within_budgets(
+            Client(), route_cases(),
+            lambda route: 403 if route == 'locations/<int:pk>/' else 200,
+        )
+
+    def test_session_authenticated_requests(self):
+        # The session and user lookups of a logged in client come on top of
+        # what the view itself runs
+        client = Client()
+        client.force_login(self.admin)
+
+        self.assert_within_budgets(client, {**route_cases(), **ADMIN_CASES}, lambda route: 200)
+
+    def test_admin_routes_refuse_anonymous_clients(self):
+        self.assert_within_budgets(Client(), ADMIN_CASES, lambda route: 403)
+
+    def test_over_budget_request_raises(self):
+        with mock.patch.object(apis.ListNearbyUsers, 'query_budget', 0):
+            with self.assertRaises(QueryBudgetExceeded) as raised:
+                send(Client(), route_cases()['nearby-users'], self.samples[0])
+
+        self.assertIn('GET api/nearby-users ran', str(raised.exception))
+        self.assertIn('(budget 0)', str(raised.exception))
+
+    def test_budget_per_method(self):
+        build = route_cases()['temples/<int:pk>/check-ins']
+        sample = self.samples[0]
+        with mock.patch.object(apis.ListCreateTempleCheckIn, 'query_budget', {'get': 0, 'post': 9}):
+            with self.assertRaises(QueryBudgetExceeded):
+                send(Client(), build, sample)
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import tempfile
+import warnings
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from temples.db_routers import PrimaryReplicaRouter, end_replica_reads, start_replica_reads
+from temples.middleware import ReplicaRoutingMiddleware
+from temples.models import Temple
+
+
+router = PrimaryReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def request(self, method='get', status=200, **extra):
+        routed = {}
+
+        def get_response(request):
+            routed['read'] = router.db_for_read(Temple)
+            routed['write'] = router.db_for_write(Temple)
+            return HttpResponse(status=status)
+
+        request = getattr(RequestFactory(), method)('/api/temples/search', **extra)
+        response = ReplicaRoutingMiddleware(get_response)(request)
+        return response, routed
+
+    def test_reads_of_safe_requests_go_to_a_replica(self):
+        for method in ('get', 'head', 'options'):
+            with self.subTest(method=method):
+                response, routed = self.request(method)
+
+                self.assertEqual(routed, {'read': 'replica1', 'write': DEFAULT_DB_ALIAS})
+                self.assertNotIn(ReplicaRoutingMiddleware.PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        response, routed = self.request('post')
+
+        self.assertEqual(routed, {'read': DEFAULT_DB_ALIAS, 'write': DEFAULT_DB_ALIAS})
+        cookie = response.cookies[ReplicaRoutingMiddleware.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        _, routed = self.request(HTTP_COOKIE=f'{ReplicaRoutingMiddleware.PIN_COOKIE}=1')
+        self.assertEqual(routed['read'], DEFAULT_DB_ALIAS)
+
+    def test_failed_writes_do_not_pin(self):
+        response, _ = self.request('post', status=400)
+
+        self.assertNotIn(ReplicaRoutingMiddleware.PIN_COOKIE, response.cookies)
+
+    def test_reads_outside_requests_go_to_the_primary(self):
+        self.assertEqual(router.db_for_read(Temple), DEFAULT_DB_ALIAS)
+
+    def test_migrations_run_on_the_primary_only(self):
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'temples'))
+        self.assertFalse(router.allow_migrate('replica1', 'temples'))
+
+
+class DefaultRoutingTests(SimpleTestCase):
+    def test_no_replicas_by_default(self):
+        self.assertEqual(settings.SQLITE_REPLICAS, [])
+        self.assertEqual(settings.DATABASE_REPLICAS, [])
+        self.assertEqual(list(settings.DATABASES), [DEFAULT_DB_ALIAS])
+
+        token = start_replica_reads()
+        self.assertIsNone(token)
+        self.assertEqual(router.db_for_read(Temple), DEFAULT_DB_ALIAS)
+
+        routed = []
+        middleware = ReplicaRoutingMiddleware(lambda request: routed.append(router.db_for_read(Temple)) or HttpResponse())
+        response = middleware(RequestFactory().post('/api/create-user'))
+        self.assertEqual(routed, [DEFAULT_DB_ALIAS])
+        self.assertNotIn(ReplicaRoutingMiddleware.PIN_COOKIE, response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class TransactionRoutingTests(TransactionTestCase):
+    def test_reads_inside_a_transaction_go_to_the_primary(self):
+        token = start_replica_reads()
+        self.addCleanup(end_replica_reads, token)
+
+        self.assertEqual(router.db_for_read(Temple), 'replica1')
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Temple), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(Temple), 'replica1')
+
+
+class SyncReplicasCommandTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.primary = os.path.join(directory.name, 'primary.sqlite3')
+        self.replicas = [os.path.join(directory.name, f'replica{number}.sqlite3') for number in (1, 2)]
+        with sqlite3.connect(self.primary) as db:
+            db.execute('CREATE TABLE temple (name TEXT)')
+            db.execute("INSERT INTO temple VALUES ('Kashi Vishwanath')")
+        db.close()
+
+    def database_settings(self, engine='django.db.backends.sqlite3'):
+        databases = {DEFAULT_DB_ALIAS: {'ENGINE': engine, 'NAME': self.primary}}
+        for number, path in enumerate(self.replicas, start=1):
+            databases[f'replica{number}'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+        return databases
+
+    def sync(self, databases, replicas):
+        stdout = StringIO()
+        with warnings.catch_warnings():
+            # The command only reads the settings; the test database connections stay as they are
+            warnings.filterwarnings('ignore', 'Overriding setting DATABASES')
+            with override_settings(DATABASES=databases, DATABASE_REPLICAS=replicas):
+                call_command('sync_replicas', stdout=stdout)
+        return stdout.getvalue()
+
+    def replica_rows(self, path):
+        db = sqlite3.connect(path)
+        try:
+            return db.execute('SELECT name FROM temple').fetchall()
+        finally:
+            db.close()
+
+    def test_copies_the_primary_to_every_replica(self):
+        output = self.sync(self.database_settings(), ['replica1', 'replica2'])
+
+        for path in self.replicas:
+            self.assertEqual(self.replica_rows(path), [('Kashi Vishwanath',)])
+        self.assertIn('replica2: copied to', output)
+
+    def test_invalid_setups(self):
+        for databases, replicas, message in [
+            (self.database_settings(), [], 'No replicas configured'),
+            (self.database_settings('django.db.backends.postgresql'), ['replica1'], 'only copies SQLite databases'),
+        ]:
+            with self.subTest(message=message):
+                with self.assertRaisesMessage(CommandError, message):
+                    self.sync(databases, replicas)
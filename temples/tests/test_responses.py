@@ -0,0 +1,100 @@
+import gzip
+import json
+import zlib
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from temples.middleware import CompressionMiddleware
+from temples.renderers import FastJSONRenderer, JSONFragment, encode_json
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    data = {
+        'when': datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc),
+        'cached': JSONFragment(encode_json({'temples': [1, 2]})),
+        'counts': {7: 3},
+        'name': 'Kashi\u2028Vishwanath',
+    }
+    expected = {
+        'when': '2024-01-02T03:04:05.678000Z',
+        'cached': {'temples': [1, 2]},
+        'counts': {'7': 3},
+        'name': 'Kashi\u2028Vishwanath',
+    }
+
+    def render(self, use_orjson, media_type=None):
+        with mock.patch.object(FastJSONRenderer, 'use_orjson', use_orjson):
+            return FastJSONRenderer().render(self.data, media_type, {})
+
+    def test_orjson_and_json_module_write_the_same_bytes(self):
+        rendered = self.render(True)
+
+        self.assertEqual(rendered, self.render(False))
+        self.assertEqual(json.loads(rendered), self.expected)
+        # Escaped like DRF's JSONRenderer escapes them
+        self.assertIn(b'Kashi\\u2028Vishwanath', rendered)
+
+    def test_indented_output_keeps_fragments(self):
+        rendered = self.render(True, 'application/json; indent=2')
+
+        self.assertIn(b'\n  "when"', rendered)
+        self.assertEqual(json.loads(rendered), self.expected)
+
+    def test_no_data_renders_nothing(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+@override_settings(COMPRESSION_MIN_BYTES=100, COMPRESSION_LEVEL=6)
+class CompressionMiddlewareTests(SimpleTestCase):
+    content = json.dumps({'temples': [{'name': 'Kashi Vishwanath', 'lat': 25.3109, 'lng': 83.0107}] * 20}).encode()
+
+    def respond(self, accept_encoding=None, content=None, content_type='application/json', etag=None):
+        def get_response(request):
+            response = HttpResponse(self.content if content is None else content, content_type=content_type)
+            if etag:
+                response['ETag'] = etag
+            return response
+
+        headers = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding is not None else {}
+        return CompressionMiddleware(get_response)(RequestFactory().get('/api/temples/search', **headers))
+
+    def test_compresses_with_the_preferred_encoding(self):
+        for accept_encoding, encoding, decompress in [
+            ('gzip, deflate', 'gzip', gzip.decompress),
+            ('deflate', 'deflate', zlib.decompress),
+            ('gzip;q=0.5, deflate', 'deflate', zlib.decompress),
+            ('*', 'gzip', gzip.decompress),
+        ]:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.respond(accept_encoding)
+
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertEqual(decompress(response.content), self.content)
+                self.assertEqual(response['Content-Length'], str(len(response.content)))
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_uncompressed_responses_still_vary_on_accept_encoding(self):
+        for accept_encoding in (None, 'identity', 'br', 'gzip;q=0'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.respond(accept_encoding)
+
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, self.content)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_small_and_html_responses_are_left_alone(self):
+        for content, content_type in [(b'{"data":[]}', 'application/json'), (self.content, 'text/html')]:
+            with self.subTest(content_type=content_type):
+                response = self.respond('gzip', content=content, content_type=content_type)
+
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertFalse(response.has_header('Vary'))
+                self.assertEqual(response.content, content)
+
+    def test_compressed_responses_get_a_weak_etag(self):
+        response = self.respond('gzip', etag='"abc"')
+
+        self.assertEqual(response['ETag'], 'W/"abc"')
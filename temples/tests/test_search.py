@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from temples.search import temple_name_index
+
+from temples.models import Temple
+
+
+class SearchTemplesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.kashi = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107, rating=4.8)
+        cls.vishnu = Temple.objects.create(name='Vishnupad Mandir', lat=24.7685, lng=85.0077, rating=4.6)
+        cls.delhi = Temple.objects.create(name='Shri Vishnu Mandir', lat=28.6139, lng=77.2090, rating=4.2)
+        cls.sankat = Temple.objects.create(name='Sankat Mochan', lat=25.2860, lng=82.9990, rating=4.7)
+        cls.sankat.raw_data = {'displayName': {'text': 'Sankat Mochan Hanuman Temple'}}
+        cls.sankat.save()
+
+    def search(self, **params):
+        response = self.client.get('/api/temples/search', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']['results']
+
+    def ids(self, **params):
+        return [result['id'] for result in self.search(**params)]
+
+    def test_name_prefixes_rank_above_word_prefixes(self):
+        self.assertEqual(self.ids(q='vish'), [self.vishnu.pk, self.kashi.pk, self.delhi.pk])
+
+    def test_normalizes_case_and_punctuation(self):
+        self.assertEqual(self.ids(q='KASHI-vishwa'), [self.kashi.pk])
+
+    def test_fuzzy_matches_fill_in_after_prefixes(self):
+        self.assertEqual(self.ids(q='kashi vishwnath'), [self.kashi.pk])
+
+    def test_raw_data_names_are_searchable(self):
+        result, = self.search(q='hanuman')
+        self.assertEqual((result['id'], result['name']), (self.sankat.pk, 'Sankat Mochan'))
+
+    def test_nearby_temples_rank_higher(self):
+        results = self.search(q='vishnu', lat=28.6, lng=77.2)
+
+        self.assertEqual([result['id'] for result in results], [self.delhi.pk, self.vishnu.pk])
+        self.assertLess(results[0]['distance'], 5)
+
+    def test_limit(self):
+        self.assertEqual(len(self.ids(q='vish', limit=1)), 1)
+        self.assertEqual(self.client.get('/api/temples/search', {'q': 'vish', 'limit': 'many'}).status_code, 400)
+
+    def test_follows_renames_and_deletes(self):
+        self.ids(q='kashi')
+        self.kashi.name = 'Baba Vishwanath'
+        self.kashi.save()
+        self.sankat.delete()
+
+        self.assertEqual(self.ids(q='baba'), [self.kashi.pk])
+        self.assertEqual(self.ids(q='kashi'), [])
+        self.assertEqual(self.ids(q='hanuman'), [])
+
+    def test_raw_data_saves_update_the_index_once(self):
+        self.ids(q='kashi')
+        self.kashi.raw_data = {'displayName': {'text': 'Kashi Vishwanath Jyotirlinga'}}
+        with mock.patch.object(temple_name_index, 'apply_update', wraps=temple_name_index.apply_update) as apply_update:
+            self.kashi.save()
+
+        self.assertEqual(apply_update.call_count, 1)
+        self.assertEqual(self.ids(q='jyotirlinga'), [self.kashi.pk])
@@ -0,0 +1,157 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from temples.caches import advance_temples_version, temples_version
+from temples.geo import calculate_distance
+from temples.models import Temple
+from temples.snapshot import open_snapshot
+from temples.spatial import FLAG_BITS, FLAG_FIELDS, TempleGrid, temple_grid
+
+
+class SnapshotGridTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed', scale=200, stdout=StringIO())
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'temples.snapshot')
+        with override_settings(TEMPLE_SNAPSHOT_PATH=self.path):
+            self.grid = TempleGrid()
+        self.grid.ensure_built()
+
+    def move(self, temple):
+        # Saved without signals, which maintain the process-wide grid rather than this one
+        temple.lat += 0.01
+        Temple.objects.filter(pk=temple.pk).update(lat=temple.lat)
+        previous, version = advance_temples_version()
+        self.grid.apply_update(temple, previous, version)
+
+    def test_builds_from_a_written_snapshot(self):
+        snapshot = open_snapshot(self.path)
+
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(len(snapshot), Temple.objects.count())
+        self.assertEqual(snapshot.data_version, temples_version())
+
+    def test_changes_in_one_transaction_rewrite_the_snapshot_once(self):
+        with mock.patch.object(self.grid, 'write_snapshot', wraps=self.grid.write_snapshot) as write:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for temple in Temple.objects.all()[:5]:
+                    self.move(temple)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(open_snapshot(self.path).data_version, self.grid._version)
+
+    def test_rolled_back_change_does_not_block_later_rewrites(self):
+        temple = Temple.objects.first()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.move(temple)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.grid.ensure_built()
+            self.move(temple)
+
+        self.assertEqual(len(callbacks), 1)
+
+    def test_moved_temple_is_found_at_its_new_place(self):
+        temple = Temple.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.move(temple)
+
+        found = [temple_id for _, temple_id in self.grid.ensure_built().nearby(temple.lat, temple.lng, 0.5)]
+        self.assertIn(temple.pk, found)
+
+
+class GridNearbyTests(TestCase):
+    # (lat, lng, radius) around seeded cities, and one far from any temple
+    QUERIES = [(28.6139, 77.2090, 15), (19.0760, 72.8777, 25), (12.9716, 77.5946, 8), (60.0, 10.0, 50)]
+    FILTERS = [
+        (0, None), (FLAG_BITS['srm'], None), (FLAG_BITS['puja'] | FLAG_BITS['yatra'], None),
+        (0, 4.0), (FLAG_BITS['chadhava'], 3.5),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed', scale=2000, stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self, lat, lng, radius, flags_mask, min_rating):
+        matches = []
+        for temple in Temple.objects.all():
+            if any(not getattr(temple, field) for field in FLAG_FIELDS if flags_mask & FLAG_BITS[field]):
+                continue
+            if min_rating is not None and temple.rating < min_rating:
+                continue
+            distance = calculate_distance(lat, lng, temple.lat, temple.lng)
+            if distance <= radius:
+                matches.append((distance, temple.pk))
+        return sorted(matches)
+
+    def assertMatchesScan(self, grid):
+        for lat, lng, radius in self.QUERIES:
+            for flags_mask, min_rating in self.FILTERS:
+                with self.subTest(lat=lat, lng=lng, flags_mask=flags_mask, min_rating=min_rating):
+                    self.assertEqual(
+                        grid.nearby(lat, lng, radius, flags_mask, min_rating),
+                        self.expected(lat, lng, radius, flags_mask, min_rating),
+                    )
+
+    def test_in_memory_grid_matches_a_table_scan(self):
+        self.assertMatchesScan(temple_grid.ensure_built())
+
+    def test_snapshot_grid_matches_a_table_scan(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(TEMPLE_SNAPSHOT_PATH=os.path.join(directory.name, 'temples.snapshot')):
+            grid = TempleGrid()
+        self.assertMatchesScan(grid.ensure_built())
+
+    def test_window_widens_away_from_the_equator(self):
+        # 0.08 degrees of longitude is about 4.4 km at 60 degrees north, 8.9 km at the equator
+        temple = Temple.objects.create(name='Northern Temple', lat=60.0, lng=10.08)
+
+        found = [temple_id for _, temple_id in temple_grid.ensure_built().nearby(60.0, 10.0, 5)]
+        self.assertEqual(found, [temple.pk])
+
+    def test_nearby_temples_filters(self):
+        lat, lng, radius = self.QUERIES[1]
+        response = self.client.get('/api/nearby-temples', {
+            'lat': lat, 'lng': lng, 'radius': radius, 'puja': 'true', 'min_rating': 4, 'details': 'false',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        temples = response.json()['data']['temples']
+        expected = self.expected(lat, lng, radius, FLAG_BITS['puja'], 4.0)
+        self.assertTrue(expected)
+        self.assertEqual([temple['id'] for temple in temples], [temple_id for _, temple_id in expected])
+        self.assertTrue(all(temple['puja'] and temple['rating'] >= 4 for temple in temples))
+        self.assertEqual(
+            self.client.get('/api/nearby-temples', {'lat': lat, 'lng': lng, 'min_rating': 'high'}).status_code, 400
+        )
+
+    @override_settings(NEARBY_TEMPLES_MAX_RADIUS=50)
+    def test_nearby_temples_rejects_unbounded_radii(self):
+        lat, lng, _ = self.QUERIES[1]
+        # Both views reject them before touching the database
+        for path in ('/api/nearby-temples', '/api/async/nearby-temples'):
+            for params in [{'radius': 'inf'}, {'radius': 'nan'}, {'radius': 0}, {'radius': 51}, {'lat': 'inf'}]:
+                with self.subTest(path=path, params=params):
+                    response = self.client.get(path, {'lat': lat, 'lng': lng, **params})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('up to 50 km', response.json()['error'])
+        self.assertEqual(self.client.get('/api/nearby-temples', {'lat': lat, 'lng': lng, 'radius': 50}).status_code, 200)
@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from temples.models import Reels, ReelsLike, Temple, User, UserStats, UserTempleCheckin
+from temples.stats import STAT_FIELDS, reconcile_user_stats
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.temple = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+        cls.other_temple = Temple.objects.create(name='Sankat Mochan', lat=25.2860, lng=82.9990)
+        cls.pilgrim = User.objects.create(user_id='pilgrim', name='Pilgrim')
+        cls.creator = User.objects.create(user_id='creator', name='Creator')
+
+    def stats(self, user):
+        values = UserStats.objects.filter(user=user).values(*STAT_FIELDS).get()
+        return tuple(values[field] for field in STAT_FIELDS)
+
+    def reel(self, temple, likes=0):
+        reel = Reels.objects.create(user=self.creator, temple=temple, video_url='https://example.com/reel.mp4')
+        for i in range(likes):
+            fan = User.objects.create(user_id=f'fan-{reel.pk}-{i}', name='Fan')
+            ReelsLike.objects.create(user=fan, reel=reel, like=True)
+        return reel
+
+    def test_writes_keep_the_counters(self):
+        UserTempleCheckin.objects.create(user=self.pilgrim, temple=self.temple)
+        UserTempleCheckin.objects.create(user=self.pilgrim, temple=self.temple)
+        UserTempleCheckin.objects.create(user=self.pilgrim, temple=self.other_temple)
+        reel = self.reel(self.temple, likes=2)
+        ReelsLike.objects.create(user=self.pilgrim, reel=reel, like=True)
+
+        self.assertEqual(self.stats(self.pilgrim), (3, 2, 0, 0))
+        self.assertEqual(self.stats(self.creator), (0, 0, 1, 3))
+
+    def test_reconcile_fixes_drifted_and_missing_rows(self):
+        UserTempleCheckin.objects.create(user=self.pilgrim, temple=self.temple)
+        self.reel(self.temple, likes=1)
+        # Writes that skip the signals
+        UserStats.objects.filter(user=self.pilgrim).update(checkin_count=7)
+        UserStats.objects.filter(user=self.creator).delete()
+
+        stdout = StringIO()
+        call_command('reconcile_user_stats', dry_run=True, stdout=stdout)
+        self.assertIn('would fix 2', stdout.getvalue())
+        self.assertEqual(self.stats(self.pilgrim), (7, 1, 0, 0))
+
+        checked, fixed = reconcile_user_stats()
+        self.assertEqual((checked, fixed), (User.objects.count(), 2))
+        self.assertEqual(self.stats(self.pilgrim), (1, 1, 0, 0))
+        self.assertEqual(self.stats(self.creator), (0, 0, 1, 1))
+        self.assertEqual(reconcile_user_stats(), (checked, 0))
+
+    def test_deleting_a_temple_recounts_its_users(self):
+        UserTempleCheckin.objects.create(user=self.pilgrim, temple=self.temple)
+        UserTempleCheckin.objects.create(user=self.pilgrim, temple=self.other_temple)
+        self.reel(self.temple, likes=2)
+        self.reel(self.other_temple, likes=1)
+
+        self.temple.delete()
+
+        self.assertEqual(self.stats(self.pilgrim), (1, 1, 0, 0))
+        self.assertEqual(self.stats(self.creator), (0, 0, 1, 1))
+        self.assertEqual(reconcile_user_stats()[1], 0)
+
+    def test_deleting_a_user_takes_back_their_likes(self):
+        reel = self.reel(self.temple, likes=1)
+        ReelsLike.objects.create(user=self.pilgrim, reel=reel, like=True)
+        UserTempleCheckin.objects.create(user=self.pilgrim, temple=self.temple)
+
+        self.pilgrim.delete()
+
+        self.assertEqual(self.stats(self.creator), (0, 0, 1, 1))
+        self.assertEqual(reconcile_user_stats()[1], 0)
+
+    def test_temple_delete_queries_do_not_grow_with_its_rows(self):
+        def delete_queries(temple, checkins):
+            for _ in range(checkins):
+                UserTempleCheckin.objects.create(user=self.pilgrim, temple=temple)
+            self.reel(temple, likes=checkins)
+            with CaptureQueriesContext(connection) as queries:
+                temple.delete()
+            return len(queries)
+
+        self.assertEqual(delete_queries(self.temple, 2), delete_queries(self.other_temple, 20))
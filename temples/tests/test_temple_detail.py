@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from temples.models import Reels, Temple, User
+from temples.serializers import normalize_raw_data
+
+
+class TempleDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(user_id='pilgrim', name='Pilgrim')
+        cls.kashi = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107, rating=4.8)
+        cls.kashi.raw_data = {'displayName': {'text': 'Shri Kashi Vishwanath'}}
+        cls.kashi.save()
+        cls.sankat = Temple.objects.create(name='Sankat Mochan', lat=25.2860, lng=82.9990, rating=4.7)
+        cls.reel = Reels.objects.create(user=cls.user, temple=cls.kashi, video_url='https://example.com/reel.mp4')
+
+    def setUp(self):
+        cache.clear()
+
+    def detail(self, temple):
+        response = self.client.get(f'/api/temples/{temple.pk}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def bulk(self, *ids):
+        response = self.client.get('/api/temples/bulk', {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_detail(self):
+        data = self.detail(self.kashi)
+
+        self.assertEqual(data['name'], 'Kashi Vishwanath')
+        self.assertEqual(data['raw_data'], normalize_raw_data(self.kashi.raw_data))
+        self.assertEqual([reel['id'] for reel in data['recent_reels']], [self.reel.pk])
+
+    def test_detail_is_served_from_the_cache(self):
+        first = self.detail(self.kashi)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.detail(self.kashi)
+
+        self.assertEqual(second, first)
+        self.assertEqual(len(queries), 0)
+
+    def test_missing_temple(self):
+        response = self.client.get('/api/temples/999999')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Temple not found'})
+
+    def test_bulk_matches_the_detail_endpoint(self):
+        # One of them cached already, the other rendered by the bulk request
+        kashi = self.detail(self.kashi)
+        data = self.bulk(self.sankat.pk, 999999, self.kashi.pk, self.sankat.pk)
+
+        self.assertEqual(data['temples'], [self.detail(self.sankat), kashi])
+        self.assertEqual(data['not_found'], [999999])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.bulk(self.kashi.pk, self.sankat.pk)['temples'], [kashi, self.detail(self.sankat)])
+        self.assertEqual(len(queries), 0)
+
+    def test_bulk_id_limit(self):
+        self.assertEqual(len(self.bulk(*range(1, 101))['temples']), 2)
+        for ids in ['', ','.join(map(str, range(1, 102))), 'a,b']:
+            with self.subTest(ids=ids[:10]):
+                self.assertEqual(self.client.get('/api/temples/bulk', {'ids': ids}).status_code, 400)
+
+    def test_temple_edits_invalidate_the_cache(self):
+        self.detail(self.kashi)
+        self.bulk(self.kashi.pk)
+
+        self.kashi.name = 'Baba Vishwanath'
+        self.kashi.save()
+        self.assertEqual(self.detail(self.kashi)['name'], 'Baba Vishwanath')
+
+        self.kashi.raw_data = {'displayName': {'text': 'Baba Vishwanath Jyotirlinga'}}
+        self.kashi.save()
+        self.assertEqual(self.bulk(self.kashi.pk)['temples'][0]['raw_data'], normalize_raw_data(self.kashi.raw_data))
+
+        reel = Reels.objects.create(user=self.user, temple=self.kashi, video_url='https://example.com/new.mp4')
+        self.assertEqual([item['id'] for item in self.detail(self.kashi)['recent_reels']], [reel.pk, self.reel.pk])
+
+        temple_id = self.kashi.pk
+        self.kashi.delete()
+        self.assertEqual(self.client.get(f'/api/temples/{temple_id}').status_code, 404)
+        self.assertEqual(self.bulk(temple_id)['not_found'], [temple_id])
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, override_settings
+
+from temples.models import Temple
+
+
+class TrafficReplayTests(LiveServerTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'traffic.jsonl')
+        Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+
+    def send_requests(self):
+        self.client.get('/api/temples/search', {'q': 'kashi'})
+        self.client.post('/api/create-user', {'user_id': 'pilgrim', 'name': 'Pilgrim'}, content_type='application/json')
+        self.client.get('/admin/login/')
+
+    def records(self):
+        with open(self.path, encoding='utf-8') as fp:
+            return [json.loads(line) for line in fp]
+
+    def replay(self, **options):
+        stdout = StringIO()
+        options = {'file': self.path, 'base_url': self.live_server_url, **options}
+        call_command('replay_traffic', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_records_sampled_api_requests(self):
+        with override_settings(TRAFFIC_RECORD_SAMPLE_RATE=1.0, TRAFFIC_RECORD_PATH=self.path):
+            self.send_requests()
+
+        search, create = self.records()
+        self.assertEqual(
+            (search['method'], search['path'], search['query'], search['body'], search['status']),
+            ('GET', '/api/temples/search', 'q=kashi', '', 200),
+        )
+        self.assertEqual((create['method'], create['content_type'], create['status']), ('POST', 'application/json', 201))
+        self.assertEqual(json.loads(create['body']), {'user_id': 'pilgrim', 'name': 'Pilgrim'})
+        self.assertLessEqual(search['ts'], create['ts'])
+
+    def test_recording_is_off_by_default(self):
+        with override_settings(TRAFFIC_RECORD_PATH=self.path):
+            self.send_requests()
+
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_replays_recorded_requests(self):
+        with override_settings(TRAFFIC_RECORD_SAMPLE_RATE=1.0, TRAFFIC_RECORD_PATH=self.path):
+            self.send_requests()
+        with open(self.path, 'a', encoding='utf-8') as fp:
+            fp.write('not a record\n')
+
+        report = json.loads(self.replay(speed=100, json=True))
+
+        self.assertEqual(report['completed'], 2)
+        # The user exists by now, so the replayed create-user updates them
+        self.assertEqual(report['statuses'], {'200': 2})
+        self.assertIn('p95_ms', report['latency'])
+        self.assertIn('2 requests in', self.replay(speed=100))
+
+    def test_needs_recorded_requests(self):
+        open(self.path, 'w').close()
+        with self.assertRaisesMessage(CommandError, 'No recorded requests'):
+            self.replay()
+        with self.assertRaisesMessage(CommandError, 'No such file'):
+            self.replay(file=self.path + '.missing')
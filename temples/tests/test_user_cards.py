@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from temples.caches import request_cache, user_card_cache_key
+from temples.models import Reels, Temple, User, UserTempleCheckin
+from temples.user_cards import user_cards
+
+
+class UserCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(user_id='pilgrim', name='Pilgrim')
+        cls.temple = Temple.objects.create(name='Kashi Vishwanath', lat=25.3109, lng=83.0107)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_of_existing_users(self):
+        cards = user_cards({'pilgrim', 'nobody'})
+
+        self.assertEqual(list(cards), ['pilgrim'])
+        self.assertEqual(cards['pilgrim']['name'], 'Pilgrim')
+        self.assertEqual(cards['pilgrim']['stats']['checkin_count'], 0)
+
+    def test_cached_cards_need_no_query(self):
+        user_cards({'pilgrim'})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user_cards({'pilgrim'})['pilgrim']['name'], 'Pilgrim')
+
+    def test_rename_drops_the_card(self):
+        user_cards({'pilgrim'})
+        self.user.name = 'Yatri'
+        self.user.save()
+
+        self.assertNotIn(user_card_cache_key('pilgrim'), cache)
+        self.assertEqual(user_cards({'pilgrim'})['pilgrim']['name'], 'Yatri')
+
+    def test_stats_changes_drop_the_card(self):
+        user_cards({'pilgrim'})
+        # Dropped once the check-in commits
+        with self.captureOnCommitCallbacks(execute=True):
+            UserTempleCheckin.objects.create(user=self.user, temple=self.temple)
+
+        self.assertEqual(user_cards({'pilgrim'})['pilgrim']['stats']['checkin_count'], 1)
+
+    def test_request_cache_reads_each_card_once(self):
+        user_cards({'pilgrim'})
+        with request_cache():
+            user_cards({'pilgrim'})
+            cache.delete(user_card_cache_key('pilgrim'))
+            with self.assertNumQueries(0):
+                self.assertIn('pilgrim', user_cards({'pilgrim'}))
+
+    def test_reels_list_embeds_cards(self):
+        Reels.objects.create(user=self.user, temple=self.temple, video_url='https://example.com/reel.mp4')
+
+        response = self.client.get(f'/api/temples/{self.temple.pk}/reels')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Pilgrim', response.content.decode())
@@ -0,0 +1,118 @@
+from itertools import permutations
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from temples import yatra
+from temples.geo import calculate_distance
+from temples.models import Temple
+from temples.yatra import distance_matrix, plan_route
+
+
+# (temple_id, lat, lng) around Varanasi, sorted by id
+TEMPLES = [
+    (1, 25.3109, 83.0107), (2, 25.2860, 82.9990), (3, 25.3176, 83.0062), (4, 25.2820, 83.0040),
+    (5, 25.3000, 83.0200), (6, 25.2950, 82.9800), (7, 25.3300, 82.9900),
+]
+START = (25.3000, 83.0000)
+
+
+def route_length(start, points, round_trip):
+    stops = [start, *points] + ([start] if round_trip else [])
+    return sum(calculate_distance(*a, *b) for a, b in zip(stops, stops[1:]))
+
+
+class PlannerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_numpy_and_pure_python_matrices_agree(self):
+        points = [(lat, lng) for _, lat, lng in TEMPLES]
+        with mock.patch.object(yatra, 'numpy', None):
+            expected = distance_matrix(points)
+
+        for row, expected_row in zip(distance_matrix(points), expected):
+            for distance, expected_distance in zip(row, expected_row):
+                self.assertAlmostEqual(distance, expected_distance, places=9)
+        self.assertAlmostEqual(expected[0][1], calculate_distance(*points[0], *points[1]), places=9)
+
+    def test_finds_the_shortest_route(self):
+        for round_trip in (False, True):
+            with self.subTest(round_trip=round_trip):
+                order, total = plan_route(START, TEMPLES, round_trip)
+
+                shortest = min(
+                    route_length(START, [TEMPLES[i][1:] for i in candidate], round_trip)
+                    for candidate in permutations(range(len(TEMPLES)))
+                )
+                self.assertEqual(sorted(order), list(range(len(TEMPLES))))
+                self.assertAlmostEqual(total, route_length(START, [TEMPLES[i][1:] for i in order], round_trip), places=6)
+                self.assertAlmostEqual(total, shortest, places=6)
+
+    def test_cached_matrix_plans_the_same_route(self):
+        first = plan_route(START, TEMPLES)
+        with mock.patch.object(yatra, 'distance_matrix') as build:
+            self.assertEqual(plan_route(START, TEMPLES), first)
+        build.assert_not_called()
+
+    def test_no_temples(self):
+        self.assertEqual(plan_route(START, []), ([], 0.0))
+
+
+class PlanYatraRouteTests(TestCase):
+    url = '/api/yatra/route'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.temples = [
+            Temple.objects.create(name=f'Temple {temple_id}', lat=lat, lng=lng, yatra=temple_id != 7)
+            for temple_id, lat, lng in TEMPLES
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def plan(self, **params):
+        response = self.client.get(self.url, {'lat': START[0], 'lng': START[1], **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_plans_the_given_temples(self):
+        ids = [temple.pk for temple in self.temples[:4]]
+        data = self.plan(ids=','.join(map(str, ids + [999999])))
+
+        self.assertEqual(sorted(temple['id'] for temple in data['temples']), ids)
+        self.assertEqual(data['not_found'], [999999])
+        self.assertEqual(data['count'], 4)
+        self.assertAlmostEqual(data['total_distance'], sum(temple['leg_distance'] for temple in data['temples']), places=1)
+
+    def test_round_trip(self):
+        ids = ','.join(str(temple.pk) for temple in self.temples)
+        one_way = self.plan(ids=ids)
+        for value in ('true', 'True', '1'):
+            with self.subTest(round_trip=value):
+                data = self.plan(ids=ids, round_trip=value)
+                self.assertTrue(data['round_trip'])
+                self.assertGreater(data['total_distance'], one_way['total_distance'])
+        self.assertFalse(one_way['round_trip'])
+
+    def test_radius_plans_over_the_yatra_temples(self):
+        data = self.plan(radius=10)
+
+        self.assertEqual(sorted(temple['id'] for temple in data['temples']), [temple.pk for temple in self.temples[:6]])
+
+    @override_settings(NEARBY_TEMPLES_MAX_RADIUS=50)
+    def test_invalid_requests(self):
+        with mock.patch('temples.apis.PlanYatraRoute.MAX_TEMPLES', 3):
+            too_many = ','.join(str(temple.pk) for temple in self.temples[:4])
+            self.assertEqual(self.client.get(self.url, {'lat': 25.3, 'lng': 83.0, 'ids': too_many}).status_code, 400)
+        for params in [
+            {'lat': 25.3, 'lng': 83.0},
+            {'lat': 25.3, 'lng': 83.0, 'ids': 'a,b'},
+            {'lng': 83.0, 'radius': 5},
+            {'lat': 25.3, 'lng': 83.0, 'radius': 'inf'},
+            {'lat': 25.3, 'lng': 83.0, 'radius': 51},
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
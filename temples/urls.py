@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import apis
+from . import apis, async_apis
 
 
 urlpatterns = [ 
@@ -13,10 +13,16 @@ urlpatterns = [
     path('nearby-temples', apis.ListNearbyTemples.as_view()),
 
     # Temples
-    # path('temples/<int:pk>', apis.GetTemple.as_view()),
+    path('temples/search', apis.SearchTemples.as_view()),
+    path('temples/bulk', apis.ListTemplesBulk.as_view()),
+    path('temples/geofence', apis.TempleGeofence.as_view()),
+    path('temples/crowd', apis.TempleCrowdCounts.as_view()),
+    path('temples/viewport', apis.TempleViewport.as_view()),
+    path('temples/<int:pk>', apis.GetTemple.as_view()),
     path('temples/<int:pk>/check-ins', apis.ListCreateTempleCheckIn.as_view()),
     path('temples/<int:temple_id>/check-ins/<str:user_id>', apis.GetUserTempleCheckIn.as_view()),
     # path('temples/<int:pk>/yatra-complete', apis.MarkYatraComplete.as_view()),
+    path('yatra/route', apis.PlanYatraRoute.as_view()),
     
     # Reels
     path('temples/<int:pk>/reels', apis.ListTempleReels.as_view()),
@@ -27,4 +33,20 @@ urlpatterns = [
     path('locations', apis.LocationList.as_view()),
     path('locations/<int:pk>/', apis.LocationDetail.as_view()),
 
+    # Metrics
+    path('metrics', apis.PerformanceMetrics.as_view()),
+
+    # Batch
+    path('batch', apis.BatchRequests.as_view()),
+
+    # Exports
+    path('exports/<str:table>', apis.ExportRows.as_view()),
+
+    # Async versions for ASGI deployments
+    path('async/nearby-users', async_apis.AsyncListNearbyUsers.as_view()),
+    path('async/nearby-users/stream', async_apis.AsyncNearbyUsersStream.as_view()),
+    path('async/nearby-temples', async_apis.AsyncListNearbyTemples.as_view()),
+    path('async/temples/<int:pk>/reels', async_apis.AsyncListTempleReels.as_view()),
+    path('async/temples/<int:temple_id>/check-ins/<str:user_id>', async_apis.AsyncGetUserTempleCheckIn.as_view()),
+
 ]
@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from rest_framework import serializers
+
+from .caches import cached_get_many, cached_set_many, user_card_cache_key
+from .models import User, UserStats
+from .stats import STAT_FIELDS
+
+
+class UserCardSerializer(serializers.ModelSerializer):
+    """
+    The user fields every response embeds, cached per user as their "card".
+    """
+    stats = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ('user_id', 'name', 'image', 'stats', 'created_at', 'updated_at')
+
+    def get_stats(self, obj):
+        # Free when the view loaded it with select_related('stats')
+        try:
+            stats = obj.stats
+        except UserStats.DoesNotExist:
+            return dict.fromkeys(STAT_FIELDS, 0)
+        return {field: getattr(stats, field) for field in STAT_FIELDS}
+
+
+def _cache_ttl():
+    return getattr(settings, 'USER_CARD_CACHE_TTL', 3600)
+
+
+def _build_cards(user_ids):
+    users = User.objects.select_related('stats').filter(pk__in=user_ids)
+    return {card['user_id']: card for card in UserCardSerializer(users, many=True).data}
+
+
+def user_cards(user_ids):
+    """
+    {user_id: card} for the users that exist, in one cache multi-get plus
+    one query for the cards it doesn't hold; within request_cache() each
+    card is fetched once. Saving a user or changing
+    their stats drops their card, in every process when the cache is shared
+    (see the temples.W001 check).
+    """
+    cache_keys = {user_id: user_card_cache_key(user_id) for user_id in user_ids}
+    if not cache_keys:
+        return {}
+    cached = cached_get_many(list(cache_keys.values()))
+    cards = {user_id: cached[cache_key] for user_id, cache_key in cache_keys.items() if cache_key in cached}
+    missing_ids = [user_id for user_id in cache_keys if user_id not in cards]
+    if missing_ids:
+        built = _build_cards(missing_ids)
+        cached_set_many({cache_keys[user_id]: card for user_id, card in built.items()}, _cache_ttl())
+        cards.update(built)
+    return cards
+
+
+async def auser_cards(user_ids):
+    """
+    user_cards() for async views.
+    """
+    cache_keys = {user_id: user_card_cache_key(user_id) for user_id in user_ids}
+    if not cache_keys:
+        return {}
+    cached = await cache.aget_many(cache_keys.values())
+    cards = {user_id: cached[cache_key] for user_id, cache_key in cache_keys.items() if cache_key in cached}
+    missing_ids = [user_id for user_id in cache_keys if user_id not in cards]
+    if missing_ids:
+        built = {}
+        async for user in User.objects.select_related('stats').filter(pk__in=missing_ids):
+            built[user.pk] = UserCardSerializer(user).data
+        await cache.aset_many({cache_keys[user_id]: card for user_id, card in built.items()}, _cache_ttl())
+        cards.update(built)
+    return cards
+
+
+def with_user_names(rows, cards, user_key='user'):
+    """
+    Copies of values() rows with the user's name from their card added as
+    user__name, right after the user column.
+    """
+    named_rows = []
+    for row in rows:
+        named_row = {}
+        for key, value in row.items():
+            named_row[key] = value
+            if key == user_key:
+                card = cards.get(value)
+                named_row['user__name'] = card['name'] if card else None
+        named_rows.append(named_row)
+    return named_rows
+
+
+def user_data(card, location):
+    """
+    UserSerializer's representation of a user, built from their card and
+    latest location.
+    """
+    return {
+        'user_id': card['user_id'],
+        'name': card['name'],
+        'image': card['image'],
+        'last_lat': location.lat if location else None,
+        'last_lng': location.lng if location else None,
+        'stats': card['stats'],
+        'created_at': card['created_at'],
+        'updated_at': card['updated_at'],
+    }
+
+
+class UserCardListSerializer(serializers.ListSerializer):
+    """
+    Looks up the cards of every row's user at once before the rows are
+    rendered, unless the view passed them in the user_cards context entry
+    (async views, which can't query from here).
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        cards = self.context.get('user_cards')
+        if cards is None:
+            cards = user_cards({item.user_id for item in items})
+        self.child.user_cards = cards
+        return super().to_representation(items)
+
+
+class UserNameMixin(serializers.Serializer):
+    """
+    Adds user_name, read from the user's card. Serializers using it set
+    list_serializer_class = UserCardListSerializer in their Meta.
+    """
+    user_name = serializers.SerializerMethodField()
+
+    def get_user_name(self, obj):
+        # The user is already loaded when it was just validated or selected
+        if 'user' in obj._state.fields_cache:
+            return obj.user.name
+        cards = getattr(self, 'user_cards', None)
+        if cards is None:
+            cards = self.context.get('user_cards')
+        if cards is None or obj.user_id not in cards:
+            cards = user_cards([obj.user_id])
+        card = cards.get(obj.user_id)
+        return card['name'] if card else None
@@ -0,0 +1,193 @@
+import hashlib
+import heapq
+import struct
+import time
+from array import array
+from itertools import chain
+from math import asin, cos, radians, sin, sqrt
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import EARTH_RADIUS_KM, calculate_distance
+
+try:
+    # Optional; builds the distance matrix in a few vectorized steps
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Nearest nodes of each node where Or-opt tries to reinsert runs
+OR_OPT_NEIGHBOURS = 8
+
+
+def distance_matrix(points):
+    """
+    Haversine distances in km between every pair of (lat, lng) points, as
+    one list of floats per point.
+    """
+    if numpy is not None and len(points) > 1:
+        coordinates = numpy.radians(numpy.array(points, dtype=float))
+        lats, lngs = coordinates[:, 0], coordinates[:, 1]
+        cos_lats = numpy.cos(lats)
+        a = (
+            numpy.sin((lats[:, None] - lats[None, :]) / 2) ** 2
+            + cos_lats[:, None] * cos_lats[None, :] * numpy.sin((lngs[:, None] - lngs[None, :]) / 2) ** 2
+        )
+        return (2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))).tolist()
+
+    # Same formula, with the per-point terms computed once and each pair once
+    coordinates = [(radians(lat), radians(lng)) for lat, lng in points]
+    cos_lats = [cos(lat) for lat, _ in coordinates]
+    matrix = [[0.0] * len(points) for _ in points]
+    for i, (lat_i, lng_i) in enumerate(coordinates):
+        row = matrix[i]
+        for j in range(i + 1, len(points)):
+            lat_j, lng_j = coordinates[j]
+            a = sin((lat_j - lat_i) / 2) ** 2 + cos_lats[i] * cos_lats[j] * sin((lng_j - lng_i) / 2) ** 2
+            row[j] = matrix[j][i] = 2 * EARTH_RADIUS_KM * asin(sqrt(min(a, 1.0)))
+    return matrix
+
+
+def yatra_matrix_cache_key(temples):
+    # Keyed by the temples' ids and coordinates, so moving a temple never
+    # serves a stale matrix
+    digest = hashlib.sha1()
+    for temple_id, lat, lng in temples:
+        digest.update(struct.pack('<qdd', temple_id, lat, lng))
+    return f'yatra_matrix:{digest.hexdigest()}'
+
+
+def temple_distance_matrix(temples):
+    """
+    Distance matrix of (temple_id, lat, lng) tuples sorted by id, shared
+    through the cache by every plan over the same set of temples.
+    """
+    cache_key = yatra_matrix_cache_key(temples)
+    cached = cache.get(cache_key)
+    size = len(temples)
+    if cached is not None:
+        flat = array('d')
+        flat.frombytes(cached)
+        flat = flat.tolist()
+        return [flat[i * size:(i + 1) * size] for i in range(size)]
+
+    matrix = distance_matrix([(lat, lng) for _, lat, lng in temples])
+    # Packed doubles take a third of the space of a pickled list
+    flat = array('d')
+    for row in matrix:
+        flat.extend(row)
+    cache.set(cache_key, flat.tobytes(), getattr(settings, 'YATRA_MATRIX_CACHE_TTL', 3600))
+    return matrix
+
+
+def _two_opt(route, matrix):
+    # Reverse route[i..j] when that shortens the route; the ends stay put
+    improved = False
+    last = len(route) - 1
+    for i in range(1, last - 1):
+        before_row = matrix[route[i - 1]]
+        for j in range(i + 1, last):
+            first, end, after = route[i], route[j], route[j + 1]
+            change = before_row[end] + matrix[first][after] - before_row[first] - matrix[end][after]
+            if change < -1e-9:
+                route[i:j + 1] = reversed(route[i:j + 1])
+                improved = True
+    return improved
+
+
+def _or_opt(route, matrix, neighbours):
+    # Move runs of up to three temples, in either direction, next to one of
+    # the nearest neighbours of their ends when that shortens the route
+    improved = False
+    last = len(route) - 1
+    position = {node: p for p, node in enumerate(route)}
+    for length in (1, 2, 3):
+        i = 1
+        while i + length <= last:
+            first, end = route[i], route[i + length - 1]
+            before, after = route[i - 1], route[i + length]
+            saved = matrix[before][first] + matrix[end][after] - matrix[before][after]
+            best = None
+            # Edges route[p] -> route[p + 1] next to a neighbour, outside the run
+            edges = set()
+            for node in chain(neighbours[first], neighbours[end]):
+                p = position[node]
+                edges.update((p - 1, p))
+            for p in edges:
+                if p < 0 or p >= last or i - 1 <= p < i + length:
+                    continue
+                a, b = route[p], route[p + 1]
+                base = matrix[a][b] + saved
+                change = matrix[a][first] + matrix[end][b] - base
+                if change < -1e-9 and (best is None or change < best[0]):
+                    best = (change, p, False)
+                change = matrix[a][end] + matrix[first][b] - base
+                if change < -1e-9 and (best is None or change < best[0]):
+                    best = (change, p, True)
+            if best is not None:
+                _, p, reverse = best
+                segment = route[i:i + length]
+                if reverse:
+                    segment.reverse()
+                if p < i:
+                    route[p + 1:i + length] = segment + route[p + 1:i]
+                else:
+                    route[i:p + 1] = route[i + length:p + 1] + segment
+                position = {node: p for p, node in enumerate(route)}
+                improved = True
+            i += 1
+    return improved
+
+
+def plan_route(start, temples, round_trip=False):
+    """
+    Order in which to visit temples, (temple_id, lat, lng) tuples sorted by
+    id, from start, a (lat, lng) point. Nearest neighbour gives a first
+    route, which 2-opt and Or-opt moves then shorten until none helps or
+    YATRA_IMPROVE_SECONDS have passed. With round_trip the route returns
+    to start.
+
+    Returns (positions in temples in visiting order, total distance in km).
+    """
+    if not temples:
+        return [], 0.0
+    size = len(temples)
+    temple_matrix = temple_distance_matrix(temples)
+    from_start = [calculate_distance(start[0], start[1], lat, lng) for _, lat, lng in temples]
+    # Node 0 is the start, node i + 1 is temples[i] and node size + 1 is
+    # where the route ends: back at the start for a round trip, otherwise
+    # a point at no distance from anywhere, so the route may end anywhere
+    to_end = [0.0] + from_start + [0.0] if round_trip else [0.0] * (size + 2)
+    matrix = (
+        [[0.0] + from_start + [to_end[0]]]
+        + [[from_start[i]] + row + [to_end[i + 1]] for i, row in enumerate(temple_matrix)]
+        + [to_end]
+    )
+
+    route = [0]
+    unvisited = set(range(1, size + 1))
+    while unvisited:
+        row = matrix[route[-1]]
+        nearest = min(unvisited, key=row.__getitem__)
+        route.append(nearest)
+        unvisited.remove(nearest)
+    route.append(size + 1)
+    # Candidate places for Or-opt moves; the start and end are included so
+    # runs can move to either end of the route
+    neighbours = [
+        heapq.nsmallest(OR_OPT_NEIGHBOURS, (other for other in range(size + 2) if other != node), key=row.__getitem__)
+        for node, row in enumerate(matrix)
+    ]
+
+    deadline = time.perf_counter() + getattr(settings, 'YATRA_IMPROVE_SECONDS', 0.2)
+    while time.perf_counter() < deadline:
+        improved = _two_opt(route, matrix)
+        if time.perf_counter() >= deadline:
+            break
+        if not _or_opt(route, matrix, neighbours) and not improved:
+            break
+
+    total = sum(matrix[a][b] for a, b in zip(route, route[1:]))
+    return [node - 1 for node in route[1:-1]], total